@@ -0,0 +1,140 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+bench_static
+~~~~~~~~~~~~~~~~~
+
+Measures the server CPU time spent serving a large static file with sendfile
+(:class:`FileResponse <daemon.response.FileResponse>`) and with the copying
+path, which reads the file into memory and sends header and body as bytes.
+
+For each path a backend is started in a child process, the file is downloaded
+``--requests`` times over one keep-alive connection, and the user and system
+CPU time of the server process is read from ``/proc`` (Linux only).
+
+Usage::
+
+  python bench_static.py --size-mb 20 --requests 50 --mode thread
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+#: Temporary file served by the benchmark, below static/images/.
+BENCH_FILE = "bench-sendfile.png"
+
+SERVER = """
+import sys
+import daemon.response
+from daemon import create_backend
+daemon.response.SENDFILE_MIN_SIZE = int(sys.argv[3])
+create_backend("127.0.0.1", int(sys.argv[1]), routes={}, mode=sys.argv[2])
+"""
+
+
+def cpu_seconds(pid):
+    """
+    Reads the user + system CPU time of a process.
+
+    :param pid (int): process id.
+
+    :rtype float: CPU seconds.
+    """
+    with open("/proc/{}/stat".format(pid)) as fh:
+        fields = fh.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def wait_listening(port, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("backend did not start on port {}".format(port))
+
+
+def download(port, count, size):
+    """
+    Downloads the benchmark file ``count`` times on one keep-alive connection.
+
+    :rtype float: wall-clock seconds.
+    """
+    request = "GET /images/{} HTTP/1.1\r\nHost: bench\r\n\r\n".format(BENCH_FILE).encode()
+    start = time.monotonic()
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        reader = sock.makefile("rb")
+        for _ in range(count):
+            sock.sendall(request)
+            length = None
+            while True:
+                line = reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            if length != size:
+                raise RuntimeError("unexpected Content-Length {}".format(length))
+            remaining = length
+            while remaining:
+                remaining -= len(reader.read(min(remaining, 1 << 20)))
+    return time.monotonic() - start
+
+
+def run(label, port, mode, threshold, count, size):
+    server = subprocess.Popen([sys.executable, "-c", SERVER, str(port), mode, str(threshold)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_listening(port)
+        before = cpu_seconds(server.pid)
+        elapsed = download(port, count, size)
+        cpu = cpu_seconds(server.pid) - before
+    finally:
+        server.terminate()
+        server.wait()
+    mb = size * count / (1024 * 1024)
+    print("{:<9} server cpu {:6.2f}s  wall {:6.2f}s  {:8.1f} MB/s  {:6.1f} ms cpu/request".format(
+        label, cpu, elapsed, mb / elapsed, 1000 * cpu / count))
+    return cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sendfile and copying static file serving")
+    parser.add_argument("--size-mb", type=int, default=20, help="size of the served file")
+    parser.add_argument("--requests", type=int, default=50, help="downloads per path")
+    parser.add_argument("--mode", default="thread", choices=["thread", "pool", "eventloop", "asyncio"])
+    parser.add_argument("--port", type=int, default=9190)
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    size = args.size_mb * 1024 * 1024
+    path = os.path.join("static", "images", BENCH_FILE)
+    with open(path, "wb") as fh:
+        fh.write(os.urandom(size))
+    try:
+        copy = run("copy", args.port, args.mode, size + 1, args.requests, size)
+        zero = run("sendfile", args.port + 1, args.mode, 0, args.requests, size)
+    finally:
+        os.remove(path)
+    if copy:
+        print("sendfile saves {:.0f}% of the server CPU time".format(100 * (1 - zero / copy)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.asyncserver
+~~~~~~~~~~~~~~~~~
+
+This module provides an :mod:`asyncio` backend engine built on
+:func:`asyncio.start_server`. Every connection is a coroutine on one event
+loop, ``async def`` WeApRous handlers are awaited directly and plain handlers,
+built-in endpoints and static files, which may block on disk, are offloaded
+to a thread pool executor, so a process can overlap thousands of handlers
+waiting on the network.
+
+Usage Example:
+--------------
+>>> create_backend("127.0.0.1", 9000, routes={}, mode="asyncio")
+
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+from .backend import _server_state
+from .httpadapter import (HttpAdapter, compile_routes, finalize_response, KEEPALIVE_TIMEOUT,
+                          BODY_READ_TIMEOUT)
+from .httpparser import HttpParseError, MAX_BODY_SIZE
+from .response import StreamingResponse, FileResponse
+
+#: Bytes read from a client stream per call.
+RECV_SIZE = 65536
+
+#: Seconds a new connection may stay open without completing its first request.
+IDLE_TIMEOUT = 30
+
+
+async def _read_message(reader, parser, timeout):
+    """
+    Reads from ``reader`` until ``parser`` holds one complete request. The
+    request head must arrive within ``timeout``, the body may then stall for
+    at most :data:`BODY_READ_TIMEOUT <daemon.httpadapter.BODY_READ_TIMEOUT>`
+    between two reads.
+
+    :param reader (asyncio.StreamReader): client stream.
+    :param parser (RequestParser): per-connection request parser.
+    :param timeout (float): seconds to wait for the request head.
+
+    :rtype ParsedRequest: the request, or None when the client went away.
+    :raises HttpParseError: on a malformed request.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        message = parser.next_message()
+        if message is not None:
+            return message
+        if parser.in_body():
+            remaining = BODY_READ_TIMEOUT
+        else:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+        try:
+            data = await asyncio.wait_for(reader.read(RECV_SIZE), remaining)
+        except asyncio.TimeoutError:
+            return None
+        if not data:
+            return None
+        parser.feed(data)
+
+
+class AsyncioServer:
+    """
+    An :mod:`asyncio` HTTP server running WeApRous routes.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param pool_size (int): executor threads for plain handlers, built-in
+                            endpoints and static files.
+    :param reuse_port (bool): bind with ``SO_REUSEPORT``.
+    :param max_body_size (int): largest accepted request body.
+    """
+
+    def __init__(self, ip, port, routes, pool_size, reuse_port=False, max_body_size=MAX_BODY_SIZE):
+        self.ip = ip
+        self.port = port
+        self.routes = routes
+        self.router = compile_routes(routes)
+        self.reuse_port = reuse_port
+        self.max_body_size = max_body_size
+        self.pool_size = pool_size
+        self.executor = ThreadPoolExecutor(max_workers=pool_size,
+                                           thread_name_prefix="asyncio-worker")
+        self.accepted = 0
+        self.open_connections = 0
+        self.async_calls = 0
+        self.sync_calls = 0
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serves one client connection, request after request while it is kept alive.
+
+        :param reader (asyncio.StreamReader): client read side.
+        :param writer (asyncio.StreamWriter): client write side.
+        """
+        addr = writer.get_extra_info("peername")
+        self.accepted += 1
+        self.open_connections += 1
+        adapter = HttpAdapter(self.ip, self.port, None, addr, self.routes, self.max_body_size,
+                              self.router)
+        parser = adapter.new_parser()
+        served = 0
+        try:
+            while True:
+                try:
+                    message = await _read_message(
+                        reader, parser, IDLE_TIMEOUT if served == 0 else KEEPALIVE_TIMEOUT)
+                except HttpParseError as e:
+                    print("[Backend] Bad request from {}: {}".format(addr, e))
+                    writer.write(adapter.parse_error_response(e))
+                    await writer.drain()
+                    return
+                if message is None:
+                    return
+                served += 1
+
+                try:
+                    response = await self.dispatch(adapter, message)
+                    keep_alive = adapter.keep_alive(served)
+                    response = finalize_response(response, keep_alive, served)
+                except Exception as e:
+                    print("[Backend] Error serving request from {}: {}".format(addr, e))
+                    writer.write(adapter.response.build_internal_error())
+                    await writer.drain()
+                    return
+                if isinstance(response, StreamingResponse):
+                    # The body iterable runs on the event loop, between drains.
+                    for piece in response:
+                        writer.write(piece)
+                        await writer.drain()
+                    if response.failed:
+                        return
+                elif isinstance(response, FileResponse):
+                    # loop.sendfile falls back to reading the file when the
+                    # transport cannot use os.sendfile.
+                    try:
+                        writer.write(response.head)
+                        while True:
+                            writer.write(response.take_bytes())
+                            await writer.drain()
+                            segment = response.segment()
+                            if segment is None:
+                                break
+                            sent = await asyncio.get_running_loop().sendfile(
+                                writer.transport, response.file, *segment)
+                            if sent < segment[1]:
+                                print("[Backend] {} ended before its announced length".format(
+                                    response.file.name))
+                                response.mark_truncated()
+                                break
+                            response.advance(sent)
+                    finally:
+                        response.close()
+                    if response.failed:
+                        return
+                else:
+                    writer.write(response)
+                    await writer.drain()
+                if not keep_alive:
+                    return
+        except ConnectionError as e:
+            print("[Backend] Connection error with {}: {}".format(addr, e))
+        except Exception as e:
+            # The response was partly sent: the connection can only be closed.
+            print("[Backend] Error writing response to {}: {}".format(addr, e))
+        finally:
+            self.open_connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def dispatch(self, adapter, message):
+        """
+        Prepares a request and runs its handler. ``async def`` WeApRous
+        handlers are awaited on the loop; plain handlers, built-in endpoints
+        and static files run on the executor.
+
+        :param adapter (HttpAdapter): the connection's adapter.
+        :param message (ParsedRequest): request produced by the parser.
+
+        :rtype bytes, StreamingResponse or FileResponse: the response.
+        """
+        adapter.parse_request(message, self.routes)
+        handler = adapter.request.hook
+        if handler is not None and inspect.iscoroutinefunction(handler):
+            self.async_calls += 1
+            return await adapter.run_route_async(handler)
+        if handler is not None:
+            self.sync_calls += 1
+            func = functools.partial(adapter.run_route, handler)
+        else:
+            func = adapter.dispatch
+        ctx = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self.executor, ctx.run, func)
+
+    async def serve_forever(self):
+        """Binds the listening socket and serves connections forever."""
+        server = await asyncio.start_server(self.handle_connection, self.ip, self.port,
+                                            backlog=1024, reuse_address=True,
+                                            reuse_port=self.reuse_port or None)
+        print("[Backend] asyncio server listening on port {}".format(self.port))
+        async with server:
+            await server.serve_forever()
+
+    def stats(self):
+        """
+        Returns a snapshot of the server counters.
+
+        :rtype dict: connection counts and handler calls by kind.
+        """
+        return {
+            "open_connections": self.open_connections,
+            "accepted": self.accepted,
+            "executor_threads": self.pool_size,
+            "async_calls": self.async_calls,
+            "sync_calls": self.sync_calls,
+        }
+
+
+def run_asyncio(ip, port, routes, pool_size, reuse_port=False, max_body_size=MAX_BODY_SIZE):
+    """
+    Starts the asyncio backend and serves requests forever.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param pool_size (int): executor threads for plain handlers, built-in
+                            endpoints and static files.
+    :param reuse_port (bool): bind with ``SO_REUSEPORT``.
+    :param max_body_size (int): largest accepted request body.
+    """
+    server = AsyncioServer(ip, port, routes, pool_size, reuse_port, max_body_size)
+    _server_state["mode"] = "asyncio"
+    _server_state["pool"] = None
+    _server_state["engine"] = server
+    try:
+        asyncio.run(server.serve_forever())
+    except OSError as e:
+        print("Socket error: {}".format(e))
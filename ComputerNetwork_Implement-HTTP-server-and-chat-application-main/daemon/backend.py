@@ -30,28 +30,314 @@ Requirements:
 
 Notes:
 ------
-- The server create daemon threads for client handling.
+- The server create daemon threads for client handling, either one per connection
+  (``thread`` mode) or a fixed pool fed by a bounded accept queue (``pool`` mode).
+- In ``pool`` mode kept-alive connections wait for their next request in
+  :class:`IdleConnections`, so an idle client does not hold a worker.
+- The ``eventloop`` mode serves all sockets from one selectors loop, see daemon.eventloop.
+- The ``asyncio`` mode awaits ``async def`` route handlers directly, see daemon.asyncserver.
+- With ``workers`` > 1 any mode runs in several pre-forked processes sharing the port,
+  see daemon.prefork.
+- The static asset manifest is built once at startup, see daemon.manifest.
 - The current implementation error handling is minimal, socket errors are printed to the console.
 - The actual request processing is delegated to the HttpAdapter class.
 
 Usage Example:
 --------------
 >>> create_backend("127.0.0.1", 9000, routes={})
+>>> create_backend("127.0.0.1", 9000, routes={}, mode="pool", pool_size=8, queue_size=64)
+>>> create_backend("127.0.0.1", 9000, routes={}, mode="eventloop", workers=4)
 
 """
 
+import os
+import time
 import socket
+import selectors
 import threading
 import argparse
+import queue
+import collections
 
 from .response import *
-from .httpadapter import HttpAdapter
+from .httpadapter import HttpAdapter, compile_routes, RECV_SIZE
+from .httpparser import MAX_BODY_SIZE
+from .staticcache import static_cache
+from . import manifest
 from .dictionary import CaseInsensitiveDict
 
 # Global simple in-memory session store
 sessions = {}
 
-def handle_client(ip, port, conn, addr, routes):
+#: Default number of worker threads used by the ``pool`` mode.
+POOL_SIZE = 16
+#: Default number of accepted connections allowed to wait for a worker.
+QUEUE_SIZE = 128
+#: Seconds advertised in ``Retry-After`` when the accept queue is full.
+RETRY_AFTER = 1
+#: Seconds between two scans for idle connections past their keep-alive timeout.
+IDLE_SWEEP_INTERVAL = 0.5
+
+#: Runtime information about the running backend, see :func:`server_stats`.
+#: ``worker`` and ``stats_file`` are only set in pre-forked worker processes.
+_server_state = {"mode": None, "pool": None, "engine": None, "worker": None, "stats_file": None}
+
+
+class WorkerPool:
+    """
+    A fixed set of daemon worker threads consuming a bounded job queue.
+
+    Jobs are ``(func, args)`` pairs. :meth:`submit` never blocks: once the
+    queue holds ``queue_size`` pending jobs the job is refused so the caller
+    can shed load instead of piling up threads.
+
+    :param size (int): number of worker threads.
+    :param queue_size (int): maximum number of pending jobs.
+    :param name (str): prefix of the worker thread names.
+    """
+
+    def __init__(self, size=POOL_SIZE, queue_size=QUEUE_SIZE, name="worker"):
+        self.size = size
+        self.queue_size = queue_size
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.threads = []
+        for i in range(size):
+            t = threading.Thread(target=self._worker, name="{}-{}".format(name, i), daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def submit(self, func, *args):
+        """
+        Queues ``func(*args)`` for execution on a worker thread.
+
+        :rtype bool: False if the queue is full and the job was rejected.
+        """
+        try:
+            self.jobs.put_nowait((func, args))
+        except queue.Full:
+            with self.lock:
+                self.rejected += 1
+            return False
+        with self.lock:
+            self.submitted += 1
+        return True
+
+    def _worker(self):
+        while True:
+            func, args = self.jobs.get()
+            with self.lock:
+                self.active += 1
+            try:
+                func(*args)
+            except Exception as e:
+                print("[Backend] Worker error: {}".format(e))
+                with self.lock:
+                    self.failed += 1
+            finally:
+                with self.lock:
+                    self.active -= 1
+                    self.completed += 1
+
+    def stats(self):
+        """
+        Returns a snapshot of the pool counters.
+
+        :rtype dict: pool size, queue depth and job counters.
+        """
+        with self.lock:
+            return {
+                "pool_size": self.size,
+                "queue_size": self.queue_size,
+                "queued": self.jobs.qsize(),
+                "active": self.active,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "failed": self.failed,
+            }
+
+
+class IdleConnections:
+    """
+    Kept-alive connections of the ``pool`` mode waiting for their next request.
+
+    A worker that answered every buffered request parks the connection here
+    instead of blocking in ``recv``. One selector thread watches the parked
+    sockets: once one is readable the bytes are fed to its parser and the
+    connection is queued to the pool again, a connection idle for longer
+    than its timeout is closed.
+
+    :param pool (WorkerPool): pool serving the connections.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.selector = selectors.DefaultSelector()
+        self.incoming = collections.deque()
+        self.deadlines = {}
+        self.lock = threading.Lock()
+        self.parked = 0
+        self.resumed = 0
+        self.expired = 0
+        self.wake_r, self.wake_w = socket.socketpair()
+        self.wake_r.setblocking(False)
+        self.wake_w.setblocking(False)
+        self.selector.register(self.wake_r, selectors.EVENT_READ)
+        self.thread = threading.Thread(target=self._run, name="backend-idle", daemon=True)
+        self.thread.start()
+
+    def park(self, adapter, conn, parser, served, timeout):
+        """
+        Hands a connection over to the selector thread until its next
+        request starts to arrive. Called from a worker thread.
+
+        :param adapter (HttpAdapter): adapter serving the connection.
+        :param conn (socket.socket): Client connection socket.
+        :param parser (RequestParser): the connection's parser.
+        :param served (int): number of requests answered on this connection.
+        :param timeout (float): seconds the connection may stay idle.
+        """
+        self.incoming.append((conn, (adapter, parser, served), time.monotonic() + timeout))
+        try:
+            self.wake_w.send(b"\0")
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def _run(self):
+        next_sweep = time.monotonic() + IDLE_SWEEP_INTERVAL
+        while True:
+            while self.incoming:
+                conn, state, deadline = self.incoming.popleft()
+                try:
+                    conn.settimeout(0)
+                    self.selector.register(conn, selectors.EVENT_READ, state)
+                except (OSError, ValueError):
+                    conn.close()
+                    continue
+                self.deadlines[conn] = deadline
+                with self.lock:
+                    self.parked += 1
+            for key, _ in self.selector.select(IDLE_SWEEP_INTERVAL):
+                if key.fileobj is self.wake_r:
+                    try:
+                        while self.wake_r.recv(4096):
+                            pass
+                    except (BlockingIOError, InterruptedError):
+                        pass
+                else:
+                    self._resume(key.fileobj, key.data)
+            now = time.monotonic()
+            if now >= next_sweep:
+                next_sweep = now + IDLE_SWEEP_INTERVAL
+                for conn, deadline in list(self.deadlines.items()):
+                    if now >= deadline:
+                        self._release(conn)
+                        conn.close()
+                        with self.lock:
+                            self.expired += 1
+
+    def _release(self, conn):
+        self.selector.unregister(conn)
+        del self.deadlines[conn]
+        with self.lock:
+            self.parked -= 1
+
+    def _resume(self, conn, state):
+        adapter, parser, served = state
+        try:
+            chunk = conn.recv(RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            chunk = b""
+        self._release(conn)
+        if not chunk:
+            conn.close()
+            return
+        parser.feed(chunk)
+        with self.lock:
+            self.resumed += 1
+        if not self.pool.submit(adapter.serve, conn, parser, served, self):
+            reject_client(conn, adapter.connaddr)
+
+    def stats(self):
+        """
+        Returns a snapshot of the idle connection counters.
+
+        :rtype dict: connections parked now, resumed and expired so far.
+        """
+        with self.lock:
+            return {"parked": self.parked, "resumed": self.resumed, "expired": self.expired}
+
+
+def process_stats():
+    """
+    Returns runtime statistics of the backend running in this process.
+
+    :rtype dict: serving mode, process id, worker index, live thread count,
+        worker pool, engine, static cache and asset manifest counters.
+    """
+    pool = _server_state["pool"]
+    engine = _server_state["engine"]
+    return {
+        "mode": _server_state["mode"],
+        "pid": os.getpid(),
+        "worker": _server_state["worker"],
+        "threads": threading.active_count(),
+        "pool": pool.stats() if pool else None,
+        "engine": engine.stats() if engine else None,
+        "static_cache": static_cache.stats(),
+        "manifest": manifest.asset_manifest.stats(),
+    }
+
+
+def server_stats():
+    """
+    Returns runtime statistics of the backend. In a pre-forked worker the
+    per-worker statistics collected by the supervisor are included.
+
+    :rtype dict: :func:`process_stats`, plus ``workers`` when pre-forked.
+    """
+    stats = process_stats()
+    if _server_state["stats_file"]:
+        from .prefork import read_worker_stats
+        stats["workers"] = read_worker_stats(_server_state["stats_file"])
+    return stats
+
+
+def reject_client(conn, addr):
+    """
+    Answers a connection that cannot be queued with ``503 Service Unavailable``.
+
+    Whatever part of the request already arrived is drained first so closing
+    the socket does not turn into a reset before the client reads the reply.
+
+    :param conn (socket.socket): Client connection socket.
+    :param addr (tuple): client address (IP, port).
+    """
+    print("[Backend] Accept queue full, rejecting {}".format(addr))
+    try:
+        conn.setblocking(False)
+        try:
+            conn.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            pass
+        conn.settimeout(1.0)
+        conn.sendall(Response().build_unavailable(RETRY_AFTER))
+        conn.shutdown(socket.SHUT_WR)
+    except OSError:
+        pass
+    finally:
+        conn.close()
+
+def handle_client(ip, port, conn, addr, routes, max_body_size=MAX_BODY_SIZE, router=None,
+                  idle=None):
     """
     Initializes an HttpAdapter instance and delegates the client handling logic to it.
 
@@ -60,34 +346,81 @@ def handle_client(ip, port, conn, addr, routes):
     :param conn (socket.socket): Client connection socket.
     :param addr (tuple): client address (IP, port).
     :param routes (dict): Dictionary of route handlers.
+    :param max_body_size (int): largest accepted request body.
+    :param router (Router): compiled route table shared by the server.
+    :param idle (IdleConnections): idle connection watcher of the ``pool`` mode.
     """
-    daemon = HttpAdapter(ip, port, conn, addr, routes)
+    daemon = HttpAdapter(ip, port, conn, addr, routes, max_body_size, router)
 
     # Handle client
-    daemon.handle_client(conn, addr, routes)
+    daemon.handle_client(conn, addr, routes, idle)
 
-def run_backend(ip, port, routes):
+def run_backend(ip, port, routes, mode="thread", pool_size=POOL_SIZE, queue_size=QUEUE_SIZE,
+                reuse_port=False, max_body_size=MAX_BODY_SIZE):
     """
     Starts the backend server, binds to the specified IP and port, and listens for incoming
-    connections. Each connection is handled in a separate thread. The backend accepts incoming
-    connections and spawns a thread for each client.
+    connections. In ``thread`` mode each connection is handled in a separate thread. In
+    ``pool`` mode connections are queued to a fixed :class:`WorkerPool` and answered with
+    ``503 Service Unavailable`` once the queue is full, kept-alive connections wait for
+    their next request in :class:`IdleConnections`. The ``eventloop`` mode hands the
+    socket over to :mod:`daemon.eventloop`, which only uses the pool to dispatch requests,
+    and the ``asyncio`` mode to :mod:`daemon.asyncserver`.
 
 
     :param ip (str): IP address to bind the server.
     :param port (int): Port number to listen on.
     :param routes (dict): Dictionary of route handlers.
+    :param mode (str): ``thread`` (one thread per connection), ``pool``, ``eventloop``
+                       or ``asyncio``.
+    :param pool_size (int): number of worker threads in ``pool``/``eventloop`` mode,
+                            executor threads in ``asyncio`` mode.
+    :param queue_size (int): job queue depth in ``pool``/``eventloop`` mode.
+    :param reuse_port (bool): bind with ``SO_REUSEPORT`` so several processes can
+                              listen on the same port.
+    :param max_body_size (int): largest accepted request body, larger ones get
+                                ``413 Payload Too Large``.
     """
+    if mode == "eventloop":
+        from .eventloop import run_eventloop
+        run_eventloop(ip, port, routes, pool_size, queue_size, reuse_port, max_body_size)
+        return
+    if mode == "asyncio":
+        from .asyncserver import run_asyncio
+        run_asyncio(ip, port, routes, pool_size, reuse_port, max_body_size)
+        return
+
     server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if reuse_port:
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
+    pool = None
+    idle = None
+    if mode == "pool":
+        pool = WorkerPool(pool_size, queue_size, name="backend-worker")
+        idle = IdleConnections(pool)
+    elif mode != "thread":
+        raise ValueError("Unknown backend mode: {}".format(mode))
+    _server_state["mode"] = mode
+    _server_state["pool"] = pool
+    _server_state["engine"] = idle
+    router = compile_routes(routes)
 
     try:
         server.bind((ip, port))
         server.listen(50)
         print("[Backend] Listening on port {}".format(port))
+        if pool:
+            print("[Backend] Worker pool size={} queue={}".format(pool_size, queue_size))
         if routes != {}:
             print("[Backend] route settings {}".format(routes))
 
         while True:
             conn, addr = server.accept()
+            if pool:
+                if not pool.submit(handle_client, ip, port, conn, addr, routes, max_body_size,
+                                   router, idle):
+                    reject_client(conn, addr)
+                continue
             #
             #  TODO: implement the step of the client incomping connection
             #        using multi-thread programming with the
@@ -98,7 +431,7 @@ def run_backend(ip, port, routes):
             # Tạo một thread mới để xử lý client này, chạy dưới dạng daemon
             client_thread = threading.Thread(
                 target=handle_client,
-                args=(ip, port, conn, addr, routes),
+                args=(ip, port, conn, addr, routes, max_body_size, router),
                 daemon=True
             )
 
@@ -107,13 +440,27 @@ def run_backend(ip, port, routes):
     except socket.error as e:
       print("Socket error: {}".format(e))
 
-def create_backend(ip, port, routes={}):
+def create_backend(ip, port, routes={}, mode="thread", pool_size=POOL_SIZE, queue_size=QUEUE_SIZE,
+                   workers=1, max_body_size=MAX_BODY_SIZE):
     """
     Entry point for creating and running the backend server.
 
     :param ip (str): IP address to bind the server.
     :param port (int): Port number to listen on.
     :param routes (dict, optional): Dictionary of route handlers. Defaults to empty dict.
+    :param mode (str, optional): ``thread``, ``pool``, ``eventloop`` or ``asyncio``.
+                                 Defaults to ``thread``.
+    :param pool_size (int, optional): worker threads in ``pool``/``eventloop`` mode.
+    :param queue_size (int, optional): job queue depth in ``pool``/``eventloop`` mode.
+    :param workers (int, optional): number of pre-forked processes. Defaults to 1,
+                                    a single process.
+    :param max_body_size (int, optional): largest accepted request body in bytes.
     """
 
-    run_backend(ip, port, routes)
\ No newline at end of file
+    # Built before forking so the workers share the asset bytes.
+    manifest.load_manifest(BASE_DIR, cache_policy)
+    if workers > 1:
+        from .prefork import run_prefork
+        run_prefork(ip, port, routes, workers, mode, pool_size, queue_size, max_body_size)
+        return
+    run_backend(ip, port, routes, mode, pool_size, queue_size, max_body_size=max_body_size)
\ No newline at end of file
@@ -0,0 +1,289 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.balancer
+~~~~~~~~~~~~~~~~~
+
+This module provides the load-balancing policies of the proxy, selected per
+``host`` block of ``config/proxy.conf`` with ``dist_policy``:
+
+- ``round-robin``: the upstreams in turn.
+- ``weighted``: smooth weighted round-robin, upstreams being listed as
+  ``proxy_pass http://127.0.0.1:9001 weight=3;``.
+- ``least-connections``: the upstream with the fewest requests in flight,
+  counted by its :class:`UpstreamPool <daemon.upstream.UpstreamPool>`.
+- ``hash``: consistent hashing of the client IP (``dist_policy hash ip;``,
+  the default) or of a cookie (``dist_policy hash cookie=sessionid;``), so a
+  client keeps reaching the same upstream while the upstream set is stable.
+
+Every policy only chooses among the upstreams currently available, neither
+ejected nor marked down by the health checks of :mod:`daemon.upstream`, and
+chooses None when none is left. Balancers keep their state across requests
+and are shared by every proxy handler thread; each serializes its choices
+with its own lock.
+
+Usage::
+
+  >>> balancer = get_balancer(["127.0.0.1:9001", "127.0.0.1:9002"], "round-robin")
+  >>> balancer.choose(headers, client_ip)
+  ('127.0.0.1', 9001)
+"""
+
+import abc
+import bisect
+import hashlib
+import threading
+import time
+
+from .upstream import upstream_pools
+
+#: Points of each upstream on the consistent hashing ring, per unit of weight.
+HASH_REPLICAS = 64
+
+
+def parse_upstream(spec):
+    """
+    Parses one ``proxy_pass`` target.
+
+    :param spec (str): ``host:port``, optionally followed by ``weight=N``.
+
+    :rtype tuple: (host, port, weight).
+    :raises ValueError: on a malformed target.
+    """
+    fields = spec.split()
+    host, _, port = fields[0].rpartition(":")
+    if not host:
+        raise ValueError("Invalid upstream {!r}, expected host:port".format(spec))
+    weight = 1
+    for field in fields[1:]:
+        name, _, value = field.partition("=")
+        if name == "weight":
+            weight = int(value)
+            if weight < 1:
+                raise ValueError("Invalid weight in upstream {!r}".format(spec))
+    return host, int(port), weight
+
+
+def parse_cookies(header):
+    """
+    Parses a ``Cookie`` request header.
+
+    :param header (str): header value.
+
+    :rtype dict: cookie values by name.
+    """
+    cookies = {}
+    for pair in header.split(";"):
+        name, sep, value = pair.strip().partition("=")
+        if sep:
+            cookies[name] = value
+    return cookies
+
+
+class Balancer(abc.ABC):
+    """
+    Abstract base class of the policies: chooses one of a fixed list of
+    upstreams. Policies implement :meth:`choose`.
+
+    :param upstreams (list): ``(host, port, weight)`` tuples.
+    :param args (list): policy arguments from ``dist_policy``.
+    """
+
+    def __init__(self, upstreams, args=()):
+        self.upstreams = upstreams
+        self.args = args
+        self._pools = [upstream_pools.get(host, port) for host, port, _ in upstreams]
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def choose(self, headers, client_ip):
+        """
+        Chooses the upstream of a request.
+
+        :param headers (dict): request headers, lower-case names.
+        :param client_ip (str): address of the client.
+
+        :rtype tuple: (host, port), or None when no upstream is available.
+        """
+
+    def _address(self, i):
+        host, port, _ = self.upstreams[i]
+        return host, port
+
+
+class RoundRobin(Balancer):
+    """Chooses the upstreams in turn."""
+
+    def __init__(self, upstreams, args=()):
+        super().__init__(upstreams, args)
+        self._next = 0
+
+    def choose(self, headers, client_ip):
+        count = len(self.upstreams)
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(count):
+                i = self._next % count
+                self._next += 1
+                if self._pools[i].available(now):
+                    return self._address(i)
+        return None
+
+
+class Weighted(Balancer):
+    """
+    Smooth weighted round-robin: over the sum of the weights, each upstream
+    is chosen as many times as its weight, interleaved rather than in runs.
+    """
+
+    def __init__(self, upstreams, args=()):
+        super().__init__(upstreams, args)
+        self._current = [0] * len(upstreams)
+
+    def choose(self, headers, client_ip):
+        now = time.monotonic()
+        with self._lock:
+            best, total = None, 0
+            for i, (_, _, weight) in enumerate(self.upstreams):
+                if not self._pools[i].available(now):
+                    continue
+                self._current[i] += weight
+                total += weight
+                if best is None or self._current[i] > self._current[best]:
+                    best = i
+            if best is None:
+                return None
+            self._current[best] -= total
+        return self._address(best)
+
+
+class LeastConnections(Balancer):
+    """
+    Chooses the upstream with the fewest requests in flight relative to its
+    weight; ties go to the upstream after the last one chosen.
+    """
+
+    def __init__(self, upstreams, args=()):
+        super().__init__(upstreams, args)
+        self._next = 0
+
+    def choose(self, headers, client_ip):
+        count = len(self.upstreams)
+        now = time.monotonic()
+        with self._lock:
+            start = self._next
+            self._next = (start + 1) % count
+        best, best_load = None, None
+        for offset in range(count):
+            i = (start + offset) % count
+            if not self._pools[i].available(now):
+                continue
+            load = self._pools[i].in_flight / self.upstreams[i][2]
+            if best_load is None or load < best_load:
+                best, best_load = i, load
+        return None if best is None else self._address(best)
+
+
+class ConsistentHash(Balancer):
+    """
+    Consistent hashing of the client IP or of a cookie on a ring holding
+    :data:`HASH_REPLICAS` points per unit of weight of each upstream.
+    Requests without the cookie are hashed on the client IP. When the owner
+    of a point is unavailable the next points of the ring are tried, so only
+    the clients of that upstream move.
+    """
+
+    def __init__(self, upstreams, args=()):
+        super().__init__(upstreams, args)
+        self.cookie = None
+        for arg in args:
+            name, _, value = arg.partition("=")
+            if name == "cookie" and value:
+                self.cookie = value
+            elif name != "ip":
+                raise ValueError("Invalid hash key {!r}, expected ip or cookie=NAME".format(arg))
+        ring = []
+        for i, (host, port, weight) in enumerate(upstreams):
+            for replica in range(HASH_REPLICAS * weight):
+                ring.append((self._hash("{}:{}#{}".format(host, port, replica)), i))
+        ring.sort()
+        self._points = [point for point, _ in ring]
+        self._owners = [owner for _, owner in ring]
+
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def key(self, headers, client_ip):
+        """
+        Returns the value hashed for a request.
+
+        :rtype str: the cookie value, or the client IP.
+        """
+        if self.cookie is not None:
+            value = parse_cookies(headers.get("cookie", "")).get(self.cookie)
+            if value:
+                return value
+        return client_ip or ""
+
+    def choose(self, headers, client_ip):
+        start = bisect.bisect(self._points, self._hash(self.key(headers, client_ip)))
+        now = time.monotonic()
+        tried = set()
+        for offset in range(len(self._owners)):
+            owner = self._owners[(start + offset) % len(self._owners)]
+            if owner in tried:
+                continue
+            if self._pools[owner].available(now):
+                return self._address(owner)
+            tried.add(owner)
+            if len(tried) == len(self.upstreams):
+                break
+        return None
+
+
+#: Balancer class of each ``dist_policy`` name.
+POLICIES = {
+    "round-robin": RoundRobin,
+    "weighted": Weighted,
+    "least-connections": LeastConnections,
+    "hash": ConsistentHash,
+}
+
+_balancers = {}
+_balancers_lock = threading.Lock()
+
+
+def get_balancer(proxy_map, policy):
+    """
+    Returns the balancer of an upstream list, created on first use and then
+    shared by every request routed to the same list with the same policy.
+
+    :param proxy_map (list): ``proxy_pass`` targets, see :func:`parse_upstream`.
+    :param policy (str): ``dist_policy`` value, name and arguments.
+
+    :rtype Balancer: the balancer.
+    :raises ValueError: on an unknown policy or a malformed target.
+    """
+    key = (tuple(proxy_map), policy)
+    balancer = _balancers.get(key)
+    if balancer is None:
+        name, *args = (policy or "round-robin").split()
+        cls = POLICIES.get(name.replace("_", "-"))
+        if cls is None:
+            raise ValueError("Unknown dist_policy {!r}, expected one of {}".format(
+                name, ", ".join(POLICIES)))
+        balancer = cls([parse_upstream(spec) for spec in proxy_map], args)
+        with _balancers_lock:
+            balancer = _balancers.setdefault(key, balancer)
+    return balancer
@@ -0,0 +1,268 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.coalesce
+~~~~~~~~~~~~~~~~~
+
+This module provides the request coalescing (single-flight) of the proxy,
+enabled per ``host`` block of ``config/proxy.conf`` with
+``proxy_coalesce on;``. While a ``GET`` is in flight to an upstream, the
+identical ``GET`` requests routed to the same upstream, with the same vhost
+and request target, wait for its response instead of being forwarded too:
+every browser tab polling ``/get-list`` then costs the backend one request
+per poll period, not one per tab.
+
+The first request of a :class:`Flight <Flight>` is its leader, forwarded as
+usual; the response it relays is recorded and, once complete, sent as is to
+the followers. Requests with a body, ``Authorization``, ``Range`` or
+conditional headers are never coalesced. A follower whose request headers
+differ from the leader's on a header named by the response ``Vary``, or any
+follower when the response sets cookies, is ``private``, is larger than
+:data:`COALESCE_MAX_SIZE` or fails, is forwarded on its own instead.
+
+Both proxy engines use it: handler threads block in :meth:`Flight.wait`,
+the event loop subscribes a callback with :meth:`Flight.subscribe`.
+
+Usage::
+
+  >>> flight, leader = request_coalescer.join(("127.0.0.1", 9000), "app1.local",
+  ...                                         "GET", "/get-list", headers, 0, False)
+  >>> if leader:
+  ...     flight.on_head(status, headers, head)
+  ...     flight.on_body(piece)
+  ...     flight.finish(True)
+  ... else:
+  ...     response = flight.wait(headers)   # None: forward the request itself
+"""
+
+import threading
+
+from .proxycache import parse_cache_control
+from .upstream import UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT
+
+#: Larger responses are not shared: their followers are forwarded on their own.
+COALESCE_MAX_SIZE = 1024 * 1024
+#: Longest wait of a handler thread for the response of its leader.
+COALESCE_TIMEOUT = UPSTREAM_CONNECT_TIMEOUT + UPSTREAM_READ_TIMEOUT
+#: Request headers that make a request unique to its client.
+UNSHARED_REQUEST_HEADERS = ("authorization", "range", "if-none-match", "if-modified-since",
+                            "if-match", "if-unmodified-since", "if-range")
+
+
+def parse_proxy_coalesce(value):
+    """
+    Parses the value of a ``proxy_coalesce`` directive.
+
+    :param value (str): ``on`` or ``off``.
+
+    :rtype bool: whether coalescing is enabled.
+    :raises ValueError: on any other value.
+    """
+    value = value.strip().lower()
+    if value not in ("on", "off"):
+        raise ValueError("Invalid proxy_coalesce {!r}, expected on or off".format(value))
+    return value == "on"
+
+
+def _variant(names, headers):
+    return tuple(" ".join(headers.get(name, "").lower().split()) for name in names)
+
+
+class Flight:
+    """
+    One upstream request in flight and the identical requests waiting for
+    its response.
+
+    :param coalescer (RequestCoalescer): table holding the flight.
+    :param key (tuple): (upstream address, vhost, target).
+    :param headers (dict): request headers of the leader, lower-case names.
+
+    :attrs response (bytes): the response sent to the leader, once complete
+        and shareable, otherwise None.
+    """
+
+    __slots__ = ("coalescer", "key", "headers", "response", "done", "_vary", "_pieces",
+                 "_size", "_callbacks", "_event")
+
+    def __init__(self, coalescer, key, headers):
+        self.coalescer = coalescer
+        self.key = key
+        self.headers = headers
+        self.response = None
+        self.done = False
+        self._vary = ()
+        self._pieces = []
+        self._size = 0
+        self._callbacks = []
+        self._event = threading.Event()
+
+    # Leader side
+
+    def on_head(self, status, headers, head):
+        """
+        Records the response header block sent to the leader.
+
+        :param status (int): response status code.
+        :param headers (dict): response headers, lower-case names.
+        :param head (bytes): bytes sent to the client for the header block.
+        """
+        if self._pieces is None:
+            return
+        vary = tuple(name.strip().lower() for name in headers.get("vary", "").split(",")
+                     if name.strip())
+        directives = parse_cache_control(headers.get("cache-control", ""))
+        if "set-cookie" in headers or "private" in directives or "*" in vary:
+            self._abandon()
+            return
+        self._vary = vary
+        self.on_body(head)
+
+    def on_body(self, piece):
+        """Records a piece of the response sent to the leader."""
+        if self._pieces is None:
+            return
+        self._pieces.append(piece)
+        self._size += len(piece)
+        if self._size > COALESCE_MAX_SIZE:
+            self._abandon()
+
+    def finish(self, complete):
+        """
+        Ends the flight and hands its response to the followers. Calling it
+        again has no effect.
+
+        :param complete (bool): whether the whole response reached the leader.
+        """
+        if self.done:
+            return
+        if complete and self._pieces:
+            self.response = b"".join(self._pieces)
+        self._pieces = None
+        self.done = True
+        self.coalescer._land(self)
+        self._event.set()
+        callbacks, self._callbacks = self._callbacks, []
+        for headers, callback in callbacks:
+            callback(self._share(headers))
+
+    def _abandon(self):
+        # The response cannot be shared: the followers go upstream at once.
+        self._pieces = None
+        self.finish(False)
+
+    # Follower side
+
+    def _share(self, headers):
+        response = self.response
+        if response is not None and _variant(self._vary, headers) != _variant(self._vary, self.headers):
+            response = None
+        self.coalescer.count("coalesced" if response is not None else "fallbacks")
+        return response
+
+    def wait(self, headers, timeout=COALESCE_TIMEOUT):
+        """
+        Blocks until the leader got its response, for handler threads.
+
+        :param headers (dict): request headers of the follower.
+        :param timeout (float): longest wait in seconds.
+
+        :rtype bytes: the response to send, or None to forward the request.
+        """
+        if not self._event.wait(timeout):
+            self.coalescer.count("fallbacks")
+            return None
+        return self._share(headers)
+
+    def subscribe(self, headers, callback):
+        """
+        Calls ``callback`` with the response to send, or None to forward the
+        request, once the leader got its response, for the event loop: the
+        callback runs in the thread of the leader.
+
+        :param headers (dict): request headers of the follower.
+        :param callback (callable): called with one argument.
+        """
+        if self.done:
+            callback(self._share(headers))
+        else:
+            self._callbacks.append((headers, callback))
+
+
+class RequestCoalescer:
+    """
+    The flights in progress, shared by every proxy handler of the process.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.flights = 0
+        self.coalesced = 0
+        self.fallbacks = 0
+
+    def join(self, address, vhost, method, target, headers, length, chunked):
+        """
+        Joins the flight of a request, or starts one.
+
+        :param address (tuple): (host, port) of the chosen upstream.
+        :param vhost (str): hostname of the request.
+        :param method (str): request method.
+        :param target (str): request target, query string included.
+        :param headers (dict): request headers, lower-case names.
+        :param length (int): ``Content-Length`` of the request.
+        :param chunked (bool): whether the request body is chunked.
+
+        :rtype tuple: (flight, leader), leader True when the request starts
+            the flight; (None, False) when the request cannot be coalesced.
+        """
+        if method != "GET" or length or chunked \
+                or any(name in headers for name in UNSHARED_REQUEST_HEADERS):
+            return None, False
+        key = (address, vhost, target)
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._flights[key] = Flight(self, key, headers)
+            self.flights += 1
+            return flight, True
+
+    def _land(self, flight):
+        # Later identical requests start a new flight.
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+
+    def count(self, counter):
+        """Increments one of the follower counters."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        """
+        Returns a snapshot of the coalescing counters.
+
+        :rtype dict: flights in progress, flights started, followers served
+            from a flight, and followers forwarded on their own.
+        """
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "flights": self.flights,
+                "coalesced": self.coalesced,
+                "fallbacks": self.fallbacks,
+            }
+
+
+#: Flights shared by every proxy handler of the process.
+request_coalescer = RequestCoalescer()
@@ -0,0 +1,117 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.compression
+~~~~~~~~~~~~~~~~~
+
+This module provides the gzip content negotiation shared by the response
+paths. Static files get a gzip variant computed once and kept next to the
+identity version in the :mod:`static cache <daemon.staticcache>`; JSON bodies
+of WeApRous handlers are compressed on the fly when they are large enough.
+Every response whose body may be compressed carries ``Vary: Accept-Encoding``.
+
+Usage::
+
+  >>> if accepts_gzip(request.headers):
+  ...     body = gzip_compress(body)
+"""
+
+import gzip
+import zlib
+
+#: zlib compression level, 1 (fastest) to 9 (smallest); 0 disables compression.
+GZIP_LEVEL = 6
+#: Bodies smaller than this are never compressed.
+GZIP_MIN_SIZE = 1024
+#: MIME types worth compressing; images, audio and video already are.
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript",
+                      "application/xml", "image/svg+xml")
+
+
+def set_gzip_level(level):
+    """
+    Sets the compression level used for new gzip bodies.
+
+    :param level (int): 0 to 9, 0 disabling compression.
+
+    :raises ValueError: if the level is out of range.
+    """
+    global GZIP_LEVEL
+    if not 0 <= level <= 9:
+        raise ValueError("Invalid gzip level {}, expected 0 to 9".format(level))
+    GZIP_LEVEL = level
+
+
+def is_compressible(mime_type, size):
+    """
+    Tells whether a body is worth compressing.
+
+    :param mime_type (str): MIME type of the body, without parameters.
+    :param size (int): body length.
+
+    :rtype bool: True for a large enough body of a compressible type.
+    """
+    return GZIP_LEVEL > 0 and size >= GZIP_MIN_SIZE and mime_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def accepts_gzip(headers):
+    """
+    Evaluates the ``Accept-Encoding`` header of a request.
+
+    :param headers (dict): request headers, lowercase names.
+
+    :rtype bool: True when the client accepts a gzip body.
+    """
+    value = headers.get("accept-encoding")
+    if not value:
+        return False
+    wildcard = None
+    for item in value.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding in ("gzip", "x-gzip"):
+            return q > 0
+        if coding == "*":
+            wildcard = q > 0
+    return bool(wildcard)
+
+
+def gzip_compress(data, level=None):
+    """
+    Compresses a whole body. The gzip header carries no timestamp, so the
+    same content always gives the same bytes.
+
+    :param data (bytes): body.
+    :param level (int): compression level, :data:`GZIP_LEVEL` by default.
+
+    :rtype bytes: gzip data.
+    """
+    return gzip.compress(data, GZIP_LEVEL if level is None else level, mtime=0)
+
+
+def gzip_encoder(level=None):
+    """
+    Creates an incremental gzip compressor for a streamed body.
+
+    :param level (int): compression level, :data:`GZIP_LEVEL` by default.
+
+    :rtype zlib.Compress: compressor writing the gzip format.
+    """
+    return zlib.compressobj(GZIP_LEVEL if level is None else level, zlib.DEFLATED, 31)
@@ -0,0 +1,399 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.eventloop
+~~~~~~~~~~~~~~~~~
+
+This module provides a non-blocking backend engine built on :mod:`selectors`.
+A single event-loop thread accepts connections, reads requests and writes
+responses, so an idle or slow client only costs a registered socket instead
+of a whole thread. Connections are kept alive between requests following
+:meth:`HttpAdapter.keep_alive <daemon.httpadapter.HttpAdapter.keep_alive>`.
+
+Requests are dispatched on a :class:`WorkerPool <daemon.backend.WorkerPool>`:
+WeApRous route handlers may block on the network, and built-in endpoints and
+static files read JSON files and stat or open files on disk. Their responses
+are handed back to the loop through a completion queue and a wake-up socket
+pair, so a slow disk only delays the request waiting for it.
+
+Usage Example:
+--------------
+>>> create_backend("127.0.0.1", 9000, routes={}, mode="eventloop")
+
+"""
+
+import collections
+import errno
+import os
+import selectors
+import socket
+import time
+
+from .backend import WorkerPool, _server_state, RETRY_AFTER
+from .httpadapter import HttpAdapter, compile_routes, finalize_response, KEEPALIVE_TIMEOUT
+from .httpparser import HttpParseError, MAX_BODY_SIZE
+from .response import Response, StreamingResponse, FileResponse
+
+#: Bytes read from a client socket per readiness event.
+RECV_SIZE = 65536
+#: Seconds a new connection may stay open without completing its first request.
+IDLE_TIMEOUT = 30
+#: Seconds a client may go without accepting any byte of a response being written.
+WRITE_TIMEOUT = 30
+#: Seconds between two sweeps for idle connections.
+SWEEP_INTERVAL = 1.0
+#: ``os.sendfile`` errors meaning the socket or file does not support it.
+SENDFILE_UNSUPPORTED = (errno.EINVAL, errno.ENOSYS, errno.ENOTSOCK, errno.EOPNOTSUPP)
+
+
+class _Connection:
+    """Per-socket state kept by the event loop."""
+
+    __slots__ = ("sock", "addr", "adapter", "parser", "outbuf", "stream", "chunks", "file",
+                 "use_sendfile", "busy", "last_active", "served", "keep_alive", "events")
+
+    def __init__(self, sock, addr, adapter):
+        self.sock = sock
+        self.addr = addr
+        self.adapter = adapter
+        self.parser = adapter.new_parser()
+        self.outbuf = bytearray()
+        self.stream = None
+        self.chunks = None
+        self.file = None
+        self.use_sendfile = hasattr(os, "sendfile")
+        self.busy = False
+        self.last_active = time.monotonic()
+        self.served = 0
+        self.keep_alive = False
+        self.events = 0
+
+
+class EventLoopServer:
+    """
+    A single-threaded :mod:`selectors` HTTP server dispatching requests on a
+    worker pool.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param pool_size (int): number of dispatch threads.
+    :param queue_size (int): maximum number of requests waiting for a thread.
+    :param reuse_port (bool): bind with ``SO_REUSEPORT``.
+    :param max_body_size (int): largest accepted request body.
+    """
+
+    def __init__(self, ip, port, routes, pool_size, queue_size, reuse_port=False,
+                 max_body_size=MAX_BODY_SIZE):
+        self.ip = ip
+        self.port = port
+        self.routes = routes
+        self.router = compile_routes(routes)
+        self.reuse_port = reuse_port
+        self.max_body_size = max_body_size
+        self.pool = WorkerPool(pool_size, queue_size, name="eventloop-worker")
+        self.selector = selectors.DefaultSelector()
+        self.connections = {}
+        self.completions = collections.deque()
+        self.ready = collections.deque()
+        self.accepted = 0
+        self.wake_r, self.wake_w = socket.socketpair()
+        self.wake_r.setblocking(False)
+        self.wake_w.setblocking(False)
+
+    def serve_forever(self):
+        """Binds the listening socket and runs the event loop forever."""
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.reuse_port:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        server.bind((self.ip, self.port))
+        server.listen(1024)
+        server.setblocking(False)
+        self.selector.register(server, selectors.EVENT_READ, "accept")
+        self.selector.register(self.wake_r, selectors.EVENT_READ, "wake")
+        print("[Backend] Event loop listening on port {}".format(self.port))
+
+        next_sweep = time.monotonic() + SWEEP_INTERVAL
+        while True:
+            for key, mask in self.selector.select(SWEEP_INTERVAL):
+                if key.data == "accept":
+                    self._accept(server)
+                elif key.data == "wake":
+                    self._drain_completions()
+                else:
+                    conn = key.data
+                    if mask & selectors.EVENT_READ:
+                        self._read(conn)
+                    if mask & selectors.EVENT_WRITE and conn.sock is not None:
+                        self._write(conn)
+            while self.ready:
+                conn = self.ready.popleft()
+                if conn.sock is not None and not conn.busy:
+                    self._next_request(conn)
+            now = time.monotonic()
+            if now >= next_sweep:
+                self._sweep(now)
+                next_sweep = now + SWEEP_INTERVAL
+
+    def _accept(self, server):
+        while True:
+            try:
+                sock, addr = server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            sock.setblocking(False)
+            adapter = HttpAdapter(self.ip, self.port, sock, addr, self.routes, self.max_body_size,
+                                  self.router)
+            conn = _Connection(sock, addr, adapter)
+            self.connections[sock.fileno()] = conn
+            self._watch(conn, selectors.EVENT_READ)
+            self.accepted += 1
+
+    def _read(self, conn):
+        try:
+            data = conn.sock.recv(RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self._close(conn)
+            return
+        if not data:
+            self._close(conn)
+            return
+        conn.last_active = time.monotonic()
+        conn.parser.feed(data)
+        if not conn.busy:
+            self._next_request(conn)
+        elif conn.parser.pending():
+            # A pipelined request waits for the response in progress: stop
+            # reading until then, so at most one recv is buffered.
+            self._watch(conn, 0)
+
+    def _next_request(self, conn):
+        try:
+            message = conn.parser.next_message()
+        except HttpParseError as e:
+            print("[Backend] Bad request from {}: {}".format(conn.addr, e))
+            conn.busy = True
+            conn.keep_alive = False
+            conn.outbuf += conn.adapter.parse_error_response(e)
+            self._write(conn)
+            if conn.sock is not None:
+                self._watch(conn, selectors.EVENT_WRITE)
+            return
+        if message is not None:
+            self._start_request(conn, message)
+
+    def _start_request(self, conn, message):
+        conn.busy = True
+        conn.served += 1
+        adapter = conn.adapter
+        try:
+            adapter.parse_request(message, self.routes)
+        except Exception as e:
+            print("[Backend] Error preparing request from {}: {}".format(conn.addr, e))
+            conn.keep_alive = False
+            self._finish(conn, adapter.response.build_notfound())
+            return
+        conn.keep_alive = adapter.keep_alive(conn.served)
+        if not self.pool.submit(self._run_dispatch, conn):
+            print("[Backend] Dispatch queue full, rejecting {}".format(conn.addr))
+            conn.keep_alive = False
+            self._finish(conn, Response().build_unavailable(RETRY_AFTER))
+
+    def _run_dispatch(self, conn):
+        # Runs on a worker thread; the result is handed back to the loop.
+        try:
+            response = conn.adapter.dispatch()
+        except Exception as e:
+            print("[Backend] Error dispatching request from {}: {}".format(conn.addr, e))
+            response = conn.adapter.response.build_notfound()
+        self.completions.append((conn, response))
+        try:
+            self.wake_w.send(b"\0")
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def _drain_completions(self):
+        try:
+            while self.wake_r.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        while self.completions:
+            conn, response = self.completions.popleft()
+            if conn.sock is not None:
+                self._finish(conn, response)
+
+    def _finish(self, conn, response):
+        response = finalize_response(response, conn.keep_alive, conn.served)
+        if isinstance(response, StreamingResponse):
+            conn.stream = response
+            conn.chunks = iter(response)
+            self._pull(conn)
+        elif isinstance(response, FileResponse):
+            conn.outbuf += response.head
+            conn.file = response
+        else:
+            conn.outbuf += response
+        self._write(conn)
+        if conn.sock is not None and (conn.outbuf or conn.file is not None):
+            self._watch(conn, selectors.EVENT_WRITE)
+
+    def _pull(self, conn):
+        # Moves the next piece of a streamed response into the output buffer,
+        # so what is ready goes out at once. The body iterable runs on the
+        # loop thread, so it should not block.
+        for piece in conn.chunks:
+            conn.outbuf += piece
+            return
+        if conn.stream.failed:
+            conn.keep_alive = False
+        conn.stream = None
+        conn.chunks = None
+
+    def _send_file(self, conn):
+        # Moves the next part of a file response out: bytes parts go to the
+        # output buffer, file segments are sent from the descriptor, or read
+        # into the output buffer when sendfile is not supported.
+        response = conn.file
+        conn.outbuf += response.take_bytes()
+        segment = response.segment()
+        if segment is not None and not conn.outbuf:
+            if conn.use_sendfile:
+                try:
+                    sent = os.sendfile(conn.sock.fileno(), response.file.fileno(), *segment)
+                except (BlockingIOError, InterruptedError):
+                    return
+                except OSError as e:
+                    if e.errno not in SENDFILE_UNSUPPORTED:
+                        raise
+                    conn.use_sendfile = False
+                else:
+                    if sent:
+                        response.advance(sent)
+                    else:
+                        response.mark_truncated()
+            if not conn.use_sendfile:
+                conn.outbuf += response.read_chunk()
+        if response.done:
+            if response.failed:
+                print("[Backend] {} ended before its announced length".format(response.file.name))
+                conn.keep_alive = False
+            response.close()
+            conn.file = None
+
+    def _write(self, conn):
+        if conn.outbuf:
+            try:
+                sent = conn.sock.send(conn.outbuf)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                self._close(conn)
+                return
+            del conn.outbuf[:sent]
+        conn.last_active = time.monotonic()
+        if not conn.outbuf and conn.chunks is not None:
+            self._pull(conn)
+        if not conn.outbuf and conn.file is not None:
+            try:
+                self._send_file(conn)
+            except OSError:
+                self._close(conn)
+                return
+        if conn.outbuf or conn.file is not None:
+            return
+        if not conn.keep_alive:
+            self._close(conn)
+            return
+        # Persistent connection: wait for the next request, which may already
+        # be buffered; it is started from the main loop to keep the stack flat.
+        conn.busy = False
+        self._watch(conn, selectors.EVENT_READ)
+        if conn.parser.pending():
+            self.ready.append(conn)
+
+    def _watch(self, conn, events):
+        # Sets the events the socket waits for, none to pause it.
+        if events == conn.events:
+            return
+        if not events:
+            self.selector.unregister(conn.sock)
+        elif not conn.events:
+            self.selector.register(conn.sock, events, conn)
+        else:
+            self.selector.modify(conn.sock, events, conn)
+        conn.events = events
+
+    def _close(self, conn):
+        if conn.sock is None:
+            return
+        self.connections.pop(conn.sock.fileno(), None)
+        if conn.events:
+            self.selector.unregister(conn.sock)
+            conn.events = 0
+        conn.sock.close()
+        conn.sock = None
+        conn.stream = None
+        conn.chunks = None
+        if conn.file is not None:
+            conn.file.close()
+            conn.file = None
+
+    def _sweep(self, now):
+        for conn in list(self.connections.values()):
+            idle = now - conn.last_active
+            if conn.busy:
+                # A handler may take its time, a client not reading may not.
+                writing = conn.outbuf or conn.file is not None or conn.chunks is not None
+                if writing and idle > WRITE_TIMEOUT:
+                    print("[Backend] Client {} stopped reading, closing".format(conn.addr))
+                    self._close(conn)
+            elif idle > (IDLE_TIMEOUT if conn.served == 0 else KEEPALIVE_TIMEOUT):
+                self._close(conn)
+
+    def stats(self):
+        """
+        Returns a snapshot of the loop counters.
+
+        :rtype dict: open and accepted connection counts.
+        """
+        return {
+            "open_connections": len(self.connections),
+            "accepted": self.accepted,
+        }
+
+
+def run_eventloop(ip, port, routes, pool_size, queue_size, reuse_port=False,
+                  max_body_size=MAX_BODY_SIZE):
+    """
+    Starts the event-loop backend and serves requests forever.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param pool_size (int): number of dispatch threads.
+    :param queue_size (int): maximum number of requests waiting for a thread.
+    :param reuse_port (bool): bind with ``SO_REUSEPORT``.
+    :param max_body_size (int): largest accepted request body.
+    """
+    server = EventLoopServer(ip, port, routes, pool_size, queue_size, reuse_port, max_body_size)
+    _server_state["mode"] = "eventloop"
+    _server_state["pool"] = server.pool
+    _server_state["engine"] = server
+    try:
+        server.serve_forever()
+    except socket.error as e:
+        print("Socket error: {}".format(e))
@@ -20,14 +20,152 @@ raw URL paths and RESTful route definitions, and integrates with
 Request and Response objects to handle client-server communication.
 """
 
+import io
 import os
-from .request import Request
-from .response import Response
+import json
+import time
+import socket
+import asyncio
+import inspect
+import threading
+import traceback
+import urllib.parse
+from .request import Request, current_request
+from .httpparser import RequestParser, HttpParseError, BodyTooLarge, MAX_BODY_SIZE
+from .response import Response, StreamingResponse, FileResponse, cache_policy, not_modified
+from .router import Router
+from .staticcache import static_cache
+from .compression import accepts_gzip, gzip_compress
+from .httpwriter import build_head, build_message, status_line, date_line, TEXT_HTML, APPLICATION_JSON
+from . import compression
+from . import backend
 from .dictionary import CaseInsensitiveDict
 
 _global_list = []
 peer_list = {}
 PEER_CONNECTION_FILE = os.path.join("db", "peer_connections.json")
+
+#: Seconds to wait for the first request on a new connection.
+FIRST_REQUEST_TIMEOUT = 2.0
+#: Seconds a started request has to send its complete head.
+REQUEST_TIMEOUT = 10
+#: Seconds a request body may stall between two reads.
+BODY_READ_TIMEOUT = 10
+#: Bytes read from the client socket per recv call.
+RECV_SIZE = 65536
+#: Seconds an idle persistent connection waits for its next request.
+KEEPALIVE_TIMEOUT = 5
+#: Maximum number of requests served on one persistent connection.
+KEEPALIVE_MAX = 100
+#: Maximum number of pipelined responses held back before they are sent.
+PIPELINE_MAX = 16
+
+
+def finalize_response(response, keep_alive, served=1):
+    """
+    Sets the connection management headers of a complete response.
+
+    Any ``Connection``/``Keep-Alive`` header written by a handler is replaced
+    and ``Content-Length`` is recomputed from the actual body, so the client
+    can find the end of the response without waiting for the socket to close.
+    A :class:`StreamingResponse <daemon.response.StreamingResponse>` keeps its
+    ``Transfer-Encoding: chunked`` framing instead, and a :class:`FileResponse
+    <daemon.response.FileResponse>` the length of its file.
+
+    :param response (bytes, StreamingResponse or FileResponse): full response, headers and body.
+    :param keep_alive (bool): whether the connection stays open.
+    :param served (int): requests answered so far on the connection.
+
+    :rtype bytes, StreamingResponse or FileResponse: the response with its headers rewritten.
+    """
+    if isinstance(response, StreamingResponse):
+        response.head = _connection_head(response.head[:-4], None, keep_alive, served)
+        return response
+    if isinstance(response, FileResponse):
+        response.head = _connection_head(response.head[:-4], response.length, keep_alive, served)
+        return response
+
+    header_end = response.find(b"\r\n\r\n")
+    if header_end == -1:
+        return response
+    body = response[header_end + 4:]
+    return _connection_head(response[:header_end], len(body), keep_alive, served) + body
+
+
+def _connection_head(head, length, keep_alive, served):
+    """
+    Rewrites the framing and connection headers of a header block.
+
+    :param head (bytes): header block without its final CRLF CRLF.
+    :param length (int): body length, or None for a chunked body.
+    :param keep_alive (bool): whether the connection stays open.
+    :param served (int): requests answered so far on the connection.
+
+    :rtype bytes: the header block ending with CRLF CRLF.
+    """
+    head = head.split(b"\r\n")
+    lines = [head[0]]
+    for line in head[1:]:
+        name = line.split(b":", 1)[0].strip().lower()
+        if name not in (b"connection", b"keep-alive", b"content-length", b"transfer-encoding"):
+            lines.append(line)
+
+    if length is None:
+        lines.append(b"Transfer-Encoding: chunked")
+    else:
+        status = head[0].split(b" ", 2)[1] if head[0].count(b" ") else b""
+        if status not in (b"204", b"304") and not status.startswith(b"1"):
+            lines.append(b"Content-Length: %d" % length)
+    if keep_alive:
+        lines.append(b"Connection: keep-alive")
+        lines.append(b"Keep-Alive: timeout=%d, max=%d" % (KEEPALIVE_TIMEOUT, KEEPALIVE_MAX - served))
+    else:
+        lines.append(b"Connection: close")
+    return b"\r\n".join(lines) + b"\r\n\r\n"
+
+#: Built-in endpoints registered with :func:`tracker_route`, as
+#: ``(method, path, prefix, function)``.
+TRACKER_ROUTES = []
+
+
+def tracker_route(method, *paths, prefix=False):
+    """
+    Registers an :class:`HttpAdapter` method as the built-in endpoint for
+    ``method`` and ``paths``.
+
+    :param method (str): HTTP verb.
+    :param paths (str): request paths served by the method.
+    :param prefix (bool): also serve every path starting with one of ``paths``.
+    """
+    def decorator(func):
+        for path in paths:
+            TRACKER_ROUTES.append((method, path, prefix, func))
+        return func
+    return decorator
+
+
+def compile_routes(routes):
+    """
+    Returns the :class:`Router <daemon.router.Router>` merging the built-in
+    endpoints with the WeApRous ``routes``, which take precedence. The servers
+    call it once at startup, when the route table is final, and share the
+    result with every connection.
+
+    :param routes (dict): Mapping of route keys to handler functions.
+
+    :rtype Router: the compiled route table.
+    """
+    router = Router()
+    for method, path, prefix, func in TRACKER_ROUTES:
+        if prefix:
+            router.add_prefix(method, path, func, builtin=True)
+        else:
+            router.add(method, path, func, builtin=True)
+    for (method, path), handler in routes.items():
+        router.add(method, path, handler)
+    return router
+
+
 class HttpAdapter:
     """
     A mutable :class:`HTTP adapter <HTTP adapter>` for managing client connections
@@ -44,6 +182,7 @@ class HttpAdapter:
         conn (socket): Active socket connection.
         connaddr (tuple): Address of the connected client.
         routes (dict): Mapping of route paths to handler functions.
+        router (Router): the compiled route table, see :func:`compile_routes`.
         request (Request): Request object for parsing incoming data.
         response (Response): Response object for building and sending replies.
     """
@@ -54,843 +193,909 @@ class HttpAdapter:
         "conn",
         "connaddr",
         "routes",
+        "router",
         "request",
         "response",
+        "endpoint",
+        "max_body_size",
     ]
 
-    def __init__(self, ip, port, conn, connaddr, routes):
+    def __init__(self, ip, port, conn, connaddr, routes, max_body_size=MAX_BODY_SIZE, router=None):
         self.ip = ip
         self.port = port
         self.conn = conn
         self.connaddr = connaddr
         self.routes = routes
+        self.router = router if router is not None else compile_routes(routes)
+        self.max_body_size = max_body_size
         self.request = Request()
         self.response = Response()
-
-    def handle_client(self, conn, addr, routes):
-        from . import backend
-        import socket
-        import os
-        import time
-        import urllib.parse
-    
-        import json
-        from . import handler_login
-        from .session_store import get_user_from_session
-
+        self.endpoint = None
+
+    def handle_client(self, conn, addr, routes, idle=None):
+        """
+        Serves the client connection. Requests are received, dispatched and
+        answered in turn for as long as the connection is kept alive, see
+        :meth:`keep_alive`.
+
+        Pipelined requests, sent before the previous response was read, are
+        answered in order. Their responses are collected and written with a
+        single ``sendall`` once no further complete request is buffered.
+
+        :param conn (socket.socket): Client connection socket.
+        :param addr (tuple): client address (IP, port).
+        :param routes (dict): Mapping of route keys to handler functions.
+        :param idle (IdleConnections): where a kept-alive connection waits for
+            its next request in ``pool`` mode, instead of holding the thread.
+        """
         self.conn = conn
         self.connaddr = addr
-        req = self.request
-        resp = self.response
-
-        msg = b""
-        conn.settimeout(0.5)
-        deadline = time.time() + 2.0
-        raw_req = ""
-
-        handled = False
+        self.routes = routes
+        self.serve(conn, self.new_parser(), 0, idle)
+
+    def serve(self, conn, parser, served, idle=None):
+        """
+        Answers the requests of the connection until it closes, or, with
+        ``idle`` set, until it is kept alive with nothing buffered: the socket
+        is then parked in ``idle``, which calls :meth:`serve` again from a
+        worker once the next request starts to arrive.
+
+        :param conn (socket.socket): Client connection socket.
+        :param parser (RequestParser): the connection's parser.
+        :param served (int): number of requests answered on this connection.
+        :param idle (IdleConnections, optional): idle connection watcher.
+        """
+        addr = self.connaddr
+        pending = []
+        parked = False
 
-        while True:
-            try:
-                chunk = conn.recv(4096)
-                if not chunk:
-                    break
-                msg += chunk
-            except socket.timeout:
-                if time.time() > deadline:
+        try:
+            while True:
+                try:
+                    message = parser.next_message()
+                    if message is None:
+                        # Nothing more buffered: answer what was pipelined before waiting.
+                        self.flush(conn, pending)
+                        if idle is not None and served > 0 and not parser.pending():
+                            idle.park(self, conn, parser, served, KEEPALIVE_TIMEOUT)
+                            parked = True
+                            return
+                        message = self.receive(conn, parser, FIRST_REQUEST_TIMEOUT if served == 0 else KEEPALIVE_TIMEOUT)
+                except HttpParseError as e:
+                    print(f"[HttpAdapter] Bad request from {addr}: {e}")
+                    pending.append(self.parse_error_response(e))
                     break
-                continue
-
-            try:
-                raw_req = msg.decode(errors="ignore")
-            except Exception:
-                raw_req = ""
-
-            header_end = raw_req.find("\r\n\r\n")
-            if header_end == -1:
-                if time.time() > deadline:
+                if message is None:
                     break
+                served += 1
+                response = self.handle_request(message, self.routes)
+                keep_alive = self.keep_alive(served)
+                response = finalize_response(response, keep_alive, served)
+                if isinstance(response, StreamingResponse):
+                    self.flush(conn, pending)
+                    for piece in response:
+                        conn.sendall(piece)
+                    if response.failed:
+                        break
+                elif isinstance(response, FileResponse):
+                    self.flush(conn, pending)
+                    response.send(conn)
+                    if response.failed:
+                        break
                 else:
-                    continue
-
-            headers_part = raw_req[:header_end]
-            content_len = 0
-            for line in headers_part.split("\r\n"):
-                if line.lower().startswith("content-length:"):
-                    try:
-                        content_len = int(line.split(":", 1)[1].strip())
-                    except Exception:
-                        content_len = 0
+                    pending.append(response)
+                if not keep_alive:
                     break
+                if len(pending) >= PIPELINE_MAX:
+                    self.flush(conn, pending)
+            self.flush(conn, pending)
+        except OSError as e:
+            print(f"[HttpAdapter] Connection error with {addr}: {e}")
+        finally:
+            if not parked:
+                conn.close()
 
-            body_bytes_len = len(msg) - (header_end + 4)
-            if content_len == 0 or body_bytes_len >= content_len:
-                break
-
-            if time.time() > deadline:
-                break
-            deadline = max(deadline, time.time() + 2.0)
-            continue
+    def new_parser(self):
+        """
+        Creates the request parser of a new connection.
+
+        :rtype RequestParser: parser enforcing :attr:`max_body_size`.
+        """
+        return RequestParser(max_body_size=self.max_body_size)
+
+    def parse_error_response(self, error):
+        """
+        Builds the response to a request the parser refused.
+
+        :param error (HttpParseError): the parser error.
+
+        :rtype bytes: a 413 response for an oversized body, otherwise a 400.
+        """
+        if isinstance(error, BodyTooLarge):
+            return self.response.build_payload_too_large()
+        return self.response.build_bad_request()
+
+    def flush(self, conn, pending):
+        """
+        Sends the responses waiting in ``pending``, in order, and empties it.
+
+        :param conn (socket.socket): Client connection socket.
+        :param pending (list): encoded responses not sent yet.
+        """
+        if pending:
+            conn.sendall(b"".join(pending))
+            pending.clear()
+
+    def receive(self, conn, parser, idle_timeout):
+        """
+        Receives one request from the client socket. The call returns as soon
+        as the parser holds a complete request; bytes received past it stay
+        in the parser. The request head must arrive within
+        :data:`REQUEST_TIMEOUT`, the body may then take as long as it keeps
+        flowing, with at most :data:`BODY_READ_TIMEOUT` between two reads.
+
+        :param conn (socket.socket): Client connection socket.
+        :param parser (RequestParser): the connection's parser.
+        :param idle_timeout (float): seconds to wait for the request to start.
+
+        :rtype ParsedRequest: the request, None if the client closed or timed out.
+        :raises HttpParseError: if the client sent a malformed request.
+        """
+        deadline = None
+        while True:
+            message = parser.next_message()
+            if message is not None:
+                return message
+
+            if parser.in_body():
+                timeout = BODY_READ_TIMEOUT
+            elif parser.pending():
+                # A request has started: its head must be complete within REQUEST_TIMEOUT.
+                if deadline is None:
+                    deadline = time.monotonic() + REQUEST_TIMEOUT
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    return None
+            else:
+                timeout = idle_timeout
 
-        try:
-            raw_req = msg.decode(errors="ignore")
-        except Exception:
-            raw_req = ""
+            conn.settimeout(timeout)
+            try:
+                chunk = conn.recv(RECV_SIZE)
+            except socket.timeout:
+                return None
+            if not chunk:
+                return None
+            parser.feed(chunk)
 
-        try:
-            first_line = raw_req.splitlines()[0] if raw_req else ""
-        except Exception:
-            first_line = ""
+    def keep_alive(self, served):
+        """
+        Decides whether the connection stays open after answering the request
+        prepared last. HTTP/1.1 connections persist unless the client sent
+        ``Connection: close``, HTTP/1.0 ones only on ``Connection: keep-alive``.
 
-        if first_line.startswith("POST /login"):
-            print(f"[HttpAdapter] recv bytes={len(msg)} header_end={raw_req.find('\\r\\n\\r\\n')}")
+        :param served (int): number of requests answered on this connection.
 
-        req.prepare(raw_req, routes)
-        
-        # Debug: in ra cookie header từ raw request nếu là GET /
+        :rtype bool: True to wait for another request.
+        """
+        req = self.request
+        if served >= KEEPALIVE_MAX:
+            return False
+        connection = (req.headers or {}).get("connection", "").lower()
+        if req.version == "HTTP/1.0":
+            return "keep-alive" in connection
+        return "close" not in connection
+
+    def handle_request(self, message, routes):
+        """
+        Prepares a complete request and returns the full response bytes.
+
+        :param message (ParsedRequest): request produced by the parser.
+        :param routes (dict): Mapping of route keys to handler functions.
+
+        :rtype bytes: encoded HTTP response.
+        """
+        self.parse_request(message, routes)
+        return self.dispatch()
+
+    def parse_request(self, message, routes):
+        """
+        Prepares :attr:`request` from a parsed request and looks its route up
+        in :attr:`router`. After this call
+        ``self.request.hook`` holds the matching WeApRous handler and
+        :attr:`endpoint` the matching built-in endpoint, if any.
+
+        :param message (ParsedRequest): request produced by the parser.
+        :param routes (dict): Mapping of route keys to handler functions.
+
+        :rtype Request: the prepared request.
+        """
+        req = self.request
+        req.prepare(message)
+        handler, builtin = self.router.match(req.method, req.path)
+        req.routes = routes
+        req.hook = None if builtin else handler
+        self.endpoint = handler if builtin else None
+
+        if getattr(req.hook, "_route_stream", False):
+            if req.stream is None:
+                req.stream = io.BytesIO(req.body)
+        elif req.stream is not None:
+            # Only streaming handlers read the spooled body as a file.
+            req.body = req.stream.read()
+            req.stream.close()
+            req.stream = None
+
+        return req
+
+    def route_guard(self):
+        """
+        Checks whether the prepared request may reach its WeApRous route.
+
+        :rtype bytes: a 401 response when login is required, otherwise None.
+        """
+        req = self.request
+        # Kiểm tra authentication cho các route cần đăng nhập
         if req.method == "GET" and req.path in ("/", "/index", "/index.html"):
-            # Tìm cookie trong raw request
-            cookie_line = None
-            for line in raw_req.split('\r\n'):
-                if line.lower().startswith('cookie:'):
-                    cookie_line = line
-                    break
-            if cookie_line:
-                print(f"[HttpAdapter] Raw Cookie header from request: {cookie_line}")
-            else:
-                print(f"[HttpAdapter] No Cookie header found in raw request")
-
-        if req.path == "/favicon.ico":
-            print("[HttpAdapter] Handling /favicon.ico request (204 No Content)")
-            headers = (
-                "HTTP/1.1 204 No Content\r\n"
-                "Connection: close\r\n\r\n"
-            )
-            conn.sendall(headers.encode())
-            conn.close()
-            return # Kết thúc ngay lập tức
-        
-        handler = routes.get((req.method, req.path)) 
-        
-        if handler:
-            print(f"[HttpAdapter] Found WeApRous route: {handler.__name__} for {req.method} {req.path}")
-            
-            # Kiểm tra authentication cho các route cần đăng nhập
-            if req.method == "GET" and req.path in ("/", "/index", "/index.html"):
-                # Debug: in ra raw request headers để kiểm tra cookie
-                print(f"[HttpAdapter] GET / - Raw request headers:")
-                if req.headers:
-                    for key, value in req.headers.items():
-                        if 'cookie' in key.lower():
-                            print(f"  {key}: {value}")
-                
-                auth_val = ""
-                try:
-                    print(f"[HttpAdapter] GET / cookies dict: {req.cookies}")
-                    print(f"[HttpAdapter] GET / cookies type: {type(req.cookies)}")
-                    if req.cookies:
-                        auth_val = req.cookies.get("auth", "")
-                        if isinstance(auth_val, str):
-                            auth_val = auth_val.lower()
-                    #print(f"[HttpAdapter] GET / auth_val: '{auth_val}'")
-                except Exception as e:
-                    import traceback
-                    print(f"[HttpAdapter] Error reading cookies: {e}")
-                    print(f"[HttpAdapter] Traceback: {traceback.format_exc()}")
-                    auth_val = ""
-                
-                if auth_val != "true":
-                    # Chưa đăng nhập, trả về 401
-                    body = "<h1>401 Unauthorized</h1><p>Login required. <a href=\"/login\">Login</a></p>"
-                    headers = ("HTTP/1.1 401 Unauthorized\r\n"
-                               "Content-Type: text/html; charset=utf-8\r\n"
-                               "Content-Length: {}\r\n"
-                               "Connection: close\r\n"
-                               "\r\n").format(len(body))
-                    conn.sendall(headers.encode() + body.encode())
-                    conn.close()
-                    return
-            
+            auth_val = ""
             try:
-                # Lấy body cho POST/PUT
-                body = ""
-                if req.method in ("POST", "PUT"):
-                    header_end = raw_req.find("\r\n\r\n")
-                    if header_end != -1:
-                        content_len = 0
-                        for line in raw_req[:header_end].split("\r\n"):
-                            if line.lower().startswith("content-length:"):
-                                content_len = int(line.split(":", 1)[1].strip())
-                                break
-                        if content_len > 0:
-                            start = header_end + 4
-                            body_bytes = msg[start:start + content_len]
-                            body = body_bytes.decode("utf-8", errors="ignore")
-                
-                # *** GỌI HÀM CỦA BẠN (VÍ DỤ: home(), login_page(), add_list()) ***
-                # Logic (ví dụ: print("HELLLOO...")) của bạn sẽ chạy ở đây
-                # Truyền request object vào handler nếu handler cần cookie
-                # Tạm thời lưu req vào handler context để có thể truy cập
-                import threading
-                threading.current_thread().request_obj = req
-                print(f"[HttpAdapter] Saved request object to thread. Cookies: {req.cookies if req.cookies else 'None'}")
-                result = handler(body) 
-
-                # Xử lý kết quả trả về (HTML hoặc JSON)
-                if isinstance(result, dict): # Nếu là JSON
-                    body_resp = json.dumps(result, ensure_ascii=False)
-                    headers = f"HTTP/1.1 200 OK\r\nContent-Type: application/json; charset=utf-8\r\nContent-Length: {len(body_resp.encode('utf-8'))}\r\nConnection: close\r\n\r\n"
-                    conn.sendall(headers.encode() + body_resp.encode('utf-8'))
-                else: # Nếu là HTML (string)
-                    body_resp = result.encode("utf-8")
-                    headers = f"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\nContent-Length: {len(body_resp)}\r\nConnection: close\r\n\r\n"
-                    conn.sendall(headers.encode() + body_resp)
-                
-                conn.close()
-                return # Đã xử lý xong bằng WeApRous
-            
+                if req.cookies:
+                    auth_val = req.cookies.get("auth", "")
+                    if isinstance(auth_val, str):
+                        auth_val = auth_val.lower()
+                #print(f"[HttpAdapter] GET / auth_val: '{auth_val}'")
             except Exception as e:
-                # Xử lý lỗi nếu hàm handler (ví dụ: home()) của bạn bị lỗi
-                print(f"[HttpAdapter] Error executing WeApRous handler {handler.__name__}: {e}")
-                err_msg = f"<h1>500 Internal Server Error</h1><p>Handler Error: {e}</p>"
-                headers = f"HTTP/1.1 500 Internal Server Error\r\nContent-Type: text/html; charset=utf-8\r\nContent-Length: {len(err_msg)}\r\nConnection: close\r\n\r\n"
-                conn.sendall(headers.encode() + err_msg.encode())
-                conn.close()
-                return
+                print(f"[HttpAdapter] Error reading cookies: {e}")
+                print(f"[HttpAdapter] Traceback: {traceback.format_exc()}")
+                auth_val = ""
+            
+            if auth_val != "true":
+                # Chưa đăng nhập, trả về 401
+                body = "<h1>401 Unauthorized</h1><p>Login required. <a href=\"/login\">Login</a></p>"
+                return build_message(401, body, TEXT_HTML)
+        return None
 
-        # ==========================================================
-        # BƯỚC 2: LOGIC DỰ PHÒNG (Cho Backend 9000 - nếu không phải WeApRous)
-        # ==========================================================
-        #print(f"[HttpAdapter] No WeApRous route found. Falling back to hardcoded logic for {req.method} {req.path}...")
+    def route_body(self):
+        """
+        Extracts the body passed to a WeApRous handler. Handlers registered
+        with ``stream=True`` get the body as a binary file instead.
 
-        if req.method == "GET" and req.path == "/login":
-            try:
-                with open(os.path.join("www", "login.html"), "r", encoding="utf-8") as fh:
-                    body = fh.read()
-                headers = "HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n\r\n"
-                conn.sendall(headers.encode() + body.encode('utf-8'))
-            except Exception as e:
-                body = f"<h1>500 Internal Server Error</h1><p>{e}</p>"
-                conn.sendall(b"HTTP/1.1 500 Internal Server Error\r\n\r\n" + body.encode())
-            conn.close()
-            return
-
-        if req.method == "POST" and req.path == "/login":
-            try:
-                header_end = raw_req.find("\r\n\r\n")
-                content_len = 0
-                if header_end != -1:
-                    headers_part = raw_req[:header_end]
-                    for line in headers_part.split("\r\n"):
-                        if line.lower().startswith("content-length:"):
-                            try:
-                                content_len = int(line.split(":", 1)[1].strip())
-                            except Exception:
-                                content_len = 0
-                            break
-
-                body = ""
-                if header_end != -1 and content_len > 0:
-                    start = header_end + 4
-                    body_bytes = msg[start:start + content_len]
-                    try:
-                        body = body_bytes.decode("utf-8")
-                    except Exception:
-                        body = body_bytes.decode("latin-1", errors="ignore")
-                else:
-                    body = ""
-            except Exception:
-                body = ""
+        :rtype str or file: the decoded POST/PUT body, empty for other methods.
+        """
+        req = self.request
+        if req.stream is not None:
+            return req.stream
+        # Lấy body cho POST/PUT
+        body = ""
+        if req.method in ("POST", "PUT") and req.body:
+            body = req.body.decode("utf-8", errors="ignore")
+        return body
+
+    def bind_request(self):
+        """
+        Publishes the prepared request to the handler about to run, both as the
+        ``request_obj`` attribute of the current thread and through
+        :data:`current_request <daemon.request.current_request>`.
+        """
+        req = self.request
+        # Truyền request object vào handler nếu handler cần cookie
+        # Tạm thời lưu req vào handler context để có thể truy cập
+        threading.current_thread().request_obj = req
+        current_request.set(req)
+
+    def build_route_response(self, result):
+        """
+        Encodes the value returned by a WeApRous handler. Generators and other
+        iterables of ``str``/``bytes`` pieces are streamed as a chunked
+        response, except to HTTP/1.0 clients which get the buffered body.
+        JSON bodies of at least :data:`GZIP_MIN_SIZE <daemon.compression.GZIP_MIN_SIZE>` bytes, and streamed JSON,
+        are gzip-compressed for clients accepting it.
+
+        :param result (dict, str, iterable, StreamingResponse or FileResponse):
+            JSON object, HTML text, body pieces or a file.
+
+        :rtype bytes, StreamingResponse or FileResponse: encoded HTTP response.
+        """
+        if isinstance(result, FileResponse):
+            return result
+        if not isinstance(result, (dict, str, bytes, StreamingResponse)) and hasattr(result, "__iter__"):
+            result = StreamingResponse(result)
+        if isinstance(result, StreamingResponse):
+            if compression.GZIP_LEVEL and result.content_type.startswith("application/json"):
+                if not (accepts_gzip(self.request.headers) and result.compress()):
+                    result.add_header("Vary", "Accept-Encoding")
+            if self.request.version == "HTTP/1.0":
+                return result.collect()
+            return result
+
+        # Xử lý kết quả trả về (HTML hoặc JSON)
+        if isinstance(result, dict): # Nếu là JSON
+            body_resp = json.dumps(result, ensure_ascii=False).encode('utf-8')
+            encoding = ()
+            if compression.GZIP_LEVEL and len(body_resp) >= compression.GZIP_MIN_SIZE:
+                encoding = (("Vary", "Accept-Encoding"),)
+                if accepts_gzip(self.request.headers):
+                    body_resp = gzip_compress(body_resp)
+                    encoding = (("Content-Encoding", "gzip"),) + encoding
+            return build_message(200, body_resp, APPLICATION_JSON, encoding)
+        else: # Nếu là HTML (string)
+            return build_message(200, result, TEXT_HTML)
+
+    def build_route_error(self, handler, e):
+        """
+        Builds the 500 response for a WeApRous handler that raised.
+
+        :param handler (function): the failing route handler.
+        :param e (Exception): the raised error.
+
+        :rtype bytes: encoded HTTP response.
+        """
+        # Xử lý lỗi nếu hàm handler (ví dụ: home()) của bạn bị lỗi
+        print(f"[HttpAdapter] Error executing WeApRous handler {handler.__name__}: {e}")
+        err_msg = f"<h1>500 Internal Server Error</h1><p>Handler Error: {e}</p>"
+        return build_message(500, err_msg, TEXT_HTML)
+
+    def run_route(self, handler):
+        """
+        Runs a WeApRous handler on the calling thread. Coroutine handlers are
+        driven to completion with :func:`asyncio.run`.
+
+        :param handler (function): the matched route handler.
+
+        :rtype bytes: encoded HTTP response.
+        """
+        denied = self.route_guard()
+        if denied is not None:
+            return denied
 
-            print(f"[HttpAdapter] POST /login received: content_len={content_len} body_len={len(body)}")
-            form = urllib.parse.parse_qs(body)
-            username = form.get("username", [""])[0]
-            password = form.get("password", [""])[0]
+        try:
+            body = self.route_body()
+
+            # *** GỌI HÀM CỦA BẠN (VÍ DỤ: home(), login_page(), add_list()) ***
+            # Logic (ví dụ: print("HELLLOO...")) của bạn sẽ chạy ở đây
+            self.bind_request()
+            result = handler(body)
+            if inspect.isawaitable(result):
+                result = asyncio.run(result)
+            return self.build_route_response(result)
+        except Exception as e:
+            return self.build_route_error(handler, e)
+
+    async def run_route_async(self, handler):
+        """
+        Awaits an ``async def`` WeApRous handler on the running event loop.
+
+        :param handler (coroutine function): the matched route handler.
+
+        :rtype bytes: encoded HTTP response.
+        """
+        denied = self.route_guard()
+        if denied is not None:
+            return denied
 
-            if username and password:
-                print(f"[HttpAdapter] POST /login parsed username={username}")
+        try:
+            body = self.route_body()
+            self.bind_request()
+            result = await handler(body)
+            return self.build_route_response(result)
+        except Exception as e:
+            return self.build_route_error(handler, e)
+
+    @tracker_route("GET", "/favicon.ico")
+    def tracker_favicon(self):
+        """
+        Answers browsers asking for a favicon with ``204 No Content``.
+
+        :rtype bytes: encoded HTTP response.
+        """
+        return build_head(204)
+
+    def dispatch(self):
+        """
+        Runs the WeApRous route handler or the built-in tracker endpoint
+        matched by :meth:`parse_request`. Other ``GET`` requests are served
+        from the static directories by :meth:`Response.build_response
+        <daemon.response.Response.build_response>`.
+
+        :rtype bytes: encoded HTTP response.
+        """
+        if self.request.hook:
+            return self.run_route(self.request.hook)
+        if self.endpoint:
+            return self.endpoint(self)
+        if self.request.method == "GET":
+            return Response().build_response(self.request)
+        return self.response.build_notfound()
+
+    def serve_page(self, name, extra_headers=b""):
+        """
+        Serves a page of ``www/`` from the static cache with its validators
+        and the ``Cache-Control`` policy of the directory, gzip-compressed
+        when the client accepts it. A conditional ``GET`` whose cached copy
+        is current is answered with a 304.
+
+        :param name (str): file name below ``www/``.
+        :param extra_headers (bytes): additional header lines, each ending with CRLF.
+
+        :rtype bytes: encoded HTTP response.
+        """
+        page = static_cache.get(os.path.join("www", name))
+        variant = page
+        if page.compressible and accepts_gzip(self.request.headers):
+            variant = static_cache.gzip_variant(page) or page
+        policy = cache_policy(page.path)
+        if self.request.method == "GET" and not_modified(self.request.headers, variant.etag, page.last_modified):
+            return self.response.build_not_modified(
+                variant.etag, page.last_modified, policy,
+                "Accept-Encoding" if page.compressible else None)
+        return b"".join((status_line(200), date_line(), variant.headers,
+                         b"Cache-Control: ", policy.encode("latin-1"), b"\r\n",
+                         extra_headers, b"\r\n", variant.content))
+
+    @tracker_route("GET", "/server-status")
+    def tracker_server_status(self):
+        """
+        Returns :func:`server_stats <daemon.backend.server_stats>` as JSON.
+
+        :rtype bytes: encoded HTTP response.
+        """
+        return build_message(200, json.dumps(backend.server_stats()), APPLICATION_JSON)
+
+    @tracker_route("GET", "/login")
+    def tracker_login_page(self):
+        """
+        Serves the login page.
+
+        :rtype bytes: encoded HTTP response.
+        """
+        try:
+            return self.serve_page("login.html")
+        except Exception as e:
+            body = f"<h1>500 Internal Server Error</h1><p>{e}</p>"
+            return build_message(500, body, TEXT_HTML)
+
+    @tracker_route("POST", "/login")
+    def tracker_login(self):
+        """
+        Checks the submitted credentials against ``www/users.json``.
+
+        :rtype bytes: encoded HTTP response.
+        """
+        req = self.request
+        content_len = len(req.body)
+        try:
+            body = req.body.decode("utf-8")
+        except UnicodeDecodeError:
+            body = req.body.decode("latin-1", errors="ignore")
+
+        print(f"[HttpAdapter] POST /login received: content_len={content_len} body_len={len(body)}")
+        form = urllib.parse.parse_qs(body)
+        username = form.get("username", [""])[0]
+        password = form.get("password", [""])[0]
+
+        if username and password:
+            print(f"[HttpAdapter] POST /login parsed username={username}")
+        else:
+            print(f"[HttpAdapter] POST /login parsed empty credentials")
+        users_file = os.path.join("www", "users.json")
+        users = {}
+        try:
+            if os.path.exists(users_file):
+                with open(users_file, "r", encoding="utf-8") as f:
+                    users = json.load(f)
             else:
-                print(f"[HttpAdapter] POST /login parsed empty credentials")
-            users_file = os.path.join("www", "users.json")
-            users = {}
-            try:
-                if os.path.exists(users_file):
-                    with open(users_file, "r", encoding="utf-8") as f:
-                        users = json.load(f)
-                else:
-                    print("[HttpAdapter] users.json not found, using default users.")
-                    users = {
-                        "admin": "password",
-                        "client1": "123",
-                        "client2": "123"
-                    }
-            except Exception as e:
-                print(f"[HttpAdapter] Error reading users.json: {e}")
+                print("[HttpAdapter] users.json not found, using default users.")
                 users = {
                     "admin": "password",
                     "client1": "123",
                     "client2": "123"
                 }
-            if username in users and users[username] == password:
-                try:
-                    with open(os.path.join("www", "index.html"), "r", encoding="utf-8") as fh:
-                        body = fh.read()
-                    headers = ("HTTP/1.1 200 OK\r\n"
-                               "Content-Type: text/html; charset=utf-8\r\n"
-                               "Set-Cookie: auth=true; Path=/; HttpOnly; SameSite=Lax; Max-Age=3600\r\n"
-                               "\r\n")
-                    conn.sendall(headers.encode() + body.encode())
-                except Exception as e:
-                    body = f"<h1>500 Internal Server Error</h1><p>{e}</p>"
-                    conn.sendall(b"HTTP/1.1 500 Internal Server Error\r\n\r\n" + body.encode())
-            else:
-                try:
-                    body = "<h1>401 Unauthorized</h1><p>Invalid credentials.</p>"
-                    headers = ("HTTP/1.1 401 Unauthorized\r\n"
-                               "Content-Type: text/html\r\n"
-                               "Content-Length: {}\r\n"
-                               "Connection: close\r\n"
-                               "\r\n").format(len(body))
-                    conn.sendall(headers.encode() + body.encode())
-                except Exception:
-                    conn.sendall(b"HTTP/1.1 401 Unauthorized\r\n\r\n<h1>401 Unauthorized</h1>")
-            conn.close()
-            return
-
-        if req.method == "GET" and req.path == "/protected":
-            conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n\r\n<h1>Protected Resource</h1><p>You are logged in!</p>")
-            conn.close()
-            return
-
-        if req.method == "GET" and req.path in ("/", "/index", "/index.html"):
-            auth_val = ""
-            try:
-                # Debug: in ra cookies nhận được
-                #print(f"[HttpAdapter] GET / cookies: {req.cookies}")
-                auth_val = req.cookies.get("auth", "")
-                if isinstance(auth_val, str):
-                    auth_val = auth_val.lower()
-                print(f"[HttpAdapter] GET / auth_val: '{auth_val}'")
-            except Exception as e:
-                print(f"[HttpAdapter] Error reading cookies: {e}")
-                auth_val = ""
-
-            if auth_val == "true":
-                try:
-                    with open(os.path.join("www", "index.html"), "r", encoding="utf-8") as fh:
-                        body = fh.read()
-                    headers = "HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n"
-                    conn.sendall(headers.encode() + body.encode())
-                except Exception as e:
-                    body = f"<h1>500 Internal Server Error</h1><p>{e}</p>"
-                    conn.sendall(b"HTTP/1.1 500 Internal Server Error\r\n\r\n" + body.encode())
-                conn.close()
-                return
-            else:
-                body = "<h1>401 Unauthorized</h1><p>Login required. <a href=\"/login\">Login</a></p>"
-                headers = ("HTTP/1.1 401 Unauthorized\r\n"
-                           "Content-Type: text/html; charset=utf-8\r\n"
-                           "Content-Length: {}\r\n"
-                           "Connection: close\r\n"
-                           "\r\n").format(len(body))
-                conn.sendall(headers.encode() + body.encode())
-                conn.close()
-                return
-        if req.method == "GET" and req.path.startswith("/submit-info"):
+        except Exception as e:
+            print(f"[HttpAdapter] Error reading users.json: {e}")
+            users = {
+                "admin": "password",
+                "client1": "123",
+                "client2": "123"
+            }
+        if username in users and users[username] == password:
             try:
-                with open(os.path.join("www", "submit-info.html"), "r", encoding="utf-8") as fh:
-                    body = fh.read()
-                headers = "HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n\r\n"
-                conn.sendall(headers.encode() + body.encode('utf-8'))
+                return self.serve_page(
+                    "index.html", b"Set-Cookie: auth=true; Path=/; HttpOnly; SameSite=Lax; Max-Age=3600\r\n")
             except Exception as e:
                 body = f"<h1>500 Internal Server Error</h1><p>{e}</p>"
-                conn.sendall(b"HTTP/1.1 500 Internal Server Error\r\n\r\n" + body.encode())
-            conn.close()
-            return
-        
-        if req.method == "POST" and req.path == "/submit-info":
+                return build_message(500, body, TEXT_HTML)
+        else:
             try:
-                header_end = raw_req.find("\r\n\r\n")
-                content_len = 0
-                if header_end != -1:
-                    headers_part = raw_req[:header_end]
-                    for line in headers_part.split("\r\n"):
-                        if line.lower().startswith("content-length:"):
-                            try:
-                                content_len = int(line.split(":", 1)[1].strip())
-                            except Exception:
-                                content_len = 0
-                            break
-
-                body = ""
-                if header_end != -1 and content_len > 0:
-                    start = header_end + 4
-                    body_bytes = msg[start:start + content_len]
-                    try:
-                        body = body_bytes.decode("utf-8")
-                    except Exception:
-                        body = body_bytes.decode("latin-1", errors="ignore")
-                else:
-                    body = ""
+                body = "<h1>401 Unauthorized</h1><p>Invalid credentials.</p>"
+                return build_message(401, body, TEXT_HTML)
             except Exception:
-                body = ""
-
-            print(f"[HttpAdapter] POST /submit-info received: content_len={content_len} body_len={len(body)}")
-
-            # Parse dữ liệu form
-            form = urllib.parse.parse_qs(body)
-            username = form.get("username", [""])[0]
-            password = form.get("password", [""])[0]
-
-            if not username or not password:
-                body = "<h1>400 Bad Request</h1><p>Missing username or password.</p>"
-                headers = ("HTTP/1.1 400 Bad Request\r\n"
-                        "Content-Type: text/html; charset=utf-8\r\n"
-                        "Content-Length: {}\r\n"
-                        "Connection: close\r\n\r\n").format(len(body))
-                conn.sendall(headers.encode() + body.encode())
-                conn.close()
-                return
+                return build_message(401, "<h1>401 Unauthorized</h1>", TEXT_HTML)
 
-            print(f"[HttpAdapter] Register attempt via /submit-info: {username}")
+    @tracker_route("GET", "/protected")
+    def tracker_protected(self):
+        """
+        Serves a page only meant for logged in users.
 
-            # Đọc danh sách người dùng từ file
-            users_file = os.path.join("www", "users.json")
-            users = {}
-            try:
-                if os.path.exists(users_file):
-                    with open(users_file, "r", encoding="utf-8") as f:
-                        users = json.load(f)
-            except Exception as e:
-                print(f"[HttpAdapter] Warning: cannot read users.json: {e}")
-                users = {}
-
-            # Kiểm tra trùng tên
-            if username in users:
-                body = f"<h1>409 Conflict</h1><p>Username '{username}' already exists.</p>"
-                headers = ("HTTP/1.1 409 Conflict\r\n"
-                        "Content-Type: text/html; charset=utf-8\r\n"
-                        "Content-Length: {}\r\n"
-                        "Connection: close\r\n\r\n").format(len(body))
-                conn.sendall(headers.encode() + body.encode())
-                conn.close()
-                return
+        :rtype bytes: encoded HTTP response.
+        """
+        return build_message(200, "<h1>Protected Resource</h1><p>You are logged in!</p>", TEXT_HTML)
 
-            # Lưu tài khoản mới
-            users[username] = password
-            try:
-                with open(users_file, "w", encoding="utf-8") as f:
-                    json.dump(users, f, ensure_ascii=False, indent=2)
-            except Exception as e:
-                body = f"<h1>500 Internal Server Error</h1><p>Cannot save user: {e}</p>"
-                conn.sendall(b"HTTP/1.1 500 Internal Server Error\r\n\r\n" + body.encode())
-                conn.close()
-                return
+    @tracker_route("GET", "/", "/index", "/index.html")
+    def tracker_index(self):
+        """
+        Serves the chat page to clients holding the ``auth`` cookie.
+
+        :rtype bytes: encoded HTTP response.
+        """
+        req = self.request
+        auth_val = ""
+        try:
+            # Debug: in ra cookies nhận được
+            #print(f"[HttpAdapter] GET / cookies: {req.cookies}")
+            auth_val = req.cookies.get("auth", "")
+            if isinstance(auth_val, str):
+                auth_val = auth_val.lower()
+            print(f"[HttpAdapter] GET / auth_val: '{auth_val}'")
+        except Exception as e:
+            print(f"[HttpAdapter] Error reading cookies: {e}")
+            auth_val = ""
 
-            # Gửi phản hồi thành công
+        if auth_val == "true":
             try:
-                with open(os.path.join("www", "index.html"), "r", encoding="utf-8") as fh:
-                    body = fh.read()
-                    headers = ("HTTP/1.1 200 OK\r\n"
-                               "Content-Type: text/html; charset=utf-8\r\n"
-                               "Set-Cookie: auth=true; Path=/; HttpOnly; SameSite=Lax; Max-Age=3600\r\n"
-                               "\r\n")
-                    conn.sendall(headers.encode() + body.encode())
+                return self.serve_page("index.html")
             except Exception as e:
                 body = f"<h1>500 Internal Server Error</h1><p>{e}</p>"
-                conn.sendall(b"HTTP/1.1 500 Internal Server Error\r\n\r\n" + body.encode())
+                return build_message(500, body, TEXT_HTML)
+        else:
+            body = "<h1>401 Unauthorized</h1><p>Login required. <a href=\"/login\">Login</a></p>"
+            return build_message(401, body, TEXT_HTML)
+
+    @tracker_route("GET", "/submit-info", prefix=True)
+    def tracker_submit_info_page(self):
+        """
+        Serves the registration page.
+
+        :rtype bytes: encoded HTTP response.
+        """
+        try:
+            return self.serve_page("submit-info.html")
+        except Exception as e:
+            body = f"<h1>500 Internal Server Error</h1><p>{e}</p>"
+            return build_message(500, body, TEXT_HTML)
+
+    @tracker_route("POST", "/submit-info")
+    def tracker_submit_info(self):
+        """
+        Registers a new user in ``www/users.json``.
+
+        :rtype bytes: encoded HTTP response.
+        """
+        req = self.request
+        content_len = len(req.body)
+        try:
+            body = req.body.decode("utf-8")
+        except UnicodeDecodeError:
+            body = req.body.decode("latin-1", errors="ignore")
 
-            conn.close()
-            return
+        print(f"[HttpAdapter] POST /submit-info received: content_len={content_len} body_len={len(body)}")
 
-        # --- Handle /add-list ---
-        # server_routes.py
-        # httpadapter.py
+        # Parse dữ liệu form
+        form = urllib.parse.parse_qs(body)
+        username = form.get("username", [""])[0]
+        password = form.get("password", [""])[0]
 
-##############################################################################
-        # --- /add-list --- (ghi vào peer_connections.json)
-        if req.method == "POST" and req.path == "/add-list":
-            try:
-                import json, os
-                header_end = raw_req.find("\r\n\r\n")
-                body = ""
-                if header_end != -1:
-                    content_len = 0
-                    headers_part = raw_req[:header_end]
-                    for line in headers_part.split("\r\n"):
-                        if line.lower().startswith("content-length:"):
-                            try:
-                                content_len = int(line.split(":", 1)[1].strip())
-                            except Exception:
-                                content_len = 0
-                            break
-                    if content_len > 0:
-                        start = header_end + 4
-                        body_bytes = msg[start:start + content_len]
-                        body = body_bytes.decode("utf-8", errors="ignore")
-
-                # --- parse JSON ---
-                data = json.loads(body)
-                user = data.get("user")
-                host = data.get("host", "127.0.0.1")
-                port = data.get("port")
-                item = data.get("item", "ONLINE")
-
-                if not user:
-                    raise ValueError("Missing 'user' field")
-
-                os.makedirs("db", exist_ok=True)
-                if os.path.exists(PEER_CONNECTION_FILE):
-                    try:
-                        with open(PEER_CONNECTION_FILE, "r", encoding="utf-8") as f:
-                            connections = json.load(f)
-                    except Exception:
-                        connections = {}
-                else:
-                    connections = {}
+        if not username or not password:
+            body = "<h1>400 Bad Request</h1><p>Missing username or password.</p>"
+            return build_message(400, body, TEXT_HTML)
 
-                # --- cập nhật thông tin peer ---
-                if user not in connections:
-                    connections[user] = []
-
-                # chỉ lưu chính bản thân peer (host, port, trạng thái)
-                peer_entry = {"peer": user, "ip": host, "port": port, "status": item}
-                # ghi đè bản ghi cũ nếu đã tồn tại
-                connections[user] = [peer_entry]
-
-                with open(PEER_CONNECTION_FILE, "w", encoding="utf-8") as f:
-                    json.dump(connections, f, indent=4, ensure_ascii=False)
-
-                # --- phản hồi ---
-                resp = {"message": f"Peer '{user}' added to connection list", "peer": peer_entry}
-                body_resp = json.dumps(resp)
-                headers = (
-                    f"HTTP/1.1 200 OK\r\n"
-                    f"Content-Type: application/json\r\n"
-                    f"Content-Length: {len(body_resp)}\r\n"
-                    f"Connection: close\r\n\r\n"
-                )
-                conn.sendall(headers.encode() + body_resp.encode())
+        print(f"[HttpAdapter] Register attempt via /submit-info: {username}")
 
-            except Exception as e:
-                err = f"<h1>500 Internal Server Error</h1><p>{e}</p>"
-                conn.sendall(
-                    f"HTTP/1.1 500 Internal Server Error\r\n"
-                    f"Content-Type: text/html; charset=utf-8\r\n"
-                    f"Content-Length: {len(err)}\r\n"
-                    f"Connection: close\r\n\r\n".encode() + err.encode()
-                )
-            finally:
-                conn.close()
+        # Đọc danh sách người dùng từ file
+        users_file = os.path.join("www", "users.json")
+        users = {}
+        try:
+            if os.path.exists(users_file):
+                with open(users_file, "r", encoding="utf-8") as f:
+                    users = json.load(f)
+        except Exception as e:
+            print(f"[HttpAdapter] Warning: cannot read users.json: {e}")
+            users = {}
 
+        # Kiểm tra trùng tên
+        if username in users:
+            body = f"<h1>409 Conflict</h1><p>Username '{username}' already exists.</p>"
+            return build_message(409, body, TEXT_HTML)
 
-        # #################################################
-        # --- /1sx1 ---
-        if req.method == "GET" and req.path == "/get-list":
-            try:
-                if not os.path.exists(PEER_CONNECTION_FILE):
-                    resp = {"count": 0, "list": []}
-                else:
+        # Lưu tài khoản mới
+        users[username] = password
+        try:
+            with open(users_file, "w", encoding="utf-8") as f:
+                json.dump(users, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            body = f"<h1>500 Internal Server Error</h1><p>Cannot save user: {e}</p>"
+            return build_message(500, body, TEXT_HTML)
+
+        # Gửi phản hồi thành công
+        try:
+            return self.serve_page(
+                "index.html", b"Set-Cookie: auth=true; Path=/; HttpOnly; SameSite=Lax; Max-Age=3600\r\n")
+        except Exception as e:
+            body = f"<h1>500 Internal Server Error</h1><p>{e}</p>"
+            return build_message(500, body, TEXT_HTML)
+
+    @tracker_route("POST", "/add-list")
+    def tracker_add_list(self):
+        """
+        Records a peer (user, host, port, status) in the connection file.
+
+        :rtype bytes: encoded HTTP response.
+        """
+        req = self.request
+        try:
+            body = req.body.decode("utf-8", errors="ignore")
+
+            # --- parse JSON ---
+            data = json.loads(body)
+            user = data.get("user")
+            host = data.get("host", "127.0.0.1")
+            port = data.get("port")
+            item = data.get("item", "ONLINE")
+
+            if not user:
+                raise ValueError("Missing 'user' field")
+
+            os.makedirs("db", exist_ok=True)
+            if os.path.exists(PEER_CONNECTION_FILE):
+                try:
                     with open(PEER_CONNECTION_FILE, "r", encoding="utf-8") as f:
                         connections = json.load(f)
+                except Exception:
+                    connections = {}
+            else:
+                connections = {}
 
-                    # gộp toàn bộ các peer thành danh sách
-                    all_peers = []
-                    for peer_name, peer_entries in connections.items():
-                        for entry in peer_entries:
-                            all_peers.append(entry)
+            # --- cập nhật thông tin peer ---
+            if user not in connections:
+                connections[user] = []
 
-                    resp = {"count": len(all_peers), "list": all_peers}
+            # chỉ lưu chính bản thân peer (host, port, trạng thái)
+            peer_entry = {"peer": user, "ip": host, "port": port, "status": item}
+            # ghi đè bản ghi cũ nếu đã tồn tại
+            connections[user] = [peer_entry]
 
-                body_resp = json.dumps(resp)
-                headers = f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: {len(body_resp)}\r\nConnection: close\r\n\r\n"
-                conn.sendall(headers.encode() + body_resp.encode())
-            except Exception as e:
-                body_bytes = f"<h1>500 Internal Server Error</h1><p>{e}</p>".encode()
-                headers = f"HTTP/1.1 500 Internal Server Error\r\nContent-Type: text/html; charset=utf-8\r\nContent-Length: {len(body_bytes)}\r\nConnection: close\r\n\r\n"
-                conn.sendall(headers.encode() + body_bytes)
-            finally:
-                conn.close()
+            with open(PEER_CONNECTION_FILE, "w", encoding="utf-8") as f:
+                json.dump(connections, f, indent=4, ensure_ascii=False)
 
+            # --- phản hồi ---
+            resp = {"message": f"Peer '{user}' added to connection list", "peer": peer_entry}
+            return build_message(200, json.dumps(resp), APPLICATION_JSON)
 
-##########################################################
-# --- /connect-peer (đọc/ghi peer_connections.json) ---
-        if req.method == "POST" and req.path == "/connect-peer":
-            try:
-                import json, os
-
-                # --- Đọc body từ request ---
-                raw_req = msg.decode(errors="ignore")
-                header_end = raw_req.find("\r\n\r\n")
-                body = ""
-                if header_end != -1:
-                    headers_part = raw_req[:header_end]
-                    content_len = 0
-                    for line in headers_part.split("\r\n"):
-                        if line.lower().startswith("content-length:"):
-                            try:
-                                content_len = int(line.split(":", 1)[1].strip())
-                            except Exception:
-                                content_len = 0
-                            break
-                    if content_len > 0:
-                        start = header_end + 4
-                        body_bytes = msg[start:start + content_len]
-                        body = body_bytes.decode("utf-8", errors="ignore")
-
-                if not body.strip():
-                    raise ValueError("Empty or missing JSON body in /connect-peer request")
-
-                # --- Parse JSON ---
-                data = json.loads(body)
-                from_user = data.get("from_user")
-                to_peer = data.get("to_peer")
-                if not from_user or not to_peer:
-                    raise ValueError("Missing 'from_user' or 'to_peer' in JSON body")
-
-                # --- Đọc file peer_connections.json ---
-                if not os.path.exists(PEER_CONNECTION_FILE):
-                    raise FileNotFoundError(f"{PEER_CONNECTION_FILE} not found")
+        except Exception as e:
+            err = f"<h1>500 Internal Server Error</h1><p>{e}</p>"
+            return build_message(500, err, TEXT_HTML)
+
+    @tracker_route("GET", "/get-list")
+    def tracker_get_list(self):
+        """
+        Lists every peer known to the tracker.
 
+        :rtype bytes: encoded HTTP response.
+        """
+        try:
+            if not os.path.exists(PEER_CONNECTION_FILE):
+                resp = {"count": 0, "list": []}
+            else:
                 with open(PEER_CONNECTION_FILE, "r", encoding="utf-8") as f:
-                    try:
-                        connections = json.load(f)
-                    except json.JSONDecodeError:
-                        connections = {}
-
-                # --- Lấy thông tin của 2 peer từ file ---
-                from_info_list = connections.get(from_user, [])
-                to_info_list = connections.get(to_peer, [])
-                if not from_info_list or not to_info_list:
-                    raise ValueError(f"Peer '{from_user}' or '{to_peer}' not found in {PEER_CONNECTION_FILE}")
-
-                from_info = from_info_list[0]
-                to_info = to_info_list[0]
-
-                # --- Tạo dữ liệu 2 chiều ---
-                from_peer_data = {
-                    "peer": to_peer,
-                    "ip": to_info.get("ip", "127.0.0.1"),
-                    "port": to_info.get("port")
-                }
-                to_peer_data = {
-                    "peer": from_user,
-                    "ip": from_info.get("ip", "127.0.0.1"),
-                    "port": from_info.get("port")
-                }
+                    connections = json.load(f)
 
-                # --- Gắn kết nối 2 chiều ---
-                if from_user not in connections:
-                    connections[from_user] = []
-                if not any(p["peer"] == to_peer for p in connections[from_user]):
-                    connections[from_user].append(from_peer_data)
-
-                if to_peer not in connections:
-                    connections[to_peer] = []
-                if not any(p["peer"] == from_user for p in connections[to_peer]):
-                    connections[to_peer].append(to_peer_data)
-
-                # --- Ghi lại file ---
-                os.makedirs(os.path.dirname(PEER_CONNECTION_FILE), exist_ok=True)
-                with open(PEER_CONNECTION_FILE, "w", encoding="utf-8") as f:
-                    json.dump(connections, f, ensure_ascii=False, indent=4)
-
-                # --- Phản hồi ---
-                resp = {
-                    "message": f"Successfully connected {from_user} ↔ {to_peer}",
-                    "from_user": from_user,
-                    "to_peer": to_peer,
-                    "connected_to": from_peer_data
-                }
-                body_resp = json.dumps(resp, ensure_ascii=False)
-                headers = (
-                    f"HTTP/1.1 200 OK\r\n"
-                    f"Content-Type: application/json\r\n"
-                    f"Content-Length: {len(body_resp)}\r\n"
-                    f"Connection: close\r\n\r\n"
-                )
-                conn.sendall(headers.encode() + body_resp.encode())
+                # gộp toàn bộ các peer thành danh sách
+                all_peers = []
+                for peer_name, peer_entries in connections.items():
+                    for entry in peer_entries:
+                        all_peers.append(entry)
 
-                print(f"[Tracker] ✅ Connected {from_user} ↔ {to_peer}")
+                resp = {"count": len(all_peers), "list": all_peers}
 
-            except Exception as e:
-                err_msg = f"<h1>500 Internal Server Error</h1><p>{e}</p>"
-                headers = (
-                    f"HTTP/1.1 500 Internal Server Error\r\n"
-                    f"Content-Type: text/html\r\n"
-                    f"Content-Length: {len(err_msg)}\r\n"
-                    f"Connection: close\r\n\r\n"
-                )
-                conn.sendall(headers.encode() + err_msg.encode())
-                print(f"[Tracker] ❌ error /connect-peer: {e}")
-
-            finally:
-                conn.close()
+            return build_message(200, json.dumps(resp), APPLICATION_JSON)
+        except Exception as e:
+            return build_message(500, f"<h1>500 Internal Server Error</h1><p>{e}</p>", TEXT_HTML)
 
-# --------------------------------------
+    @tracker_route("POST", "/connect-peer")
+    def tracker_connect_peer(self):
+        """
+        Connects two registered peers in both directions.
 
-        import socket
+        :rtype bytes: encoded HTTP response.
+        """
+        req = self.request
+        try:
 
-# --------------------------------------
-# /broadcast-peer (sửa)
-# --------------------------------------
-        if req.method == "POST" and req.path == "/broadcast-peer":
-            try:
-                # --- Đọc body JSON ---
-                header_end = raw_req.find("\r\n\r\n")
-                content_len = 0
-                if header_end != -1:
-                    headers_part = raw_req[:header_end]
-                    for line in headers_part.split("\r\n"):
-                        if line.lower().startswith("content-length:"):
-                            try:
-                                content_len = int(line.split(":", 1)[1].strip())
-                            except:
-                                content_len = 0
-                            break
-
-                body = ""
-                if header_end != -1 and content_len > 0:
-                    start = header_end + 4
-                    body_bytes = msg[start:start + content_len]
-                    body = body_bytes.decode("utf-8", errors="ignore")
-
-                # --- Parse JSON ---
-                import json
-                data = json.loads(body)
-                sender = data.get("from_user") or data.get("from")
-                message = data.get("message")
-                if not sender or not message:
-                    raise ValueError("Missing 'from_user' or 'message'")
-
-                # --- Đọc file kết nối thật ---
-                if not os.path.exists(PEER_CONNECTION_FILE):
-                    raise FileNotFoundError(f"File {PEER_CONNECTION_FILE} not found")
+            # --- Đọc body từ request ---
+            body = req.body.decode("utf-8", errors="ignore")
 
-                with open(PEER_CONNECTION_FILE, "r", encoding="utf-8") as f:
+            if not body.strip():
+                raise ValueError("Empty or missing JSON body in /connect-peer request")
+
+            # --- Parse JSON ---
+            data = json.loads(body)
+            from_user = data.get("from_user")
+            to_peer = data.get("to_peer")
+            if not from_user or not to_peer:
+                raise ValueError("Missing 'from_user' or 'to_peer' in JSON body")
+
+            # --- Đọc file peer_connections.json ---
+            if not os.path.exists(PEER_CONNECTION_FILE):
+                raise FileNotFoundError(f"{PEER_CONNECTION_FILE} not found")
+
+            with open(PEER_CONNECTION_FILE, "r", encoding="utf-8") as f:
+                try:
                     connections = json.load(f)
+                except json.JSONDecodeError:
+                    connections = {}
 
-                if sender not in connections:
-                    raise ValueError(f"Sender '{sender}' not found in connections list")
-
-                peers = connections[sender]
-                success = 0
-
-                print(f"[Broadcast] {sender} gửi '{message}' tới {len(peers)} peers: {[p['peer'] for p in peers]}")
-
-                # # --- Gửi message tới từng peer ---
-                # for peer in peers:
-                #     ip = peer.get("ip")
-                #     port = peer.get("port")
-                #     peer_name = peer.get("peer")
-                #     try:
-                #         s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                #         s.connect((ip, int(port)))
-                #         s.sendall(f"[Broadcast from {sender}] {message}".encode("utf-8"))
-                #         s.close()
-                #         success += 1
-                #     except Exception as e:
-                #         print(f"[Broadcast] error {peer_name} ({e})")
-                # --- Phản hồi kết quả ---
-                body = f"<h1>Broadcast sent</h1><p>Message delivered to {success} peers.</p>"
-                headers = (
-                    "HTTP/1.1 200 OK\r\n"
-                    "Content-Type: text/html; charset=utf-8\r\n"
-                    f"Content-Length: {len(body)}\r\n"
-                    "Connection: close\r\n\r\n"
-                )
-                conn.sendall(headers.encode() + body.encode())
-
-                
+            # --- Lấy thông tin của 2 peer từ file ---
+            from_info_list = connections.get(from_user, [])
+            to_info_list = connections.get(to_peer, [])
+            if not from_info_list or not to_info_list:
+                raise ValueError(f"Peer '{from_user}' or '{to_peer}' not found in {PEER_CONNECTION_FILE}")
+
+            from_info = from_info_list[0]
+            to_info = to_info_list[0]
+
+            # --- Tạo dữ liệu 2 chiều ---
+            from_peer_data = {
+                "peer": to_peer,
+                "ip": to_info.get("ip", "127.0.0.1"),
+                "port": to_info.get("port")
+            }
+            to_peer_data = {
+                "peer": from_user,
+                "ip": from_info.get("ip", "127.0.0.1"),
+                "port": from_info.get("port")
+            }
+
+            # --- Gắn kết nối 2 chiều ---
+            if from_user not in connections:
+                connections[from_user] = []
+            if not any(p["peer"] == to_peer for p in connections[from_user]):
+                connections[from_user].append(from_peer_data)
+
+            if to_peer not in connections:
+                connections[to_peer] = []
+            if not any(p["peer"] == from_user for p in connections[to_peer]):
+                connections[to_peer].append(to_peer_data)
+
+            # --- Ghi lại file ---
+            os.makedirs(os.path.dirname(PEER_CONNECTION_FILE), exist_ok=True)
+            with open(PEER_CONNECTION_FILE, "w", encoding="utf-8") as f:
+                json.dump(connections, f, ensure_ascii=False, indent=4)
+
+            # --- Phản hồi ---
+            resp = {
+                "message": f"Successfully connected {from_user} ↔ {to_peer}",
+                "from_user": from_user,
+                "to_peer": to_peer,
+                "connected_to": from_peer_data
+            }
+            print(f"[Tracker] ✅ Connected {from_user} ↔ {to_peer}")
+            return build_message(200, json.dumps(resp, ensure_ascii=False), APPLICATION_JSON)
+
+        except Exception as e:
+            err_msg = f"<h1>500 Internal Server Error</h1><p>{e}</p>"
+            print(f"[Tracker] ❌ error /connect-peer: {e}")
+            return build_message(500, err_msg, TEXT_HTML)
+
+    @tracker_route("POST", "/broadcast-peer")
+    def tracker_broadcast_peer(self):
+        """
+        Accepts a message for every peer connected to the sender.
+
+        :rtype bytes: encoded HTTP response.
+        """
+        req = self.request
+        try:
+            # --- Đọc body JSON ---
+            body = req.body.decode("utf-8", errors="ignore")
+
+            # --- Parse JSON ---
+            data = json.loads(body)
+            sender = data.get("from_user") or data.get("from")
+            message = data.get("message")
+            if not sender or not message:
+                raise ValueError("Missing 'from_user' or 'message'")
+
+            # --- Đọc file kết nối thật ---
+            if not os.path.exists(PEER_CONNECTION_FILE):
+                raise FileNotFoundError(f"File {PEER_CONNECTION_FILE} not found")
+
+            with open(PEER_CONNECTION_FILE, "r", encoding="utf-8") as f:
+                connections = json.load(f)
+
+            if sender not in connections:
+                raise ValueError(f"Sender '{sender}' not found in connections list")
+
+            peers = connections[sender]
+            success = 0
+
+            print(f"[Broadcast] {sender} gửi '{message}' tới {len(peers)} peers: {[p['peer'] for p in peers]}")
+
+            # # --- Gửi message tới từng peer ---
+            # for peer in peers:
+            #     ip = peer.get("ip")
+            #     port = peer.get("port")
+            #     peer_name = peer.get("peer")
+            #     try:
+            #         s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            #         s.connect((ip, int(port)))
+            #         s.sendall(f"[Broadcast from {sender}] {message}".encode("utf-8"))
+            #         s.close()
+            #         success += 1
+            #     except Exception as e:
+            #         print(f"[Broadcast] error {peer_name} ({e})")
+            # --- Phản hồi kết quả ---
+            body = f"<h1>Broadcast sent</h1><p>Message delivered to {success} peers.</p>"
+            return build_message(200, body, TEXT_HTML)
+
+
+
+        except Exception as e:
+            err = f"<h1>500 Internal Server Error</h1><p>{e}</p>"
+            print(f"[Broadcast] error /broadcast-peer: {e}")
+            return build_message(500, err, TEXT_HTML)
+
+    @tracker_route("POST", "/send-peer")
+    def tracker_send_peer(self):
+        """
+        Accepts a private message for one connected peer.
+
+        :rtype bytes: encoded HTTP response.
+        """
+        req = self.request
+        try:
+            # --- đọc body JSON ---
+            body = req.body.decode("utf-8", errors="ignore")
 
-            except Exception as e:
-                err = f"<h1>500 Internal Server Error</h1><p>{e}</p>"
-                conn.sendall(
-                    f"HTTP/1.1 500 Internal Server Error\r\n"
-                    f"Content-Type: text/html; charset=utf-8\r\n"
-                    f"Content-Length: {len(err)}\r\n"
-                    f"Connection: close\r\n\r\n".encode() + err.encode()
-                )
-                print(f"[Broadcast] error /broadcast-peer: {e}")
-            finally:
-                conn.close()
+            data = json.loads(body)
+            sender = data.get("from_user") or data.get("from")
+            target = data.get("to")
+            message = data.get("message")
 
+            if not sender or not target or not message:
+                raise ValueError("Missing required fields: from_user, to, message")
 
-# --------------------------------------
-# /send-peer (sửa)
-# --------------------------------------
-        if req.method == "POST" and req.path == "/send-peer":
-            try:
-                # --- đọc body JSON ---
-                header_end = raw_req.find("\r\n\r\n")
-                content_len = 0
-                if header_end != -1:
-                    headers_part = raw_req[:header_end]
-                    for line in headers_part.split("\r\n"):
-                        if line.lower().startswith("content-length:"):
-                            try:
-                                content_len = int(line.split(":", 1)[1].strip())
-                            except:
-                                content_len = 0
-                            break
-
-                body = ""
-                if header_end != -1 and content_len > 0:
-                    start = header_end + 4
-                    body_bytes = msg[start:start + content_len]
-                    body = body_bytes.decode("utf-8", errors="ignore")
-
-                data = json.loads(body)
-                sender = data.get("from_user") or data.get("from")
-                target = data.get("to")
-                message = data.get("message")
-
-                if not sender or not target or not message:
-                    raise ValueError("Missing required fields: from_user, to, message")
-
-                # --- Đọc file peer_connections.json ---
-                if not os.path.exists(PEER_CONNECTION_FILE):
-                    raise FileNotFoundError(f"{PEER_CONNECTION_FILE} not found")
+            # --- Đọc file peer_connections.json ---
+            if not os.path.exists(PEER_CONNECTION_FILE):
+                raise FileNotFoundError(f"{PEER_CONNECTION_FILE} not found")
 
-                with open(PEER_CONNECTION_FILE, "r", encoding="utf-8") as f:
-                    connections = json.load(f)
+            with open(PEER_CONNECTION_FILE, "r", encoding="utf-8") as f:
+                connections = json.load(f)
 
-                # --- Tìm IP/Port của target ---
-                target_info = None
-                if sender in connections:
-                    for peer in connections[sender]:
-                        if peer.get("peer") == target:
-                            target_info = peer
-                            break
+            # --- Tìm IP/Port của target ---
+            target_info = None
+            if sender in connections:
+                for peer in connections[sender]:
+                    if peer.get("peer") == target:
+                        target_info = peer
+                        break
 
-                if not target_info:
-                    raise ValueError(f"Peer '{target}' not found in {PEER_CONNECTION_FILE}")
+            if not target_info:
+                raise ValueError(f"Peer '{target}' not found in {PEER_CONNECTION_FILE}")
 
-                ip = target_info.get("ip", "127.0.0.1")
-                port = int(target_info.get("port", 0))
+            ip = target_info.get("ip", "127.0.0.1")
+            port = int(target_info.get("port", 0))
 
-                # --- Gửi message ---
-                # s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                # s.connect((ip, port))
-                # s.sendall(f"[Private] {sender}: {message}".encode("utf-8"))
-                # s.close()
+            # --- Gửi message ---
+            # s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # s.connect((ip, port))
+            # s.sendall(f"[Private] {sender}: {message}".encode("utf-8"))
+            # s.close()
 
-                body = f"<h1>Message sent</h1><p>{sender} → {target}</p>"
-                headers = ("HTTP/1.1 200 OK\r\n"
-                        "Content-Type: text/html; charset=utf-8\r\n"
-                        f"Content-Length: {len(body)}\r\n\r\n")
-                conn.sendall(headers.encode() + body.encode())
+            body = f"<h1>Message sent</h1><p>{sender} → {target}</p>"
+            return build_message(200, body, TEXT_HTML)
 
-                
 
-            except Exception as e:
-                err = f"<h1>500 Internal Server Error</h1><p>{e}</p>"
-                conn.sendall(
-                    f"HTTP/1.1 500 Internal Server Error\r\n"
-                    f"Content-Type: text/html; charset=utf-8\r\n"
-                    f"Content-Length: {len(err)}\r\n\r\n".encode() + err.encode('utf-8')
-                )
-               
-
-            finally:
-                conn.close()
\ No newline at end of file
+
+        except Exception as e:
+            err = f"<h1>500 Internal Server Error</h1><p>{e}</p>"
+            return build_message(500, err, TEXT_HTML)
+
@@ -0,0 +1,286 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.httpparser
+~~~~~~~~~~~~~~~~~
+
+This module provides an incremental, byte-level HTTP/1.1 request parser.
+
+Received bytes are appended to a ``bytearray``. The search for the end of the
+header block resumes where the previous search stopped, the request line and
+headers are parsed exactly once, and a :class:`ParsedRequest <ParsedRequest>`
+is returned as soon as the declared body is complete, without waiting for a
+socket timeout. Bodies are delimited by ``Content-Length`` or sent with
+``Transfer-Encoding: chunked``, which is decoded as the chunks arrive.
+
+Bodies larger than ``spool_threshold`` and chunked bodies are moved out of the
+receive buffer into a :class:`tempfile.SpooledTemporaryFile` as they arrive,
+which spills to disk past the threshold, and bodies above ``max_body_size``
+are refused as soon as their size is known.
+
+Usage::
+
+  >>> parser = RequestParser()
+  >>> parser.feed(b"GET /get-list HTTP/1.1\\r\\nHost: app1.local\\r\\n\\r\\n")
+  >>> message = parser.next_message()
+  >>> message.method, message.path
+  ('GET', '/get-list')
+"""
+
+import tempfile
+
+#: Largest accepted header block, request line included.
+MAX_HEADER_SIZE = 65536
+#: Largest accepted chunk-size line of a chunked body, extensions included.
+MAX_CHUNK_LINE = 1024
+#: Largest accepted request body, in bytes.
+MAX_BODY_SIZE = 10 * 1024 * 1024
+#: Bodies above this size are spooled, and spill to disk past it.
+SPOOL_THRESHOLD = 1024 * 1024
+
+
+class HttpParseError(ValueError):
+    """Raised when the received bytes are not a valid HTTP request."""
+
+
+class BodyTooLarge(HttpParseError):
+    """Raised when a request body exceeds the parser ``max_body_size``."""
+
+
+class ParsedRequest:
+    """
+    One request as produced by :class:`RequestParser <RequestParser>`.
+
+    :attrs method (str): HTTP verb.
+    :attrs path (str): request target as sent by the client.
+    :attrs version (str): protocol version, e.g. ``HTTP/1.1``.
+    :attrs headers (dict): header values keyed by lower-case name. For a
+        chunked request ``transfer-encoding`` is replaced by the
+        ``content-length`` of the decoded body.
+    :attrs body (bytes): request body, None when it was spooled.
+    :attrs stream (file): spooled request body positioned at its start, or None.
+    """
+
+    __slots__ = ("method", "path", "version", "headers", "body", "stream")
+
+    def __init__(self, method, path, version, headers, body, stream=None):
+        self.method = method
+        self.path = path
+        self.version = version
+        self.headers = headers
+        self.body = body
+        self.stream = stream
+
+    def __repr__(self):
+        return "<ParsedRequest {} {}>".format(self.method, self.path)
+
+
+def parse_head(head):
+    """
+    Parses a header block, request line included, without its final CRLF CRLF.
+
+    :param head (bytes): raw header block.
+
+    :rtype tuple: (method, path, version, headers).
+    :raises HttpParseError: on a malformed request line.
+    """
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split()
+    if len(parts) == 3:
+        method, path, version = parts
+    elif len(parts) == 2:
+        method, path = parts
+        version = "HTTP/1.1"
+    else:
+        raise HttpParseError("Invalid request line: {!r}".format(lines[0]))
+
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return method.upper(), path, version, headers
+
+
+class RequestParser:
+    """
+    Incremental HTTP request parser.
+
+    Bytes are handed over with :meth:`feed` and complete requests taken out
+    with :meth:`next_message`. Bytes following a complete request stay
+    buffered for the next call.
+
+    :param max_header_size (int): largest accepted header block.
+    :param max_body_size (int): largest accepted request body.
+    :param spool_threshold (int): size above which a body is spooled.
+    """
+
+    def __init__(self, max_header_size=MAX_HEADER_SIZE, max_body_size=MAX_BODY_SIZE,
+                 spool_threshold=SPOOL_THRESHOLD):
+        self.max_header_size = max_header_size
+        self.max_body_size = max_body_size
+        self.spool_threshold = spool_threshold
+        self.buffer = bytearray()
+        self._scan_from = 0
+        self._head = None
+        self._chunked = False
+        self._body_len = 0
+        self._received = 0
+        self._spool = None
+
+    def feed(self, data):
+        """
+        Appends received bytes to the parser buffer.
+
+        :param data (bytes): bytes read from the connection.
+        """
+        self.buffer += data
+
+    def pending(self):
+        """
+        :rtype bool: True when part of a request is buffered.
+        """
+        return bool(self.buffer) or self._head is not None
+
+    def in_body(self):
+        """
+        :rtype bool: True when a request head was parsed and its body is still arriving.
+        """
+        return self._head is not None
+
+    def next_message(self):
+        """
+        Returns the next complete request, if any.
+
+        :rtype ParsedRequest: the request, or None while more bytes are needed.
+        :raises HttpParseError: on a malformed request.
+        :raises BodyTooLarge: when the body exceeds ``max_body_size``.
+        """
+        if self._head is None:
+            end = self.buffer.find(b"\r\n\r\n", self._scan_from)
+            if end == -1:
+                if len(self.buffer) > self.max_header_size:
+                    raise HttpParseError("Request header block too large")
+                # A CRLF CRLF split across two reads starts at most 3 bytes back.
+                self._scan_from = max(0, len(self.buffer) - 3)
+                return None
+            if end > self.max_header_size:
+                raise HttpParseError("Request header block too large")
+            self._start_body(parse_head(bytes(self.buffer[:end])))
+            del self.buffer[:end + 4]
+            self._scan_from = 0
+
+        method, path, version, headers = self._head
+        if self._chunked:
+            if not self._read_chunks():
+                return None
+            del headers["transfer-encoding"]
+            headers["content-length"] = str(self._received)
+            body = None
+        elif self._spool is not None:
+            take = min(len(self.buffer), self._body_len - self._received)
+            if take:
+                self._spool.write(self.buffer[:take])
+                del self.buffer[:take]
+                self._received += take
+            if self._received < self._body_len:
+                return None
+            body = None
+        else:
+            if len(self.buffer) < self._body_len:
+                return None
+            body = bytes(self.buffer[:self._body_len])
+            del self.buffer[:self._body_len]
+
+        stream = self._spool
+        if stream is not None:
+            stream.seek(0)
+        self._head = None
+        self._spool = None
+        return ParsedRequest(method, path, version, headers, body, stream)
+
+    def _start_body(self, head):
+        headers = head[3]
+        self._chunked = self._is_chunked(headers)
+        self._body_len = 0 if self._chunked else self._content_length(headers)
+        if self._body_len > self.max_body_size:
+            raise BodyTooLarge("Request body of {} bytes exceeds {}".format(
+                self._body_len, self.max_body_size))
+        self._received = 0
+        self._spool = None
+        if self._chunked or self._body_len > self.spool_threshold:
+            self._spool = tempfile.SpooledTemporaryFile(max_size=self.spool_threshold)
+        self._head = head
+
+    def _is_chunked(self, headers):
+        value = headers.get("transfer-encoding")
+        if value is None:
+            return False
+        if value.lower() != "chunked":
+            raise HttpParseError("Unsupported Transfer-Encoding: {!r}".format(value))
+        return True
+
+    def _read_chunks(self):
+        """
+        Moves the complete chunks at the start of the buffer into the spool.
+
+        :rtype bool: True once the last chunk and the trailers are in.
+        """
+        buf = self.buffer
+        pos = 0
+        try:
+            while True:
+                line_end = buf.find(b"\r\n", pos)
+                if line_end == -1:
+                    if len(buf) - pos > MAX_CHUNK_LINE:
+                        raise HttpParseError("Chunk size line too long")
+                    return False
+                size_field = bytes(buf[pos:line_end]).split(b";", 1)[0].strip()
+                try:
+                    size = int(size_field, 16)
+                except ValueError:
+                    raise HttpParseError("Invalid chunk size: {!r}".format(size_field))
+                if size < 0:
+                    raise HttpParseError("Invalid chunk size: {!r}".format(size_field))
+                if size == 0:
+                    # Last chunk: the message ends after the (usually empty) trailers.
+                    end = buf.find(b"\r\n\r\n", line_end)
+                    if end == -1:
+                        return False
+                    pos = end + 4
+                    return True
+                if self._received + size > self.max_body_size:
+                    raise BodyTooLarge("Chunked request body exceeds {}".format(self.max_body_size))
+                data_start = line_end + 2
+                data_end = data_start + size
+                if len(buf) < data_end + 2:
+                    return False
+                if buf[data_end:data_end + 2] != b"\r\n":
+                    raise HttpParseError("Chunk data not followed by CRLF")
+                self._spool.write(buf[data_start:data_end])
+                self._received += size
+                pos = data_end + 2
+        finally:
+            del buf[:pos]
+
+    def _content_length(self, headers):
+        value = headers.get("content-length")
+        if value is None:
+            return 0
+        try:
+            length = int(value)
+        except ValueError:
+            raise HttpParseError("Invalid Content-Length: {!r}".format(value))
+        if length < 0:
+            raise HttpParseError("Invalid Content-Length: {!r}".format(value))
+        return length
@@ -0,0 +1,126 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.httpwriter
+~~~~~~~~~~~~~~~~~
+
+This module provides the HTTP/1.1 response header writer, the counterpart of
+:mod:`daemon.httpparser`. Status lines are precomputed as bytes, the ``Date``
+value is formatted at most once per second, and a header block is assembled
+with a single ``b"".join``. Only the headers given by the caller are written,
+besides ``Date`` and the ``Content-Length`` of the body.
+
+The connection headers (``Connection``, ``Keep-Alive``) are left to
+:func:`finalize_response <daemon.httpadapter.finalize_response>`.
+
+Usage::
+
+  >>> build_message(404, "404 Not Found", TEXT_PLAIN)
+  b'HTTP/1.1 404 Not Found\\r\\nDate: ...\\r\\nContent-Type: text/plain...'
+"""
+
+import email.utils
+import http
+import time
+
+#: ``Content-Type`` values used by the built-in responses.
+TEXT_HTML = "text/html; charset=utf-8"
+TEXT_PLAIN = "text/plain; charset=utf-8"
+APPLICATION_JSON = "application/json; charset=utf-8"
+
+#: Status line of every standard status code, e.g. ``b"HTTP/1.1 200 OK\r\n"``.
+STATUS_LINES = {
+    status.value: "HTTP/1.1 {} {}\r\n".format(status.value, status.phrase).encode("ascii")
+    for status in http.HTTPStatus
+}
+
+#: (second, ``Date`` header line) of the last formatted date.
+_date_cache = (0, b"")
+
+
+def status_line(status):
+    """
+    Returns the status line of a response.
+
+    :param status (int or str): status code, or code and reason phrase
+        such as ``"206 Partial Content"``.
+
+    :rtype bytes: the status line ending with CRLF.
+    """
+    line = STATUS_LINES.get(status)
+    if line is None:
+        line = "HTTP/1.1 {}\r\n".format(status).encode("latin-1")
+        if isinstance(status, str) and status[:3].isdigit():
+            line = STATUS_LINES.get(int(status[:3]), line)
+        STATUS_LINES[status] = line
+    return line
+
+
+def date_line():
+    """
+    Returns the ``Date`` header line, formatted again only when the second changed.
+
+    :rtype bytes: the header line ending with CRLF.
+    """
+    global _date_cache
+    now = int(time.time())
+    second, line = _date_cache
+    if second != now:
+        line = b"Date: " + email.utils.formatdate(now, usegmt=True).encode("ascii") + b"\r\n"
+        _date_cache = (now, line)
+    return line
+
+
+def _encode(value):
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode("latin-1")
+
+
+def build_head(status, headers=(), length=None):
+    """
+    Builds a response header block.
+
+    :param status (int or str): status code, see :func:`status_line`.
+    :param headers (iterable): ``(name, value)`` pairs, ``str`` or ``bytes``;
+        a pair whose value is None is skipped.
+    :param length (int): ``Content-Length`` value, or None to leave it out.
+
+    :rtype bytes: the header block ending with CRLF CRLF.
+    """
+    parts = [status_line(status), date_line()]
+    for name, value in headers:
+        if value is not None:
+            parts += (_encode(name), b": ", _encode(value), b"\r\n")
+    if length is not None:
+        parts += (b"Content-Length: ", b"%d" % length, b"\r\n")
+    parts.append(b"\r\n")
+    return b"".join(parts)
+
+
+def build_message(status, body=b"", content_type=None, headers=()):
+    """
+    Builds a complete response with a body.
+
+    :param status (int or str): status code, see :func:`status_line`.
+    :param body (str or bytes): body; ``str`` is utf-8 encoded.
+    :param content_type (str): ``Content-Type`` value, None for no header.
+    :param headers (iterable): additional ``(name, value)`` pairs.
+
+    :rtype bytes: the encoded response.
+    """
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    if content_type is not None:
+        headers = (("Content-Type", content_type),) + tuple(headers)
+    return build_head(status, headers, len(body)) + body
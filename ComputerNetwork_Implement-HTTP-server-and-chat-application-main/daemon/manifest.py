@@ -0,0 +1,252 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.manifest
+~~~~~~~~~~~~~~~~~
+
+This module provides the static asset manifest, built once at startup by
+:func:`load_manifest`. Every asset of ``static/`` (stylesheets, images and
+videos) is read into memory with its MIME type, content hash and size, and
+gets a fingerprinted URL carrying the hash, e.g. ``/css/chat.3f2a9c1b7e.css``
+for ``/css/chat.css``.
+
+The pages of ``www/`` reference assets by their plain URL; as a page is
+loaded into the :mod:`static cache <daemon.staticcache>` its ``href``,
+``src`` and ``url()`` references are rewritten to the fingerprinted URLs.
+A fingerprinted URL always names the same bytes, so it is served from
+memory, without ``os.stat`` or MIME type guessing, with
+:data:`IMMUTABLE_POLICY` and clients never revalidate it. A deployment
+changing an asset gives it a new URL once the server restarts.
+
+Plain asset URLs are served from memory as well, with the MIME type, size
+and entity tag of the manifest and the ``Cache-Control`` value of their
+directory; only byte range requests still read the file.
+
+Usage::
+
+  >>> load_manifest()
+  >>> asset_manifest.url_for("/css/chat.css")
+  '/css/chat.3f2a9c1b7e.css'
+"""
+
+import hashlib
+import os
+import re
+
+from .staticcache import static_cache, guess_content_type, content_etag
+from .compression import is_compressible, gzip_compress
+
+#: Directory scanned for assets, relative to the base directory; its files
+#: are served at the root of the URL space.
+ASSET_DIR = "static"
+#: MIME types of the assets served from ASSET_DIR.
+ASSET_TYPES = ("text/css", "image/", "video/")
+#: Larger files are left out of the manifest and always read from disk.
+ASSET_MAX_SIZE = 2 * 1024 * 1024
+#: Hex digits of the content hash put in a fingerprinted URL.
+FINGERPRINT_LENGTH = 10
+#: ``Cache-Control`` value of fingerprinted URLs.
+IMMUTABLE_POLICY = "public, max-age=31536000, immutable"
+#: ``Cache-Control`` value of plain URLs when the manifest is built without a policy.
+PLAIN_POLICY = "no-cache"
+
+#: Asset references in HTML attributes and CSS ``url()`` values.
+REFERENCE_RE = re.compile(
+    rb"""(\b(?:href|src)\s*=\s*["']|url\(\s*["']?)(/[^"'()\s?#]+)""", re.IGNORECASE)
+
+
+class Asset:
+    """
+    One file of the manifest.
+
+    :attrs url (str): plain URL, e.g. ``/css/chat.css``.
+    :attrs hashed_url (str): fingerprinted URL.
+    :attrs content (bytes): file content, references rewritten for stylesheets.
+    :attrs mime_type (str): MIME type.
+    :attrs etag (str): strong entity tag hashed from the content.
+    :attrs size (int): content length.
+    :attrs cache_control (str): ``Cache-Control`` value of the plain URL.
+    :attrs headers (bytes): header lines of the identity response, ``Cache-Control`` excluded.
+    :attrs gzip (tuple): (etag, header lines, content) of the gzip response, or None.
+    """
+
+    __slots__ = ("url", "hashed_url", "content", "mime_type", "etag", "size", "cache_control",
+                 "headers", "gzip")
+
+    def __init__(self, url, content, cache_control=PLAIN_POLICY):
+        self.url = url
+        self.cache_control = cache_control
+        self.content = content
+        self.size = len(content)
+        self.mime_type, content_type = guess_content_type(url)
+        digest = hashlib.sha1(content)
+        self.etag = content_etag(digest)
+        stem, ext = os.path.splitext(url)
+        self.hashed_url = "{}.{}{}".format(stem, digest.hexdigest()[:FINGERPRINT_LENGTH], ext)
+
+        compressible = is_compressible(self.mime_type, self.size)
+        vary = "Vary: Accept-Encoding\r\n" if compressible else ""
+        self.headers = "Content-Type: {}\r\nContent-Length: {}\r\nETag: {}\r\n{}".format(
+            content_type, self.size, self.etag, vary).encode("latin-1")
+        self.gzip = None
+        if compressible:
+            packed = gzip_compress(content)
+            if len(packed) < self.size:
+                etag = self.etag[:-1] + '-gz"'
+                self.gzip = (etag, ("Content-Type: {}\r\nContent-Length: {}\r\nContent-Encoding: gzip\r\n"
+                                    "ETag: {}\r\n{}").format(
+                    content_type, len(packed), etag, vary).encode("latin-1"), packed)
+
+
+class AssetManifest:
+    """
+    The immutable set of assets, looked up by fingerprinted URL.
+
+    :param assets (list): :class:`Asset <Asset>` objects.
+    """
+
+    def __init__(self, assets=()):
+        self._by_url = {asset.url: asset for asset in assets}
+        self._by_hashed_url = {asset.hashed_url: asset for asset in assets}
+
+    def __len__(self):
+        return len(self._by_url)
+
+    def lookup(self, path):
+        """
+        Returns the asset of a fingerprinted URL.
+
+        :param path (str): request path.
+
+        :rtype Asset: the asset, or None for any other path.
+        """
+        return self._by_hashed_url.get(path)
+
+    def get(self, url):
+        """
+        Returns the asset of a plain URL.
+
+        :param url (str): request path.
+
+        :rtype Asset: the asset, or None for any other path.
+        """
+        return self._by_url.get(url)
+
+    def url_for(self, url):
+        """
+        Returns the fingerprinted URL of an asset.
+
+        :param url (str): plain URL.
+
+        :rtype str: the fingerprinted URL, or ``url`` itself when it is no asset.
+        """
+        asset = self._by_url.get(url)
+        return asset.hashed_url if asset is not None else url
+
+    def rewrite(self, content):
+        """
+        Replaces the plain asset URLs referenced by a page or a stylesheet
+        with their fingerprinted URLs.
+
+        :param content (bytes): HTML or CSS text.
+
+        :rtype bytes: the rewritten text.
+        """
+        def replace(match):
+            asset = self._by_url.get(match.group(2).decode("latin-1"))
+            if asset is None:
+                return match.group(0)
+            return match.group(1) + asset.hashed_url.encode("latin-1")
+        return REFERENCE_RE.sub(replace, content)
+
+    def rewrite_page(self, path, content):
+        """
+        :attr:`StaticCache.rewrite <daemon.staticcache.StaticCache.rewrite>`
+        hook rewriting the references of HTML pages.
+
+        :param path (str): file path.
+        :param content (bytes): file content.
+
+        :rtype bytes: the content to serve.
+        """
+        if guess_content_type(path)[0] != "text/html":
+            return content
+        return self.rewrite(content)
+
+    def stats(self):
+        """
+        Returns a summary of the manifest.
+
+        :rtype dict: asset count and total bytes.
+        """
+        return {"assets": len(self._by_url),
+                "bytes": sum(asset.size for asset in self._by_url.values())}
+
+
+def build_manifest(base_dir="", policy=None):
+    """
+    Scans :data:`ASSET_DIR` and builds the manifest. Stylesheets are hashed
+    after their own references were rewritten, so editing an image also
+    changes the URL of the stylesheets using it.
+
+    :param base_dir (str): directory holding ASSET_DIR.
+    :param policy (function): returns the ``Cache-Control`` value of a file
+        path, :data:`PLAIN_POLICY` for every file when omitted.
+
+    :rtype AssetManifest: the manifest.
+    """
+    root = os.path.join(base_dir, ASSET_DIR)
+    files = {}
+    policies = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            mime_type = guess_content_type(path)[0]
+            if not mime_type.startswith(ASSET_TYPES) or not os.path.isfile(path):
+                continue
+            if os.path.getsize(path) > ASSET_MAX_SIZE:
+                continue
+            url = "/" + os.path.relpath(path, root).replace(os.sep, "/")
+            with open(path, "rb") as fh:
+                files[url] = fh.read()
+            policies[url] = policy(path) if policy is not None else PLAIN_POLICY
+
+    assets = [Asset(url, content, policies[url]) for url, content in files.items()
+              if guess_content_type(url)[0] != "text/css"]
+    media = AssetManifest(assets)
+    assets += [Asset(url, media.rewrite(content), policies[url]) for url, content in files.items()
+               if guess_content_type(url)[0] == "text/css"]
+    return AssetManifest(assets)
+
+
+#: Manifest of the process, empty until :func:`load_manifest` is called.
+asset_manifest = AssetManifest()
+
+
+def load_manifest(base_dir="", policy=None):
+    """
+    Builds the manifest of the process and installs its page rewriting in
+    the static cache. Called once at startup, before worker processes fork.
+
+    :param base_dir (str): directory holding ASSET_DIR.
+    :param policy (function): ``Cache-Control`` value of a file path, see
+        :func:`build_manifest`.
+
+    :rtype AssetManifest: the manifest.
+    """
+    global asset_manifest
+    asset_manifest = build_manifest(base_dir, policy)
+    static_cache.rewrite = asset_manifest.rewrite_page
+    static_cache.clear()
+    print("[Backend] Asset manifest: {assets} files, {bytes} bytes".format(**asset_manifest.stats()))
+    return asset_manifest
@@ -0,0 +1,311 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.prefork
+~~~~~~~~~~~~~~~~~
+
+This module provides a pre-fork multi-process backend. A supervisor process
+forks ``workers`` copies of the backend. Every worker binds its own listening
+socket to the same port with ``SO_REUSEPORT``, so the kernel spreads incoming
+connections across processes and route handling is no longer capped at one
+core by the GIL. Each worker runs any of the single-process modes.
+
+The supervisor restarts workers that exit, collects the statistics every
+worker reports through a pipe and publishes the per-worker snapshot in a JSON
+file, which ``GET /server-status`` includes under ``workers``.
+
+Usage Example:
+--------------
+>>> create_backend("127.0.0.1", 9000, routes={}, mode="eventloop", workers=4)
+
+"""
+
+import json
+import os
+import selectors
+import signal
+import socket
+import tempfile
+import threading
+import time
+
+from .backend import run_backend, process_stats, _server_state
+
+#: Seconds between two statistics reports of a worker.
+STATS_INTERVAL = 2.0
+#: A worker exiting sooner than this after its start is restarted after RESTART_DELAY.
+MIN_UPTIME = 1.0
+#: Seconds to wait before restarting a worker that failed right after starting.
+RESTART_DELAY = 1.0
+#: Seconds the workers have to exit after SIGTERM before they are killed.
+SHUTDOWN_TIMEOUT = 5.0
+
+
+def stats_path(port):
+    """
+    Returns the file the supervisor of ``port`` publishes worker statistics in.
+
+    :param port (int): backend port.
+
+    :rtype str: path of the JSON file.
+    """
+    return os.path.join(tempfile.gettempdir(), "weaprous-{}-workers.json".format(port))
+
+
+def read_worker_stats(path):
+    """
+    Reads the latest per-worker statistics published by the supervisor.
+
+    :param path (str): file returned by :func:`stats_path`.
+
+    :rtype dict: supervisor pid, update time and one entry per worker, or None.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _report_stats(wfd):
+    # Runs on a daemon thread of a worker; stops the worker once the
+    # supervisor, the reading end of the pipe, is gone.
+    while True:
+        line = json.dumps(process_stats()).encode("utf-8") + b"\n"
+        try:
+            while line:
+                line = line[os.write(wfd, line):]
+        except OSError:
+            print("[Backend] Supervisor gone, worker {} exiting".format(_server_state["worker"]))
+            os._exit(0)
+        time.sleep(STATS_INTERVAL)
+
+
+class Supervisor:
+    """
+    Forks, watches and restarts the backend worker processes.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param workers (int): number of worker processes.
+    :param mode (str): serving mode of every worker, see :func:`run_backend`.
+    :param pool_size (int): worker threads per process.
+    :param queue_size (int): job queue depth per process.
+    :param max_body_size (int): largest accepted request body.
+    """
+
+    def __init__(self, ip, port, routes, workers, mode, pool_size, queue_size, max_body_size):
+        self.ip = ip
+        self.port = port
+        self.routes = routes
+        self.workers = workers
+        self.mode = mode
+        self.pool_size = pool_size
+        self.queue_size = queue_size
+        self.max_body_size = max_body_size
+        self.stats_file = stats_path(port)
+        self.selector = selectors.DefaultSelector()
+        #: pid -> worker index of the running workers.
+        self.children = {}
+        #: worker index -> (pipe read end, partial line).
+        self.pipes = {}
+        #: worker index -> pid, start time, restart count and last report.
+        self.stats = {}
+        #: worker index -> time at which it is restarted.
+        self.restart_at = {}
+        self.running = True
+
+    def serve_forever(self):
+        """Starts the workers and supervises them until SIGTERM or SIGINT."""
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        print("[Backend] Supervisor pid {} starting {} {} workers on port {}".format(
+            os.getpid(), self.workers, self.mode, self.port))
+        for index in range(self.workers):
+            self.spawn(index)
+
+        next_publish = time.monotonic()
+        while self.running:
+            for key, _ in self.selector.select(0.5):
+                self._read_stats(key.data)
+            self._reap()
+            now = time.monotonic()
+            for index, when in list(self.restart_at.items()):
+                if now >= when and self.running:
+                    del self.restart_at[index]
+                    self.spawn(index)
+            if now >= next_publish:
+                self.publish()
+                next_publish = now + STATS_INTERVAL
+        self.shutdown()
+
+    def spawn(self, index):
+        """
+        Forks worker ``index`` with a pipe to report its statistics.
+
+        :param index (int): worker index, kept across restarts.
+        """
+        rfd, wfd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(rfd)
+            self._run_worker(index, wfd)
+
+        os.close(wfd)
+        os.set_blocking(rfd, False)
+        self._close_pipe(index)
+        self.pipes[index] = (rfd, bytearray())
+        self.selector.register(rfd, selectors.EVENT_READ, index)
+        self.children[pid] = index
+        previous = self.stats.get(index)
+        self.stats[index] = {
+            "worker": index,
+            "pid": pid,
+            "started": time.time(),
+            "restarts": previous["restarts"] + 1 if previous else 0,
+            "stats": None,
+        }
+        print("[Backend] Started worker {} pid {}".format(index, pid))
+
+    def _run_worker(self, index, wfd):
+        # Child process: drop the supervisor state and serve until killed.
+        code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            # Ctrl-C reaches the whole process group; the supervisor stops the workers.
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            for rfd, _ in self.pipes.values():
+                os.close(rfd)
+            self.selector.close()
+            _server_state["worker"] = index
+            _server_state["stats_file"] = self.stats_file
+            threading.Thread(target=_report_stats, args=(wfd,), daemon=True).start()
+            run_backend(self.ip, self.port, self.routes, self.mode,
+                        self.pool_size, self.queue_size, reuse_port=True,
+                        max_body_size=self.max_body_size)
+        except BaseException as e:
+            print("[Backend] Worker {} failed: {}".format(index, e))
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _read_stats(self, index):
+        rfd, partial = self.pipes[index]
+        try:
+            data = os.read(rfd, 65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._close_pipe(index)
+            return
+        partial += data
+        *lines, rest = partial.split(b"\n")
+        partial[:] = rest
+        for line in lines:
+            try:
+                self.stats[index]["stats"] = json.loads(line)
+            except ValueError:
+                pass
+
+    def _close_pipe(self, index):
+        pipe = self.pipes.pop(index, None)
+        if pipe is None:
+            return
+        self.selector.unregister(pipe[0])
+        os.close(pipe[0])
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            index = self.children.pop(pid, None)
+            if index is None:
+                continue
+            print("[Backend] Worker {} pid {} exited with status {}".format(
+                index, pid, os.waitstatus_to_exitcode(status)))
+            if not self.running:
+                continue
+            uptime = time.time() - self.stats[index]["started"]
+            delay = RESTART_DELAY if uptime < MIN_UPTIME else 0
+            self.restart_at[index] = time.monotonic() + delay
+
+    def publish(self):
+        """Writes the per-worker statistics to :attr:`stats_file` atomically."""
+        snapshot = {
+            "supervisor": os.getpid(),
+            "updated": time.time(),
+            "workers": [self.stats[index] for index in sorted(self.stats)],
+        }
+        tmp = "{}.{}".format(self.stats_file, os.getpid())
+        try:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(snapshot, fh)
+            os.replace(tmp, self.stats_file)
+        except OSError as e:
+            print("[Backend] Cannot publish worker stats: {}".format(e))
+
+    def _stop(self, signum, frame):
+        self.running = False
+
+    def shutdown(self):
+        """Terminates the workers, killing those still alive after SHUTDOWN_TIMEOUT."""
+        print("[Backend] Supervisor stopping {} workers".format(len(self.children)))
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.05)
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self.children.clear()
+        try:
+            os.remove(self.stats_file)
+        except OSError:
+            pass
+
+
+def run_prefork(ip, port, routes, workers, mode, pool_size, queue_size, max_body_size):
+    """
+    Starts ``workers`` backend processes sharing the port and supervises them.
+    Platforms without ``fork`` or ``SO_REUSEPORT`` run a single process.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param workers (int): number of worker processes.
+    :param mode (str): serving mode of every worker.
+    :param pool_size (int): worker threads per process.
+    :param queue_size (int): job queue depth per process.
+    :param max_body_size (int): largest accepted request body.
+    """
+    if not hasattr(os, "fork") or not hasattr(socket, "SO_REUSEPORT"):
+        print("[Backend] fork/SO_REUSEPORT unavailable, running a single process")
+        run_backend(ip, port, routes, mode, pool_size, queue_size, max_body_size=max_body_size)
+        return
+    Supervisor(ip, port, routes, workers, mode, pool_size, queue_size,
+               max_body_size).serve_forever()
@@ -16,7 +16,16 @@ daemon.proxy
 
 This module implements a simple proxy server using Python's socket and threading libraries.
 It routes incoming HTTP requests to backend services based on hostname mappings and returns
-the corresponding responses to clients.
+the corresponding responses to clients. Requests reach the backends over the pooled
+keep-alive connections of :mod:`daemon.upstream`.
+
+Requests are framed from their headers as soon as the header block arrives, and
+responses are relayed to the client piece by piece as the backend sends them, so
+neither side is buffered whole; see :mod:`daemon.relay`.
+
+``GET /proxy-status`` is answered by the proxy itself, on any host, with the
+counters of its engine, upstream pools, response cache and request
+coalescing as JSON, see :func:`proxy_stats`.
 
 Requirement:
 -----------------
@@ -25,130 +34,315 @@ Requirement:
 - response: customized :class: `Response <Response>` utilities.
 - httpadapter: :class: `HttpAdapter <HttpAdapter >` adapter for HTTP request processing.
 - dictionary: :class: `CaseInsensitiveDict <CaseInsensitiveDict>` for managing headers and cookies.
+- upstream: pooled keep-alive connections to the backends.
+- balancer: load-balancing policies of host blocks with several upstreams.
+- relay: HTTP/1.1 message framing of the client and upstream connections.
+- proxycache: response cache of the host blocks with ``proxy_cache``.
+- coalesce: single-flight of the host blocks with ``proxy_coalesce``.
 
 """
+import json
+import os
 import socket
 import threading
 from .response import *
 from .httpadapter import HttpAdapter
+from .httpwriter import build_message, TEXT_PLAIN, APPLICATION_JSON
 from .dictionary import CaseInsensitiveDict
+from .upstream import upstream_pools, HealthChecker
+from .balancer import get_balancer, parse_upstream
+from .relay import ClientStream, ClientError
+from .proxycache import proxy_cache
+from .coalesce import request_coalescer
+
+#: Header of the responses written by the proxy itself, which closes every connection.
+CLOSE = (("Connection", "close"),)
+#: Hop-by-hop headers, which apply to one connection and are never forwarded.
+HOP_BY_HOP = ("connection:", "keep-alive:", "proxy-connection:", "te:", "upgrade:")
+_HOP_BY_HOP_BYTES = tuple(name.encode() for name in HOP_BY_HOP)
+#: ``Retry-After`` seconds of the 503 answered when no upstream is available.
+RETRY_AFTER = 2
+#: Seconds allowed between two reads from, or writes to, a client.
+CLIENT_TIMEOUT = 10.0
+#: Request bodies up to this size are read whole before being forwarded, so the
+#: request can be sent again on a new connection; larger ones are streamed.
+BUFFERED_BODY_SIZE = 65536
+#: Path answered by the proxy itself with :func:`proxy_stats`, whatever the host.
+STATUS_PATH = "/proxy-status"
+
+#: Engine of the running proxy, read by :func:`proxy_stats`.
+_proxy_state = {"mode": None, "engine": None}
 
 #: A dictionary mapping hostnames to backend IP and port tuples.
 #: Used to determine routing targets for incoming requests.
+#: Route of the requests to a hostname without ``host`` block.
+DEFAULT_ROUTE = ('127.0.0.1:9000', 'round-robin', {})
 
 
 
-def forward_request(host, port, request):
+def forward_request(host, port, request, client, body=None, cache=None, flight=None):
     """
-    Forwards an HTTP request to a backend server and retrieves the response.
+    Forwards an HTTP request to a backend server and relays the response to
+    the client, over a pooled keep-alive connection. The response is framed
+    by its headers and sent to the client piece by piece as it arrives; when
+    a reused connection turns out to be closed by the backend before any
+    response byte arrived, a request without streamed body is sent again on
+    a new one. Failures and successes feed the passive health tracking of
+    the upstream.
 
     :params host (str): IP address of the backend server.
     :params port (int): port number of the backend server.
-    :params request (str): incoming HTTP request.
-
-    :rtype bytes: Raw HTTP response from the backend server. If the connection
-                  fails, returns a 404 Not Found response.
+    :params request (bytes): request head, see :func:`prepare_upstream_request`,
+        followed by the body when it was read whole.
+    :params client (socket.socket): client connection socket.
+    :params body (iterable): rest of the body, streamed from the client, or None.
+    :params cache (CacheTransaction): cache handling of the request, or None.
+    :params flight (Flight): flight led by the request, its response is
+        recorded for the identical requests waiting for it, or None.
+
+    :rtype int: status code sent to the client. If the connection fails, a
+                502 Bad Gateway response is sent, 504 Gateway Timeout when
+                the backend does not answer in time.
     """
 
-    backend = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    pool = upstream_pools.get(host, port)
+    pool.start_request()
+    try:
+        return _exchange(pool, host, port, request, client, body, cache, flight)
+    finally:
+        pool.finish_request()
+        if flight is not None:
+            flight.finish(False)
 
+
+def _reply(client, status, text):
+    """Sends a response written by the proxy, ignoring a client gone meanwhile."""
     try:
-        backend.connect((host, port))
-        backend.sendall(request.encode())
-        response = b""
-        while True:
-            chunk = backend.recv(4096)
-            if not chunk:
-                break
-            response += chunk
-        return response
-    except socket.error as e:
-      print("Socket error: {}".format(e))
-      return (
-            "HTTP/1.1 404 Not Found\r\n"
-            "Content-Type: text/plain\r\n"
-            "Content-Length: 13\r\n"
-            "Connection: close\r\n"
-            "\r\n"
-            "404 Not Found"
-        ).encode('utf-8')
+        client.sendall(build_message(status, text, TEXT_PLAIN, CLOSE))
+    except socket.error:
+        pass
+    return status
+
 
+def _exchange(pool, host, port, request, client, body, cache, flight):
+    """
+    Sends a request on a pooled connection of ``pool`` and relays the
+    response, see :func:`forward_request`.
 
-def resolve_routing_policy(hostname, routes):
+    :rtype int: the status code.
+    """
+    method = request.split(b" ", 1)[0].upper().decode("latin-1")
+    while True:
+        try:
+            conn, reused = pool.acquire()
+        except socket.error as e:
+            print("Socket error: {}".format(e))
+            pool.record_failure()
+            return _reply(client, 502, "502 Bad Gateway")
+        try:
+            conn.sock.sendall(request)
+            if body is not None:
+                for piece in body:
+                    conn.sock.sendall(piece)
+            status, head, headers = conn.read_head()
+        except ClientError as e:
+            conn.close()
+            print("[Proxy] Request body cut short: {}".format(e))
+            return _reply(client, 400, "400 Bad Request")
+        except socket.timeout as e:
+            conn.close()
+            print("Socket error: {}".format(e))
+            pool.record_failure()
+            return _reply(client, 504, "504 Gateway Timeout")
+        except socket.error as e:
+            conn.close()
+            if reused and body is None:
+                print("[Proxy] Reused connection to {}:{} was closed, retrying".format(host, port))
+                continue
+            print("Socket error: {}".format(e))
+            pool.record_failure()
+            return _reply(client, 502, "502 Bad Gateway")
+        break
+
+    # The head is sent, the client can only be cut off from now on.
+    pieces = conn.iter_body(method, status, headers)
+    piece = client_head(head)
+    if cache is not None:
+        piece = cache.on_head(status, piece, headers)
+    if flight is not None:
+        flight.on_head(status, headers, piece)
+    while piece is not None:
+        try:
+            client.sendall(piece)
+        except socket.error as e:
+            conn.close()
+            print("[Proxy] Client went away: {}".format(e))
+            return status
+        try:
+            piece = next(pieces, None)
+        except socket.error as e:
+            conn.close()
+            print("[Proxy] Response of {}:{} cut short: {}".format(host, port, e))
+            pool.record_failure()
+            return status
+        if piece is not None:
+            if cache is not None:
+                cache.on_body(piece)
+            if flight is not None:
+                flight.on_body(piece)
+    pool.release(conn)
+    pool.record_success()
+    if cache is not None:
+        cache.finish(True)
+    if flight is not None:
+        flight.finish(True)
+    return status
+
+
+def proxy_stats():
+    """
+    Returns runtime statistics of the proxy running in this process.
+
+    :rtype dict: mode, process id, live thread count, event loop counters,
+        upstream pools, response cache and request coalescing counters.
+    """
+    engine = _proxy_state["engine"]
+    return {
+        "mode": _proxy_state["mode"],
+        "pid": os.getpid(),
+        "threads": threading.active_count(),
+        "engine": engine.stats() if engine else None,
+        "upstreams": upstream_pools.stats(),
+        "proxy_cache": proxy_cache.stats(),
+        "coalesce": request_coalescer.stats(),
+    }
+
+
+def status_response(method, target):
+    """
+    Answers ``GET`` :data:`STATUS_PATH` with :func:`proxy_stats` as JSON.
+
+    :params method (str): request method.
+    :params target (str): request target.
+
+    :rtype bytes: the response, or None for any other request.
+    """
+    if method != "GET" or target.split("?", 1)[0] != STATUS_PATH:
+        return None
+    return build_message(200, json.dumps(proxy_stats()), APPLICATION_JSON, CLOSE)
+
+
+def prepare_upstream_request(request):
+    """
+    Replaces the hop-by-hop headers of a raw request with those of the
+    pooled upstream connection, which stays open after the response.
+
+    :params request (str): incoming HTTP request head.
+
+    :rtype str: the request to send upstream.
+    """
+    head, sep, body = request.partition("\r\n\r\n")
+    if not sep:
+        return request
+    lines = [line for line in head.split("\r\n")
+             if not line.lower().startswith(HOP_BY_HOP)]
+    lines.append("Connection: keep-alive")
+    return "\r\n".join(lines) + sep + body
+
+
+def client_head(head):
+    """
+    Replaces the hop-by-hop headers of an upstream response head with
+    ``Connection: close``, the proxy closing the client connection after
+    each response.
+
+    :params head (bytes): response header block ending with CRLF CRLF.
+
+    :rtype bytes: the header block to send to the client.
+    """
+    lines = [line for line in head[:-4].split(b"\r\n")
+             if not line.lower().startswith(_HOP_BY_HOP_BYTES)]
+    lines.append(b"Connection: close")
+    return b"\r\n".join(lines) + b"\r\n\r\n"
+
+
+def match_route(routes, hostname, target):
+    """
+    Finds the route of a request: one lookup of its hostname, then one walk
+    of its path in the prefix trie of the ``location`` blocks of the host,
+    see :class:`LocationTrie <daemon.proxyconf.LocationTrie>`.
+
+    :params routes (dict): dictionary mapping hostnames and location.
+    :params hostname (str): resolved hostname of the request.
+    :params target (str): request target.
+
+    :rtype tuple: (proxy_map, policy, options) of the longest matching
+        location, or of the host block itself.
+    """
+    route = routes.get(hostname, DEFAULT_ROUTE)
+    if len(route) > 3:
+        return route[3].match(target)
+    return route if len(route) > 2 else route[:2] + ({},)
+
+
+def resolve_routing_policy(hostname, routes, headers=None, client_ip=None, route=None):
     """
     Handles an routing policy to return the matching proxy_pass.
-    It determines the target backend to forward the request to.
+    It determines the target backend to forward the request to. A host
+    block with several upstreams applies its ``dist_policy`` through the
+    shared balancers of :mod:`daemon.balancer`.
 
-    :params host (str): IP address of the request target server.
-    :params port (int): port number of the request target server.
+    :params hostname (str): Host header of the request.
     :params routes (dict): dictionary mapping hostnames and location.
+    :params headers (dict): request headers, lower-case names.
+    :params client_ip (str): address of the client.
+    :params route (tuple): route of the request, see :func:`match_route`,
+        None for the route of the host block itself.
+
+    :rtype tuple: (host, port) of the chosen upstream, (None, None) when
+        every upstream of the host is ejected or down.
     """
 
-    print(hostname)
-    proxy_map, policy = routes.get(hostname,('127.0.0.1:9000','round-robin'))
-    print (proxy_map)
-    print (policy)
+    proxy_map, policy = (route or routes.get(hostname, DEFAULT_ROUTE))[:2]
 
-    proxy_host = ''
-    proxy_port = '9000'
     if isinstance(proxy_map, list):
         if len(proxy_map) == 0:
             print("[Proxy] Emtpy resolved routing of hostname {}".format(hostname))
-            print ("Empty proxy_map result")
-            # TODO: implement the error handling for non mapped host
-            #       the policy is design by team, but it can be 
-            #       basic default host in your self-defined system
             # Use a dummy host to raise an invalid connection
-            proxy_host = '127.0.0.1'
-            proxy_port = '9000'
-        elif len(proxy_map) == 1:
-            proxy_host, proxy_port = proxy_map[0].split(":", 2)
-        #elif: # apply the policy handling 
-        #   proxy_map
-        #   policy
-        else:
-            # Out-of-handle mapped host
-            proxy_host = '127.0.0.1'
-            proxy_port = '9000'
-    else:
-        print("[Proxy] resolve route of hostname {} is a singulair to".format(hostname))
-        proxy_host, proxy_port = proxy_map.split(":", 2)
-
+            return '127.0.0.1', 9000
+        if len(proxy_map) > 1:
+            chosen = get_balancer(proxy_map, policy).choose(headers or {}, client_ip)
+            if chosen is None:
+                print("[Proxy] No available upstream for hostname {}".format(hostname))
+                return None, None
+            print("[Proxy] {} policy {} chose {}:{}".format(hostname, policy, *chosen))
+            return chosen
+        proxy_map = proxy_map[0]
+
+    proxy_host, proxy_port, _ = parse_upstream(proxy_map)
+    if not upstream_pools.get(proxy_host, proxy_port).available():
+        print("[Proxy] Upstream {}:{} of hostname {} is unavailable".format(proxy_host, proxy_port, hostname))
+        return None, None
     return proxy_host, proxy_port
 
-def handle_client(ip, port, conn, addr, routes):
+def parse_client_request(request, port, routes):
     """
-    Handles an individual client connection by parsing the request,
-    determining the target backend, and forwarding the request.
+    Parses the header block of a client request: the hostname it is routed
+    by, its headers and the framing of its body.
 
-    The handler extracts the Host header from the request to
-    matches the hostname against known routes. In the matching
-    condition,it forwards the request to the appropriate backend.
-
-    The handler sends the backend response back to the client or
-    returns 404 if the hostname is unreachable or is not recognized.
-
-    :params ip (str): IP address of the proxy server.
+    :params request (str): request header block.
     :params port (int): port number of the proxy server.
-    :params conn (socket.socket): client connection socket.
-    :params addr (tuple): client address (IP, port).
     :params routes (dict): dictionary mapping hostnames and location.
-    """
 
-    #request = conn.recv(1024).decode()
-    #XUAN added code
-    request = b""
-    conn.settimeout(0.5)  # tránh treo khi client không gửi thêm
-    try:
-        while True:
-            chunk = conn.recv(4096)
-            if not chunk:
-                break
-            request += chunk
-    except socket.timeout:
-        pass
-    request = request.decode(errors="ignore")
-    #END XUAN added code
+    :rtype tuple: (hostname, headers, length, chunked), headers with
+        lower-case names, length the ``Content-Length`` value or 0.
+    :raises ValueError: without Host header or with an invalid ``Content-Length``.
+    """
+    headers = {}
+    for line in request.partition("\r\n\r\n")[0].split("\r\n")[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
 
     # Extract hostname
     hostname = None
@@ -169,36 +363,129 @@ def handle_client(ip, port, conn, addr, routes):
          
             break 
     if hostname is None:
-      
-        print("[Proxy] Error: Missing Host header")
-        response = b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n"
-        conn.sendall(response)
+        raise ValueError("Missing Host header")
+
+    chunked = headers.get("transfer-encoding", "").lower() == "chunked"
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        length = -1
+    if length < 0 and not chunked:
+        raise ValueError("Invalid Content-Length")
+    return hostname, headers, length, chunked
+
+def handle_client(ip, port, conn, addr, routes):
+    """
+    Handles an individual client connection by parsing the request,
+    determining the target backend, and forwarding the request.
+
+    The handler extracts the Host header from the request to
+    matches the hostname against known routes. In the matching
+    condition,it forwards the request to the appropriate backend, that of
+    the ``location`` block with the longest prefix of the request path
+    when the host has any.
+
+    The request is framed from its header block: the body, delimited by
+    ``Content-Length`` or chunked, is forwarded as it arrives, and the
+    backend response is relayed back to the client as it is received.
+    The handler returns 503 when no upstream of the host is available.
+    Host blocks with ``proxy_cache`` answer from :mod:`daemon.proxycache`
+    when they can, and store the responses they relay; those with
+    ``proxy_coalesce`` wait for an identical request in flight to the same
+    upstream and answer with its response, see :mod:`daemon.coalesce`.
+
+    :params ip (str): IP address of the proxy server.
+    :params port (int): port number of the proxy server.
+    :params conn (socket.socket): client connection socket.
+    :params addr (tuple): client address (IP, port).
+    :params routes (dict): dictionary mapping hostnames and location.
+    """
+
+    conn.settimeout(CLIENT_TIMEOUT)
+    client = ClientStream(conn)
+    try:
+        head = client.read_head()
+    except ClientError as e:
+        print("[Proxy] {} sent no valid request: {}".format(addr, e))
+        _reply(conn, 400, "400 Bad Request")
+        conn.close()
+        return
+    if not head:
+        conn.close()
+        return
+    request = head.decode("latin-1")
+
+    try:
+        hostname, headers, length, chunked = parse_client_request(request, port, routes)
+    except ValueError as e:
+        print("[Proxy] Error: {}".format(e))
+        _reply(conn, 400, "400 Bad Request")
         conn.close()
         return
 
     print("[Proxy] {} at Host: {}".format(addr, hostname))
 
-    # Resolve the matching destination in routes and need conver port
-    # to integer value
-    resolved_host, resolved_port = resolve_routing_policy(hostname, routes)
-    try:
-        resolved_port = int(resolved_port)
-    except ValueError:
-        print("Not a valid integer")
+    method, _, target = request.partition(" ")
+    method, target = method.upper(), target.split(" ", 1)[0]
+    status = status_response(method, target)
+    if status is not None:
+        try:
+            conn.sendall(status)
+        except socket.error:
+            pass
+        conn.close()
+        return
+    route = match_route(routes, hostname, target)
+    options = route[2]
+    cache = proxy_cache.begin(hostname, method, target, headers, options.get("proxy_cache"))
+    if cache is not None and cache.response is not None:
+        print("[Proxy] Cache hit for {}{}".format(hostname, target))
+        try:
+            conn.sendall(cache.response)
+        except socket.error:
+            pass
+        conn.close()
+        return
+
+    # Resolve the matching destination in routes
+    resolved_host, resolved_port = resolve_routing_policy(hostname, routes, headers, addr[0], route)
 
     if resolved_host:
+        flight = None
+        if options.get("proxy_coalesce"):
+            flight, leader = request_coalescer.join((resolved_host, resolved_port), hostname,
+                                                    method, target, headers, length, chunked)
+            if flight is not None and not leader:
+                response = flight.wait(headers)
+                if response is not None:
+                    print("[Proxy] Coalesced {}{} with the request in flight".format(hostname, target))
+                    try:
+                        conn.sendall(response)
+                    except socket.error:
+                        pass
+                    conn.close()
+                    return
+                flight = None
         print("[Proxy] Host name {} is forwarded to {}:{}".format(hostname,resolved_host, resolved_port))
-        response = forward_request(resolved_host, resolved_port, request)        
+        upstream_request = prepare_upstream_request(request)
+        if cache is not None:
+            upstream_request = cache.prepare(upstream_request)
+        upstream_request = upstream_request.encode("latin-1")
+        body = client.iter_body(length, chunked)
+        if not chunked and length <= BUFFERED_BODY_SIZE:
+            try:
+                upstream_request += b"".join(body)
+            except ClientError as e:
+                print("[Proxy] Request body cut short: {}".format(e))
+                _reply(conn, 400, "400 Bad Request")
+                conn.close()
+                return
+            body = None
+        forward_request(resolved_host, resolved_port, upstream_request, conn, body, cache, flight)
     else:
-        response = (
-            "HTTP/1.1 404 Not Found\r\n"
-            "Content-Type: text/plain\r\n"
-            "Content-Length: 13\r\n"
-            "Connection: close\r\n"
-            "\r\n"
-            "404 Not Found"
-        ).encode('utf-8')
-    conn.sendall(response)
+        # Every upstream is known to be down: answer without trying to connect.
+        conn.sendall(build_message(503, "503 Service Unavailable", TEXT_PLAIN,
+                                   (("Retry-After", RETRY_AFTER),) + CLOSE))
     conn.close()
 
 def run_proxy(ip, port, routes):
@@ -235,13 +522,42 @@ def run_proxy(ip, port, routes):
     except socket.error as e:
       print("Socket error: {}".format(e))
 
-def create_proxy(ip, port, routes):
+def _all_routes(routes):
+    # The route of every host block and of each of its locations.
+    for route in routes.values():
+        if len(route) > 3:
+            yield from route[3].routes()
+        else:
+            yield route
+
+
+def create_proxy(ip, port, routes, mode="thread"):
     """
     Entry point for launching the proxy server.
 
     :params ip (str): IP address to bind the proxy server.
     :params port (int): port number to listen on.
     :params routes (dict): dictionary mapping hostnames and location.
+    :params mode (str): ``thread`` per client connection, or ``eventloop``
+        to multiplex every connection on one thread, see :mod:`daemon.proxyloop`.
+
+    :raises ValueError: on an unknown mode or ``dist_policy``, or a malformed upstream.
     """
 
+    if mode not in ("thread", "eventloop"):
+        raise ValueError("Unknown proxy mode: {}".format(mode))
+
+    # Balancers are built up front, so configuration errors stop the start,
+    # and every upstream gets a pool for the health checker to probe.
+    for proxy_map, policy, *_ in _all_routes(routes):
+        if isinstance(proxy_map, list) and len(proxy_map) > 1:
+            get_balancer(proxy_map, policy)
+        for spec in (proxy_map if isinstance(proxy_map, list) else [proxy_map]):
+            upstream_pools.get(*parse_upstream(spec)[:2])
+    HealthChecker(upstream_pools).start()
+    _proxy_state["mode"] = mode
+    if mode == "eventloop":
+        from .proxyloop import run_proxy_eventloop
+        run_proxy_eventloop(ip, port, routes)
+        return
     run_proxy(ip, port, routes)
@@ -0,0 +1,503 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.proxycache
+~~~~~~~~~~~~~~~~~
+
+This module provides the in-memory response cache of the proxy, enabled per
+``host`` block of ``config/proxy.conf`` with the ``proxy_cache`` directive:
+
+- ``proxy_cache on;`` stores the responses the backend declares cacheable;
+- ``proxy_cache 5s;`` also keeps ``200`` responses without any freshness
+  information for 5 seconds, e.g. the JSON of ``/get-list``;
+- ``proxy_cache off;``, the default, forwards every request.
+
+Responses to ``GET`` are stored by vhost, method and request target, one
+variant per value of the request headers named by their ``Vary`` header,
+and ``HEAD`` requests are answered from them. Freshness follows
+``Cache-Control`` (``s-maxage``, ``max-age``) and ``Expires``; responses
+marked ``no-store`` or ``private``, setting cookies, or answering a request
+with ``Authorization`` are never stored. A stale entry, or one marked
+``no-cache`` like the pages of ``www/``, is revalidated with a conditional
+request: a ``304`` from the backend refreshes it and the cached response is
+served. Entries are evicted least recently used first, to keep the total
+size under :data:`PROXY_CACHE_SIZE`; a ``POST`` or other unsafe request
+drops the entries of its target.
+
+Each proxied request goes through a :class:`CacheTransaction
+<CacheTransaction>`, driven by both proxy engines.
+
+Usage::
+
+  >>> tx = proxy_cache.begin("app1.local", "GET", "/get-list", headers, ttl=5)
+  >>> tx.response                       # bytes to answer at once, or None
+  >>> head = tx.on_head(status, head, headers)
+  >>> tx.on_body(piece)
+  >>> tx.finish(True)
+"""
+
+import collections
+import email.utils
+import threading
+import time
+
+#: Largest total size of the cached responses, heads included.
+PROXY_CACHE_SIZE = 32 * 1024 * 1024
+#: Larger responses are relayed without being stored.
+MAX_ENTRY_SIZE = 1024 * 1024
+#: Status codes of the responses that may be stored.
+CACHEABLE_STATUSES = (200, 203, 204, 301, 404, 410)
+
+
+def parse_proxy_cache(value):
+    """
+    Parses the value of a ``proxy_cache`` directive.
+
+    :param value (str): ``off``, ``on``, or a default lifetime such as
+        ``30``, ``30s``, ``5m`` or ``1h``.
+
+    :rtype float: default lifetime in seconds, 0 for ``on``, None for ``off``.
+    :raises ValueError: on any other value.
+    """
+    value = value.strip().lower()
+    if value == "off":
+        return None
+    if value == "on":
+        return 0.0
+    units = {"s": 1, "m": 60, "h": 3600}
+    scale = units.get(value[-1:], None)
+    number = value[:-1] if scale else value
+    try:
+        ttl = float(number) * (scale or 1)
+    except ValueError:
+        raise ValueError("Invalid proxy_cache {!r}, expected on, off or a lifetime like 30s".format(value))
+    if ttl < 0:
+        raise ValueError("Invalid proxy_cache {!r}, the lifetime is negative".format(value))
+    return ttl
+
+
+def parse_cache_control(value):
+    """
+    Parses a ``Cache-Control`` header.
+
+    :param value (str): header value.
+
+    :rtype dict: directive values by lower-case name, None for directives
+        without value.
+    """
+    directives = {}
+    for item in value.split(","):
+        name, sep, arg = item.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip().strip('"') if sep else None
+    return directives
+
+
+def _seconds(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _http_date(value):
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def freshness_lifetime(headers, default_ttl, status):
+    """
+    Returns how long a response stays fresh.
+
+    :param headers (dict): response headers, lower-case names.
+    :param default_ttl (float): lifetime of ``200`` responses without
+        freshness information.
+    :param status (int): response status code.
+
+    :rtype float: lifetime in seconds, 0 when the response must be
+        revalidated at each use.
+    """
+    directives = parse_cache_control(headers.get("cache-control", ""))
+    if "no-cache" in directives:
+        return 0.0
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            lifetime = _seconds(directives[name])
+            return float(lifetime) if lifetime is not None else 0.0
+    if "expires" in headers:
+        expires = _http_date(headers["expires"])
+        if expires is None:
+            return 0.0
+        date = _http_date(headers.get("date", "")) or time.time()
+        return max(0.0, expires - date)
+    return default_ttl if status == 200 else 0.0
+
+
+def _set_headers(head, headers):
+    # Replaces or adds header lines of a raw header block.
+    names = tuple(name.lower().encode("latin-1") + b":" for name, _ in headers)
+    lines = [line for line in head[:-4].split(b"\r\n") if not line.lower().startswith(names)]
+    lines += [name.encode("latin-1") + b": " + value.encode("latin-1") for name, value in headers]
+    return b"\r\n".join(lines) + b"\r\n\r\n"
+
+
+class CacheEntry:
+    """
+    One stored response.
+
+    :attrs head (bytes): header block, as sent to clients.
+    :attrs body (bytes): body, as received from the backend.
+    :attrs etag (str): ``ETag`` value, or None.
+    :attrs last_modified (str): ``Last-Modified`` value, or None.
+    :attrs lifetime (float): freshness lifetime in seconds.
+    :attrs stored_at (float): ``time.monotonic()`` of the storage or last revalidation.
+    :attrs initial_age (int): ``Age`` of the response when stored.
+    """
+
+    __slots__ = ("head", "body", "etag", "last_modified", "lifetime", "stored_at", "initial_age")
+
+    def __init__(self, head, body, headers, lifetime):
+        self.head = head
+        self.body = body
+        self.etag = headers.get("etag")
+        self.last_modified = headers.get("last-modified")
+        self.refresh(headers, lifetime)
+
+    @property
+    def size(self):
+        return len(self.head) + len(self.body)
+
+    def refresh(self, headers, lifetime):
+        """Restarts the freshness of the entry, after a store or a ``304``."""
+        self.lifetime = lifetime
+        self.stored_at = time.monotonic()
+        self.initial_age = _seconds(headers.get("age")) or 0
+
+    def age(self, now=None):
+        """:rtype int: current age in seconds."""
+        return int(self.initial_age + ((now or time.monotonic()) - self.stored_at))
+
+    def is_fresh(self, now=None):
+        """:rtype bool: whether the entry may be served without revalidation."""
+        return self.initial_age + ((now or time.monotonic()) - self.stored_at) < self.lifetime
+
+    def response(self, state, head_only=False):
+        """
+        Returns the stored response with its current ``Age``.
+
+        :param state (str): ``X-Cache`` value, ``HIT`` or ``REVALIDATED``.
+        :param head_only (bool): leave the body out, for ``HEAD`` requests.
+
+        :rtype bytes: the response.
+        """
+        head = _set_headers(self.head, (("Age", str(self.age())), ("X-Cache", state)))
+        return head if head_only else head + self.body
+
+    def not_modified(self):
+        """
+        Returns a ``304`` response to a client already holding the entry.
+
+        :rtype bytes: the response.
+        """
+        lines = [b"HTTP/1.1 304 Not Modified"]
+        for line in self.head[:-4].split(b"\r\n")[1:]:
+            if line.lower().startswith((b"date:", b"etag:", b"cache-control:", b"expires:",
+                                        b"last-modified:", b"vary:", b"connection:")):
+                lines.append(line)
+        return _set_headers(b"\r\n".join(lines) + b"\r\n\r\n",
+                            (("Age", str(self.age())), ("X-Cache", "HIT")))
+
+
+class ProxyCache:
+    """
+    Stored responses, least recently used first, shared by every proxy
+    handler of the process.
+
+    :param max_size (int): largest total size in bytes.
+    """
+
+    def __init__(self, max_size=PROXY_CACHE_SIZE):
+        self.max_size = max_size
+        self.size = 0
+        #: Entries by (primary key, variant key), least recently used first.
+        self._entries = collections.OrderedDict()
+        #: (lower-case ``Vary`` header names, variant keys) of each primary key.
+        self._primaries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _variant(names, headers):
+        return tuple(" ".join(headers.get(name, "").lower().split()) for name in names)
+
+    def lookup(self, primary, headers):
+        """
+        Returns the entry of a request.
+
+        :param primary (tuple): (vhost, method, target).
+        :param headers (dict): request headers, lower-case names.
+
+        :rtype CacheEntry: the entry, or None.
+        """
+        with self._lock:
+            known = self._primaries.get(primary)
+            if known is None:
+                return None
+            key = (primary, self._variant(known[0], headers))
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def store(self, primary, request_headers, response_headers, entry):
+        """
+        Stores a response, evicting the least recently used ones as needed.
+
+        :param primary (tuple): (vhost, method, target).
+        :param request_headers (dict): headers of the request.
+        :param response_headers (dict): headers of the response.
+        :param entry (CacheEntry): the response.
+        """
+        names = tuple(name.strip().lower() for name in response_headers.get("vary", "").split(",")
+                      if name.strip())
+        key = (primary, self._variant(names, request_headers))
+        with self._lock:
+            known = self._primaries.get(primary)
+            if known is not None and known[0] != names:
+                # The backend changed its Vary header: the old variants are unreachable.
+                self._drop(primary)
+                known = None
+            if known is None:
+                known = self._primaries[primary] = (names, set())
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old.size
+            self._entries[key] = entry
+            known[1].add(key)
+            self.size += entry.size
+            self.stores += 1
+            while self.size > self.max_size and self._entries:
+                old_key, old = self._entries.popitem(last=False)
+                self.size -= old.size
+                self.evictions += 1
+                keys = self._primaries[old_key[0]][1]
+                keys.discard(old_key)
+                if not keys:
+                    del self._primaries[old_key[0]]
+
+    def invalidate(self, vhost, target):
+        """
+        Drops the entries of a target, after an unsafe request to it.
+
+        :param vhost (str): hostname of the request.
+        :param target (str): request target.
+        """
+        with self._lock:
+            self._drop((vhost, "GET", target))
+
+    def _drop(self, primary):
+        known = self._primaries.pop(primary, None)
+        if known is not None:
+            for key in known[1]:
+                self.size -= self._entries.pop(key).size
+
+    def clear(self):
+        """Drops every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._primaries.clear()
+            self.size = 0
+
+    def count(self, counter):
+        """Increments one of the hit counters."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def begin(self, vhost, method, target, headers, ttl):
+        """
+        Starts the cache handling of a request.
+
+        :param vhost (str): hostname of the request.
+        :param method (str): request method.
+        :param target (str): request target, query string included.
+        :param headers (dict): request headers, lower-case names.
+        :param ttl (float): ``proxy_cache`` lifetime of the host, None when
+            the cache is off for it.
+
+        :rtype CacheTransaction: the transaction, or None when the request
+            bypasses the cache.
+        """
+        if ttl is None:
+            return None
+        if method not in ("GET", "HEAD"):
+            self.invalidate(vhost, target)
+            return None
+        directives = parse_cache_control(headers.get("cache-control", ""))
+        if "no-store" in directives or "authorization" in headers or "range" in headers:
+            return None
+        return CacheTransaction(self, (vhost, "GET", target), method, headers, ttl, directives)
+
+    def stats(self):
+        """
+        Returns a snapshot of the cache counters.
+
+        :rtype dict: entries, bytes, hits, misses, revalidations, stores and evictions.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+
+class CacheTransaction:
+    """
+    The cache handling of one ``GET`` or ``HEAD`` request. When
+    :attr:`response` is set the request is answered from the cache;
+    otherwise the engine forwards :meth:`prepare` of the request, then
+    reports the response with :meth:`on_head`, :meth:`on_body` and
+    :meth:`finish`.
+
+    :attrs response (bytes): the cached answer, or None to forward the request.
+    """
+
+    __slots__ = ("cache", "primary", "method", "headers", "ttl", "entry", "revalidating",
+                 "response", "_head", "_body", "_size", "_response_headers", "_lifetime")
+
+    def __init__(self, cache, primary, method, headers, ttl, directives):
+        self.cache = cache
+        self.primary = primary
+        self.method = method
+        self.headers = headers
+        self.ttl = ttl
+        self.response = None
+        self.revalidating = False
+        self._head = None
+        self._body = None
+        self.entry = cache.lookup(primary, headers)
+        entry = self.entry
+        if entry is None:
+            cache.count("misses")
+            return
+        if entry.is_fresh() and "no-cache" not in directives \
+                and "no-cache" not in headers.get("pragma", ""):
+            cache.count("hits")
+            if self._client_has(entry):
+                self.response = entry.not_modified()
+            else:
+                self.response = entry.response("HIT", head_only=method == "HEAD")
+            return
+        # Stale: revalidated, unless the client sent its own validators.
+        cache.count("misses")
+        self.revalidating = (entry.etag or entry.last_modified) is not None and \
+            "if-none-match" not in headers and "if-modified-since" not in headers
+
+    def _client_has(self, entry):
+        tags = self.headers.get("if-none-match")
+        if tags is not None:
+            return entry.etag is not None and (tags.strip() == "*" or entry.etag in
+                                              [tag.strip() for tag in tags.split(",")])
+        since = self.headers.get("if-modified-since")
+        return since is not None and since == entry.last_modified
+
+    def prepare(self, request):
+        """
+        Adds the validators of a stale entry to the forwarded request.
+
+        :param request (str): request header block, see
+            :func:`prepare_upstream_request <daemon.proxy.prepare_upstream_request>`.
+
+        :rtype str: the request to forward.
+        """
+        if not self.revalidating:
+            return request
+        validators = []
+        if self.entry.etag:
+            validators.append("If-None-Match: {}".format(self.entry.etag))
+        if self.entry.last_modified:
+            validators.append("If-Modified-Since: {}".format(self.entry.last_modified))
+        head, sep, body = request.partition("\r\n\r\n")
+        return "\r\n".join([head] + validators) + sep + body
+
+    def on_head(self, status, head, headers):
+        """
+        Handles the response header block and decides whether to store the
+        response.
+
+        :param status (int): response status code.
+        :param head (bytes): header block as sent to the client, see
+            :func:`client_head <daemon.proxy.client_head>`.
+        :param headers (dict): response headers, lower-case names.
+
+        :rtype bytes: what to send to the client instead of ``head``: the
+            head with ``X-Cache``, or the whole cached response when a
+            revalidation returned ``304``, which has no body to relay.
+        """
+        if self.revalidating and status == 304:
+            self.entry.refresh(headers, freshness_lifetime(headers, self.ttl, 200))
+            self.cache.count("revalidated")
+            return self.entry.response("REVALIDATED", head_only=self.method == "HEAD")
+        if self.method == "GET" and self._storable(status, headers):
+            self._head = head
+            self._body = []
+            self._size = len(head)
+            self._response_headers = headers
+            self._lifetime = freshness_lifetime(headers, self.ttl, status)
+        return _set_headers(head, (("X-Cache", "MISS"),))
+
+    def _storable(self, status, headers):
+        if status not in CACHEABLE_STATUSES or "set-cookie" in headers:
+            return False
+        if headers.get("vary", "").strip() == "*":
+            return False
+        directives = parse_cache_control(headers.get("cache-control", ""))
+        if "no-store" in directives or "private" in directives:
+            return False
+        lifetime = freshness_lifetime(headers, self.ttl, status)
+        # Without freshness nor validators the entry could never be used.
+        return lifetime > 0 or "etag" in headers or "last-modified" in headers
+
+    def on_body(self, piece):
+        """Records a piece of the response body."""
+        if self._body is None:
+            return
+        self._body.append(piece)
+        self._size += len(piece)
+        if self._size > MAX_ENTRY_SIZE:
+            self._body = None
+
+    def finish(self, complete):
+        """
+        Stores the response once relayed.
+
+        :param complete (bool): whether the whole response was received.
+        """
+        if complete and self._body is not None:
+            entry = CacheEntry(self._head, b"".join(self._body), self._response_headers, self._lifetime)
+            self.cache.store(self.primary, self.headers, self._response_headers, entry)
+        self._body = None
+
+
+#: Response cache shared by every proxy handler of the process.
+proxy_cache = ProxyCache()
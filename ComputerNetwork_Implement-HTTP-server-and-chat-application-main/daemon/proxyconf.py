@@ -0,0 +1,279 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.proxyconf
+~~~~~~~~~~~~~~~~~
+
+This module parses ``config/proxy.conf`` into the routes of the proxy.
+The file holds directives, ending with ``;`` or with a block in braces,
+and ``#`` comments::
+
+  host "app1.local" {
+      proxy_pass http://127.0.0.1:9001;
+      proxy_cache 2s;
+
+      location "/api/" {
+          proxy_pass http://127.0.0.1:9000;
+
+          location "/api/chat/" {
+              proxy_coalesce on;
+          }
+      }
+  }
+
+A ``location`` block applies to the request paths starting with its prefix,
+the prefix of a nested block extending the one of its parent. A block
+inherits the ``proxy_pass`` targets, ``dist_policy`` and options of its
+parent unless it sets them. The locations of each host compile into a
+:class:`LocationTrie <LocationTrie>` at startup, so routing a request is
+one dictionary lookup for its host and a walk of its path.
+
+Usage::
+
+  >>> routes = build_routes(parse_config(text))
+  >>> proxy_map, policy, options, locations = routes["app1.local"]
+  >>> locations.match("/api/chat/history?room=1")
+  ('127.0.0.1:9000', 'round-robin', {'proxy_cache': 2.0, 'proxy_coalesce': True})
+"""
+
+import re
+
+from .proxycache import parse_proxy_cache
+from .coalesce import parse_proxy_coalesce
+
+#: Options of a ``host`` block that sets none.
+DEFAULT_OPTIONS = {"proxy_cache": None, "proxy_coalesce": False}
+#: Parser of the value of each option directive.
+OPTION_PARSERS = {
+    "proxy_cache": parse_proxy_cache,
+    "proxy_coalesce": parse_proxy_coalesce,
+}
+
+_TOKEN = re.compile(r'\s+|#[^\n]*|"([^"\n]*)"|([{};])|([^\s{};"#]+)')
+
+
+class ConfigError(ValueError):
+    """Raised on a malformed proxy configuration, with its line number."""
+
+    def __init__(self, line, message):
+        super().__init__("config line {}: {}".format(line, message))
+        self.line = line
+
+
+class Directive:
+    """
+    One directive of the configuration.
+
+    :attrs name (str): directive name.
+    :attrs args (list): arguments, quotes removed.
+    :attrs block (list): nested directives, None for a directive ending with ``;``.
+    :attrs line (int): line number of the name.
+    """
+
+    __slots__ = ("name", "args", "block", "line")
+
+    def __init__(self, name, args, block, line):
+        self.name = name
+        self.args = args
+        self.block = block
+        self.line = line
+
+
+def tokenize(text):
+    """
+    Splits a configuration into tokens, skipping blanks and comments.
+
+    :param text (str): configuration text.
+
+    :rtype generator: (token, is_word, line) tuples, ``is_word`` False for
+        ``{``, ``}`` and ``;``.
+    :raises ConfigError: on an unterminated quoted string.
+    """
+    pos, line = 0, 1
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            raise ConfigError(line, "unterminated quoted string")
+        quoted, punct, word = match.groups()
+        if punct is not None:
+            yield punct, False, line
+        elif quoted is not None or word is not None:
+            yield quoted if quoted is not None else word, True, line
+        line += match.group().count("\n")
+        pos = match.end()
+
+
+def parse_config(text):
+    """
+    Parses a configuration into its directives.
+
+    :param text (str): configuration text.
+
+    :rtype list: top-level :class:`Directive` objects.
+    :raises ConfigError: on unbalanced braces or a directive without ``;``.
+    """
+    root = []
+    # Directives of each open block, and the directive opening it.
+    stack = [root]
+    opened = []
+    words, start = [], 0
+    for token, is_word, line in tokenize(text):
+        if is_word:
+            if not words:
+                start = line
+            words.append(token)
+        elif token == "}":
+            if words:
+                raise ConfigError(start, "missing ';' after {!r}".format(words[0]))
+            if len(stack) == 1:
+                raise ConfigError(line, "unexpected '}'")
+            stack.pop()
+            opened.pop()
+        else:
+            if not words:
+                raise ConfigError(line, "unexpected {!r}".format(token))
+            block = [] if token == "{" else None
+            directive = Directive(words[0], words[1:], block, start)
+            stack[-1].append(directive)
+            if block is not None:
+                stack.append(block)
+                opened.append(directive)
+            words = []
+    if words:
+        raise ConfigError(start, "missing ';' after {!r}".format(words[0]))
+    if opened:
+        raise ConfigError(opened[-1].line, "missing '}}' closing the {} block".format(opened[-1].name))
+    return root
+
+
+class LocationTrie:
+    """
+    The routes of the locations of one host, matched by the longest prefix
+    of the request path. Each node is a dictionary of its children by
+    character, holding its route, if a location ends there, under the key
+    ``""``.
+
+    :param locations (dict): route of each location prefix, the route of
+        the ``host`` block itself under ``""``.
+    """
+
+    __slots__ = ("locations", "_root")
+
+    def __init__(self, locations):
+        self.locations = locations
+        self._root = {}
+        for prefix, route in locations.items():
+            node = self._root
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node[""] = route
+
+    def match(self, path):
+        """
+        Finds the route of a request path, in one walk of the path.
+
+        :param path (str): request target, a query string is ignored.
+
+        :rtype tuple: (proxy_map, policy, options) of the longest matching prefix.
+        """
+        node = self._root
+        route = node.get("")
+        for char in path:
+            if char == "?":
+                break
+            node = node.get(char)
+            if node is None:
+                break
+            route = node.get("", route)
+        return route
+
+    def routes(self):
+        """:rtype list: the route of every location, host block included."""
+        return list(self.locations.values())
+
+
+def _single_arg(directive):
+    if len(directive.args) != 1:
+        raise ConfigError(directive.line, "{} takes one argument".format(directive.name))
+    return directive.args[0]
+
+
+def _proxy_target(directive):
+    # "http://127.0.0.1:9001 weight=2" becomes "127.0.0.1:9001 weight=2".
+    if not directive.args or not directive.args[0].startswith("http://"):
+        raise ConfigError(directive.line, "proxy_pass expects http://host:port")
+    return " ".join([directive.args[0][len("http://"):].rstrip("/")] + directive.args[1:])
+
+
+def _read_block(block, prefix, parent, locations):
+    # Adds the route of a host or location block and of its nested
+    # locations to ``locations``, inheriting what the block does not set.
+    proxy_map, policy, options = [], None, dict(parent[2])
+    nested = []
+    for directive in block:
+        if directive.block is not None and directive.name != "location":
+            raise ConfigError(directive.line, "unexpected block {!r}".format(directive.name))
+        if directive.name == "proxy_pass":
+            proxy_map.append(_proxy_target(directive))
+        elif directive.name == "dist_policy":
+            if not directive.args:
+                raise ConfigError(directive.line, "dist_policy expects a policy name")
+            policy = " ".join(directive.args)
+        elif directive.name in OPTION_PARSERS:
+            try:
+                options[directive.name] = OPTION_PARSERS[directive.name](_single_arg(directive))
+            except ValueError as e:
+                raise ConfigError(directive.line, e)
+        elif directive.name == "location":
+            if directive.block is None:
+                raise ConfigError(directive.line, "location expects a block")
+            nested.append(directive)
+        else:
+            raise ConfigError(directive.line, "unknown directive {!r}".format(directive.name))
+    if proxy_map:
+        proxy_map = proxy_map[0] if len(proxy_map) == 1 else proxy_map
+    else:
+        proxy_map = parent[0]
+    locations[prefix] = (proxy_map, policy or parent[1], options)
+    for directive in nested:
+        child = _single_arg(directive)
+        if not child.startswith(prefix) or child == prefix:
+            raise ConfigError(directive.line, "location {!r} is not inside {!r}".format(
+                child, prefix or "/"))
+        if child in locations:
+            raise ConfigError(directive.line, "duplicate location {!r}".format(child))
+        _read_block(directive.block, child, locations[prefix], locations)
+
+
+def build_routes(directives):
+    """
+    Builds the routes of the proxy from the parsed configuration.
+
+    :param directives (list): top-level directives, see :func:`parse_config`.
+
+    :rtype dict: ``(proxy_map, policy, options, locations)`` by hostname,
+        ``proxy_map`` a ``host:port [weight=N]`` string, or a list of them
+        for several upstreams, and ``locations`` a :class:`LocationTrie`.
+    :raises ConfigError: on an unknown or malformed directive.
+    """
+    routes = {}
+    for directive in directives:
+        if directive.name != "host" or directive.block is None:
+            raise ConfigError(directive.line, "expected a host block, got {!r}".format(directive.name))
+        host = _single_arg(directive)
+        if host in routes:
+            raise ConfigError(directive.line, "duplicate host {!r}".format(host))
+        locations = {}
+        _read_block(directive.block, "", ([], "round-robin", DEFAULT_OPTIONS), locations)
+        routes[host] = locations[""] + (LocationTrie(locations),)
+    return routes
@@ -0,0 +1,618 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.proxyloop
+~~~~~~~~~~~~~~~~~
+
+This module provides the event-driven engine of the proxy, built on
+:mod:`selectors`. A single thread multiplexes every client and upstream
+socket, so an open proxied connection costs two registered sockets and a
+few buffers instead of a thread. Each connection is a small state machine:
+
+- ``head``: reading the request header block from the client;
+- ``wait``: waiting for the response of an identical request in flight to
+  the same upstream, see :mod:`daemon.coalesce`;
+- ``connect``: connecting to the chosen upstream without blocking;
+- ``forward``: sending the request, its body streamed as it arrives, and
+  waiting for the response header block;
+- ``relay``: relaying the response body to the client as it arrives;
+- ``flush``: writing what is left to the client before closing.
+
+Routing, balancing, keep-alive upstream pools and health tracking are those
+of the threaded proxy, see :mod:`daemon.proxy`, and messages are framed by
+:mod:`daemon.relay`. A side is not read while the buffer toward the other
+side holds :data:`RELAY_BUFFER_SIZE` bytes, so the memory of a connection
+is bounded whatever the message sizes and the speed of its peers.
+
+Usage Example:
+--------------
+>>> create_proxy("0.0.0.0", 8080, routes, mode="eventloop")
+
+"""
+
+import errno
+import os
+import selectors
+import socket
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from .httpwriter import build_message, TEXT_PLAIN
+from .proxy import (CLOSE, RETRY_AFTER, CLIENT_TIMEOUT, BUFFERED_BODY_SIZE, parse_client_request,
+                    resolve_routing_policy, prepare_upstream_request, client_head, match_route,
+                    status_response, _proxy_state)
+from .proxycache import proxy_cache
+from .coalesce import request_coalescer
+from .relay import BodyFramer, RelayError, RECV_SIZE, MAX_HEADER_SIZE
+from .upstream import upstream_pools, UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT
+
+#: Bytes buffered toward one side before reading from the other side pauses.
+RELAY_BUFFER_SIZE = 65536
+#: Seconds between two sweeps for timed out connections.
+SWEEP_INTERVAL = 1.0
+#: ``connect_ex`` results of a non-blocking connect under way.
+CONNECT_PENDING = (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY)
+#: Largest request kept to be sent again when a reused upstream connection
+#: turns out to be closed, head included.
+REPLAY_SIZE = MAX_HEADER_SIZE + BUFFERED_BODY_SIZE
+
+
+class _Relay:
+    """Per-client state kept by the event loop."""
+
+    __slots__ = ("sock", "addr", "state", "inbuf", "outbuf", "method", "request_framer",
+                 "pool", "upstream", "reused", "upstream_out", "replay", "response_framer",
+                 "cache", "flight", "client_mask", "upstream_mask", "last_active", "upstream_active")
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.state = "head"
+        self.inbuf = bytearray()
+        self.outbuf = bytearray()
+        self.method = None
+        self.request_framer = None
+        self.pool = None
+        self.upstream = None
+        self.reused = False
+        self.upstream_out = bytearray()
+        self.replay = None
+        self.response_framer = None
+        self.cache = None
+        self.flight = None
+        self.client_mask = 0
+        self.upstream_mask = 0
+        self.last_active = time.monotonic()
+        self.upstream_active = self.last_active
+
+
+class ProxyEventLoop:
+    """
+    A single-threaded :mod:`selectors` reverse proxy.
+
+    :param ip (str): IP address to bind the proxy server.
+    :param port (int): port number to listen on.
+    :param routes (dict): dictionary mapping hostnames and location.
+    """
+
+    def __init__(self, ip, port, routes):
+        self.ip = ip
+        self.port = port
+        self.routes = routes
+        self.selector = selectors.DefaultSelector()
+        self.relays = set()
+        self.accepted = 0
+
+    def serve_forever(self):
+        """Binds the listening socket and runs the event loop forever."""
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((self.ip, self.port))
+        server.listen(1024)
+        server.setblocking(False)
+        self.selector.register(server, selectors.EVENT_READ, None)
+        print("[Proxy] Event loop listening on IP {} port {}".format(self.ip, self.port))
+
+        next_sweep = time.monotonic() + SWEEP_INTERVAL
+        while True:
+            for key, mask in self.selector.select(SWEEP_INTERVAL):
+                relay = key.data
+                if relay is None:
+                    self._accept(server)
+                    continue
+                if relay.sock is None:
+                    continue
+                if key.fileobj is relay.sock:
+                    if mask & selectors.EVENT_READ:
+                        self._client_read(relay)
+                    if mask & selectors.EVENT_WRITE and relay.sock is not None:
+                        self._client_write(relay)
+                elif relay.upstream is not None and key.fileobj is relay.upstream.sock:
+                    if relay.state == "connect":
+                        self._connected(relay)
+                    else:
+                        if mask & selectors.EVENT_WRITE:
+                            self._upstream_write(relay)
+                        if mask & selectors.EVENT_READ and relay.upstream is not None:
+                            self._upstream_read(relay)
+                self._update(relay)
+            now = time.monotonic()
+            if now >= next_sweep:
+                self._sweep(now)
+                next_sweep = now + SWEEP_INTERVAL
+
+    def _accept(self, server):
+        while True:
+            try:
+                sock, addr = server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                # Out of descriptors: leave the connection in the backlog.
+                print("[Proxy] Accept failed: {}".format(e))
+                return
+            sock.setblocking(False)
+            relay = _Relay(sock, addr)
+            self.relays.add(relay)
+            self.accepted += 1
+            self._update(relay)
+
+    # Client side
+
+    def _client_read(self, relay):
+        try:
+            data = relay.sock.recv(RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            if relay.state != "head" or relay.inbuf:
+                print("[Proxy] {} closed the connection within the request".format(relay.addr))
+            self._close(relay)
+            return
+        relay.last_active = time.monotonic()
+        if relay.state == "head":
+            relay.inbuf += data
+            self._read_request_head(relay)
+        else:
+            self._take_body(relay, data)
+
+    def _read_request_head(self, relay):
+        end = relay.inbuf.find(b"\r\n\r\n")
+        if end == -1:
+            if len(relay.inbuf) > MAX_HEADER_SIZE:
+                print("[Proxy] {} sent no valid request: Header block too large".format(relay.addr))
+                self._respond(relay, 400, "400 Bad Request")
+            return
+        request = relay.inbuf[:end + 4].decode("latin-1")
+        rest = bytes(relay.inbuf[end + 4:])
+        relay.inbuf = None
+        try:
+            hostname, headers, length, chunked = parse_client_request(request, self.port, self.routes)
+        except ValueError as e:
+            print("[Proxy] Error: {}".format(e))
+            self._respond(relay, 400, "400 Bad Request")
+            return
+
+        print("[Proxy] {} at Host: {}".format(relay.addr, hostname))
+        method, _, target = request.partition(" ")
+        method, target = method.upper(), target.split(" ", 1)[0]
+        status = status_response(method, target)
+        if status is not None:
+            relay.outbuf = bytearray(status)
+            relay.state = "flush"
+            return
+        route = match_route(self.routes, hostname, target)
+        options = route[2]
+        relay.cache = proxy_cache.begin(hostname, method, target, headers, options.get("proxy_cache"))
+        if relay.cache is not None and relay.cache.response is not None:
+            print("[Proxy] Cache hit for {}{}".format(hostname, target))
+            relay.outbuf = bytearray(relay.cache.response)
+            relay.state = "flush"
+            return
+        host, port = resolve_routing_policy(hostname, self.routes, headers, relay.addr[0], route)
+        if not host:
+            # Every upstream is known to be down: answer without trying to connect.
+            self._respond(relay, 503, "503 Service Unavailable", (("Retry-After", RETRY_AFTER),) + CLOSE)
+            return
+        if options.get("proxy_coalesce"):
+            flight, leader = request_coalescer.join((host, port), hostname, method, target,
+                                                    headers, length, chunked)
+            if flight is not None and not leader:
+                relay.state = "wait"
+                flight.subscribe(headers, lambda response: self._coalesced(
+                    relay, response, request, host, port, hostname, target))
+                return
+            relay.flight = flight
+        self._forward(relay, request, host, port, hostname, rest, length, chunked)
+
+    def _coalesced(self, relay, response, request, host, port, hostname, target):
+        # The request in flight ended: its response, or None to forward this one.
+        if relay.sock is None:
+            return
+        if response is None:
+            self._forward(relay, request, host, port, hostname, b"", 0, False)
+        else:
+            print("[Proxy] Coalesced {}{} with the request in flight".format(hostname, target))
+            relay.outbuf = bytearray(response)
+            relay.state = "flush"
+        self._update(relay)
+
+    def _forward(self, relay, request, host, port, hostname, rest, length, chunked):
+        print("[Proxy] Host name {} is forwarded to {}:{}".format(hostname, host, port))
+        relay.method = request.partition(" ")[0].upper()
+        relay.request_framer = BodyFramer(length, chunked)
+        upstream_request = prepare_upstream_request(request)
+        if relay.cache is not None:
+            upstream_request = relay.cache.prepare(upstream_request)
+        relay.upstream_out += upstream_request.encode("latin-1")
+        relay.replay = bytearray(relay.upstream_out)
+        relay.pool = upstream_pools.get(host, port)
+        relay.pool.start_request()
+        if rest:
+            self._take_body(relay, rest)
+        if relay.state in ("head", "wait"):
+            self._connect(relay)
+
+    def _take_body(self, relay, data):
+        # Bytes past the end of the request are dropped: the client
+        # connection is closed after the response.
+        try:
+            count = relay.request_framer.measure(data)
+        except RelayError as e:
+            print("[Proxy] Request body cut short: {}".format(e))
+            if relay.response_framer is None:
+                self._drop_upstream(relay, close=True)
+                self._respond(relay, 400, "400 Bad Request")
+            else:
+                self._close(relay)
+            return
+        if not count:
+            return
+        piece = data[:count]
+        relay.upstream_out += piece
+        if relay.replay is not None:
+            if len(relay.replay) + count > REPLAY_SIZE:
+                relay.replay = None
+            else:
+                relay.replay += piece
+
+    def _client_write(self, relay):
+        if relay.outbuf:
+            try:
+                sent = relay.sock.send(relay.outbuf)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                print("[Proxy] Client went away: {}".format(e))
+                self._close(relay)
+                return
+            del relay.outbuf[:sent]
+            relay.last_active = time.monotonic()
+
+    def _respond(self, relay, status, text, headers=CLOSE):
+        # A response written by the proxy, before any byte of the upstream one.
+        relay.outbuf = bytearray(build_message(status, text, TEXT_PLAIN, headers))
+        relay.state = "flush"
+
+    # Upstream side
+
+    def _connect(self, relay):
+        relay.upstream_active = time.monotonic()
+        conn = relay.pool.take_idle()
+        if conn is not None:
+            conn.sock.setblocking(False)
+            relay.upstream = conn
+            relay.reused = True
+            relay.state = "forward"
+            return
+        relay.reused = False
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        try:
+            err = sock.connect_ex(relay.pool.address)
+        except OSError as e:
+            err = e.errno
+        if err not in CONNECT_PENDING:
+            sock.close()
+            self._upstream_failed(relay, 502, os.strerror(err))
+            return
+        relay.upstream = relay.pool.adopt(sock)
+        relay.state = "connect"
+
+    def _connected(self, relay):
+        err = relay.upstream.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if err:
+            self._upstream_failed(relay, 502, os.strerror(err))
+            return
+        relay.state = "forward"
+        relay.upstream_active = time.monotonic()
+
+    def _upstream_write(self, relay):
+        try:
+            sent = relay.upstream.sock.send(relay.upstream_out)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self._upstream_lost(relay, e)
+            return
+        del relay.upstream_out[:sent]
+        relay.upstream_active = time.monotonic()
+
+    def _upstream_read(self, relay):
+        conn = relay.upstream
+        try:
+            data = conn.sock.recv(RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self._upstream_lost(relay, e)
+            return
+        relay.upstream_active = time.monotonic()
+        if not data:
+            if relay.state == "relay" and relay.response_framer.until_eof:
+                self._response_done(relay)
+            else:
+                self._upstream_lost(relay, "Upstream closed the connection")
+            return
+        conn.buffer += data
+        if relay.state == "forward":
+            self._read_response_head(relay)
+        if relay.state == "relay":
+            self._relay_body(relay)
+
+    def _read_response_head(self, relay):
+        conn = relay.upstream
+        while True:
+            end = conn.buffer.find(b"\r\n\r\n")
+            if end == -1:
+                if len(conn.buffer) > MAX_HEADER_SIZE:
+                    self._upstream_failed(relay, 502, "Response header block too large")
+                return
+            head = bytes(conn.buffer[:end + 4])
+            del conn.buffer[:end + 4]
+            try:
+                parsed = conn.parse_head(head)
+                if parsed is None:
+                    continue
+                status, headers = parsed
+                relay.response_framer = conn.body_framer(relay.method, status, headers)
+            except RelayError as e:
+                self._upstream_failed(relay, 502, e)
+                return
+            head = client_head(head)
+            if relay.cache is not None:
+                head = relay.cache.on_head(status, head, headers)
+            if relay.flight is not None:
+                relay.flight.on_head(status, headers, head)
+            relay.outbuf += head
+            relay.replay = None
+            relay.state = "relay"
+            return
+
+    def _relay_body(self, relay):
+        conn = relay.upstream
+        try:
+            count = relay.response_framer.measure(conn.buffer)
+        except RelayError as e:
+            self._upstream_lost(relay, e)
+            return
+        if count:
+            piece = bytes(conn.buffer[:count])
+            del conn.buffer[:count]
+            relay.outbuf += piece
+            if relay.cache is not None:
+                relay.cache.on_body(piece)
+            if relay.flight is not None:
+                relay.flight.on_body(piece)
+        if relay.response_framer.done:
+            self._response_done(relay)
+
+    def _response_done(self, relay):
+        conn = relay.upstream
+        if conn.buffer or relay.upstream_out or not relay.request_framer.done:
+            # The upstream answered before reading the whole request.
+            conn.reusable = False
+        self._unregister_upstream(relay)
+        conn.sock.settimeout(UPSTREAM_READ_TIMEOUT)
+        relay.pool.release(conn)
+        relay.pool.record_success()
+        if relay.cache is not None:
+            relay.cache.finish(True)
+        if relay.flight is not None:
+            relay.flight.finish(True)
+        relay.upstream = None
+        self._drop_upstream(relay)
+        relay.state = "flush"
+
+    def _upstream_lost(self, relay, reason):
+        # The upstream connection failed while forwarding or relaying.
+        if relay.state == "relay":
+            print("[Proxy] Response of {}:{} cut short: {}".format(
+                relay.pool.address[0], relay.pool.address[1], reason))
+            relay.pool.record_failure()
+            self._drop_upstream(relay, close=True)
+            relay.state = "flush"
+            return
+        if relay.reused and relay.replay is not None:
+            print("[Proxy] Reused connection to {}:{} was closed, retrying".format(*relay.pool.address))
+            self._unregister_upstream(relay)
+            relay.upstream.close()
+            relay.upstream = None
+            relay.upstream_out = bytearray(relay.replay)
+            self._connect(relay)
+            return
+        self._upstream_failed(relay, 502, reason)
+
+    def _upstream_failed(self, relay, status, reason):
+        # Nothing of the response was sent yet: the proxy answers itself.
+        print("Socket error: {}".format(reason))
+        relay.pool.record_failure()
+        self._drop_upstream(relay, close=True)
+        text = "504 Gateway Timeout" if status == 504 else "502 Bad Gateway"
+        self._respond(relay, status, text)
+
+    def _unregister_upstream(self, relay):
+        if relay.upstream_mask:
+            self.selector.unregister(relay.upstream.sock)
+            relay.upstream_mask = 0
+
+    def _drop_upstream(self, relay, close=False):
+        # Ends the request on the upstream side, closing its connection if
+        # it was not released to the pool, and the flight it led.
+        if relay.upstream is not None:
+            self._unregister_upstream(relay)
+            if close:
+                relay.upstream.close()
+            relay.upstream = None
+        if relay.pool is not None:
+            relay.pool.finish_request()
+            relay.pool = None
+        if relay.flight is not None:
+            flight, relay.flight = relay.flight, None
+            flight.finish(False)
+
+    # Both sides
+
+    def _close(self, relay):
+        # Closes the client connection, and the upstream one if still in use.
+        if relay.sock is None:
+            return
+        self._drop_upstream(relay, close=True)
+        if relay.client_mask:
+            self.selector.unregister(relay.sock)
+            relay.client_mask = 0
+        relay.sock.close()
+        relay.sock = None
+        self.relays.discard(relay)
+
+    def _update(self, relay):
+        # Sets the events each socket of the connection waits for: a side
+        # is not read while the buffer toward the other side is full.
+        if relay.sock is None:
+            return
+        if relay.state == "flush" and not relay.outbuf:
+            self._close(relay)
+            return
+        mask = 0
+        if relay.state == "head":
+            mask = selectors.EVENT_READ
+        elif (relay.request_framer is not None and not relay.request_framer.done
+              and relay.state != "flush" and len(relay.upstream_out) < RELAY_BUFFER_SIZE):
+            mask = selectors.EVENT_READ
+        if relay.outbuf:
+            mask |= selectors.EVENT_WRITE
+        relay.client_mask = self._set_mask(relay.sock, relay.client_mask, mask, relay)
+
+        if relay.upstream is None:
+            return
+        if relay.state == "connect":
+            mask = selectors.EVENT_WRITE
+        else:
+            mask = selectors.EVENT_WRITE if relay.upstream_out else 0
+            if len(relay.outbuf) < RELAY_BUFFER_SIZE:
+                mask |= selectors.EVENT_READ
+        relay.upstream_mask = self._set_mask(relay.upstream.sock, relay.upstream_mask, mask, relay)
+
+    def _set_mask(self, sock, old, new, relay):
+        if new == old:
+            return new
+        if not new:
+            self.selector.unregister(sock)
+        elif not old:
+            self.selector.register(sock, new, relay)
+        else:
+            self.selector.modify(sock, new, relay)
+        return new
+
+    def _sweep(self, now):
+        for relay in list(self.relays):
+            client_idle = now - relay.last_active
+            upstream_idle = now - relay.upstream_active
+            if relay.state == "head":
+                if client_idle > CLIENT_TIMEOUT:
+                    self._close(relay)
+                    continue
+            elif relay.outbuf and client_idle > CLIENT_TIMEOUT:
+                print("[Proxy] Client {} stopped reading, closing".format(relay.addr))
+                self._close(relay)
+                continue
+            elif relay.state == "connect":
+                if upstream_idle > UPSTREAM_CONNECT_TIMEOUT:
+                    self._upstream_failed(relay, 502, "Connection timed out")
+            elif relay.state == "forward":
+                if not relay.request_framer.done and client_idle > CLIENT_TIMEOUT:
+                    print("[Proxy] Request body of {} timed out".format(relay.addr))
+                    self._drop_upstream(relay, close=True)
+                    self._respond(relay, 408, "408 Request Timeout")
+                elif upstream_idle > UPSTREAM_READ_TIMEOUT:
+                    self._upstream_failed(relay, 504, "Upstream timed out")
+            elif relay.state == "relay":
+                # An upstream left unread while the client is behind is not idle.
+                if upstream_idle > UPSTREAM_READ_TIMEOUT and len(relay.outbuf) < RELAY_BUFFER_SIZE:
+                    self._upstream_lost(relay, "Upstream timed out")
+            self._update(relay)
+
+    def stats(self):
+        """
+        Returns a snapshot of the loop counters.
+
+        :rtype dict: open and accepted connection counts.
+        """
+        return {
+            "open_connections": len(self.relays),
+            "accepted": self.accepted,
+        }
+
+
+def raise_open_files_limit():
+    """
+    Raises the soft limit of open descriptors of the process to its hard
+    limit, each proxied connection holding two.
+
+    :rtype int: the limit in effect, or None when it cannot be read.
+    """
+    if resource is None:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+            soft = hard
+        except (ValueError, OSError):
+            pass
+    return soft
+
+
+def run_proxy_eventloop(ip, port, routes):
+    """
+    Starts the event-loop proxy and serves requests forever.
+
+    :params ip (str): IP address to bind the proxy server.
+    :params port (int): port number to listen on.
+    :params routes (dict): dictionary mapping hostnames and location.
+    """
+    limit = raise_open_files_limit()
+    if limit is not None:
+        print("[Proxy] Open files limit {}".format(limit))
+    loop = ProxyEventLoop(ip, port, routes)
+    _proxy_state["engine"] = loop
+    try:
+        loop.serve_forever()
+    except socket.error as e:
+        print("Socket error: {}".format(e))
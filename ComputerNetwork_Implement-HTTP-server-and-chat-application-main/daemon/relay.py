@@ -0,0 +1,237 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.relay
+~~~~~~~~~~~~~~~~~
+
+This module provides the HTTP/1.1 message framing used by the proxy on
+both of its sides. A :class:`BodyFramer <BodyFramer>` tells, from the bytes
+received so far, how many belong to a body delimited by ``Content-Length``,
+by the chunks of ``Transfer-Encoding: chunked`` (relayed with their framing)
+or by the end of the connection; it does no I/O, so blocking relays and the
+:mod:`event loop <daemon.proxyloop>` share it.
+
+A :class:`FramedStream <FramedStream>` reads from a blocking socket into a
+buffer holding at most one ``recv`` past the current message, returns header
+blocks once complete, and yields bodies piece by piece as they arrive.
+Nothing is decoded or accumulated, so a message of any size goes through the
+proxy with bounded memory.
+
+:class:`ClientStream <ClientStream>` frames the requests of a proxy client;
+:class:`UpstreamConnection <daemon.upstream.UpstreamConnection>` frames the
+responses of a backend.
+
+Usage::
+
+  >>> client = ClientStream(conn)
+  >>> head = client.read_head()
+  >>> for piece in client.iter_body(length, chunked):
+  ...     upstream.sendall(piece)
+"""
+
+#: Bytes read per ``recv`` call.
+RECV_SIZE = 65536
+#: Largest accepted header block.
+MAX_HEADER_SIZE = 65536
+#: Largest accepted chunk-size line of a chunked body, extensions included.
+MAX_CHUNK_LINE = 1024
+
+
+class RelayError(OSError):
+    """Raised when a relayed message is malformed or cut short."""
+
+
+class ClientError(RelayError):
+    """Raised when the client of the proxy fails, closes or times out."""
+
+
+class BodyFramer:
+    """
+    Incremental framing of one body: fed the received bytes, returns how
+    many of them belong to the body, without copying them.
+
+    :param length (int): ``Content-Length`` of the body.
+    :param chunked (bool): whether the body is chunked, ``length`` is ignored.
+    :param until_eof (bool): whether the body ends with the connection.
+
+    :attrs done (bool): whether the whole body was measured.
+    """
+
+    __slots__ = ("remaining", "chunked", "until_eof", "done", "_state")
+
+    def __init__(self, length=0, chunked=False, until_eof=False):
+        self.remaining = length
+        self.chunked = chunked
+        self.until_eof = until_eof and not chunked
+        self.done = not chunked and not self.until_eof and length <= 0
+        self._state = "size"
+
+    def measure(self, data, start=0):
+        """
+        Returns how many bytes of ``data[start:]`` belong to the body.
+        Bytes past the returned count are either the start of an incomplete
+        chunk-size or trailer line, to measure again once more bytes arrived,
+        or past the end of the body.
+
+        :param data (bytes or bytearray): received bytes.
+        :param start (int): offset of the first byte not measured yet.
+
+        :rtype int: byte count.
+        :raises RelayError: on a malformed chunk-size line.
+        """
+        end = len(data)
+        pos = start
+        if self.until_eof:
+            return end - start
+        if not self.chunked:
+            take = min(self.remaining, end - pos)
+            self.remaining -= take
+            self.done = self.remaining == 0
+            return take
+        while not self.done and pos < end:
+            if self._state == "data":
+                take = min(self.remaining, end - pos)
+                self.remaining -= take
+                pos += take
+                if self.remaining == 0:
+                    self._state = "size"
+                continue
+            line_end = data.find(b"\r\n", pos)
+            if line_end == -1:
+                if end - pos > MAX_CHUNK_LINE:
+                    raise RelayError("Chunk size line too long")
+                break
+            if self._state == "size":
+                size_field = bytes(data[pos:line_end]).split(b";", 1)[0].strip()
+                try:
+                    size = int(size_field, 16)
+                except ValueError:
+                    raise RelayError("Invalid chunk size: {!r}".format(size_field))
+                # Last chunk: the body ends after the (usually empty) trailers.
+                self._state = "trailers" if size == 0 else "data"
+                self.remaining = size + 2
+            elif line_end == pos:
+                self.done = True
+            pos = line_end + 2
+        return pos - start
+
+
+class FramedStream:
+    """
+    A socket with the bytes received past the message being read.
+
+    :attrs sock (socket.socket): connected socket.
+    :attrs buffer (bytearray): received bytes not consumed yet.
+    """
+
+    __slots__ = ("sock", "buffer")
+
+    #: Name of the peer in error messages.
+    peer = "Peer"
+    #: Exception raised on framing errors.
+    error = RelayError
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = bytearray()
+
+    def _fill(self):
+        data = self.sock.recv(RECV_SIZE)
+        if data:
+            self.buffer += data
+        return len(data)
+
+    def _cut_short(self, where):
+        return self.error("{} closed the connection {}".format(self.peer, where))
+
+    def read_head(self):
+        """
+        Reads the next header block, start line included.
+
+        :rtype bytes: the raw header block ending with CRLF CRLF, or
+            ``b""`` when the peer closed before sending any byte.
+        :raises RelayError: when the block is too large or cut short.
+        """
+        scan_from = 0
+        while True:
+            end = self.buffer.find(b"\r\n\r\n", scan_from)
+            if end != -1:
+                break
+            if len(self.buffer) > MAX_HEADER_SIZE:
+                raise self.error("Header block too large")
+            scan_from = max(0, len(self.buffer) - 3)
+            if not self._fill():
+                if not self.buffer:
+                    return b""
+                raise self._cut_short("within the header block")
+        head = bytes(self.buffer[:end + 4])
+        del self.buffer[:end + 4]
+        return head
+
+    def iter_framed(self, framer):
+        """
+        Yields a body piece by piece as it arrives.
+
+        :param framer (BodyFramer): framing of the body.
+
+        :rtype generator: body pieces.
+        :raises RelayError: when the body is malformed or cut short.
+        """
+        buf = self.buffer
+        while not framer.done:
+            if buf:
+                try:
+                    count = framer.measure(buf)
+                except RelayError as e:
+                    raise self.error(str(e))
+                if count:
+                    piece = bytes(buf[:count])
+                    del buf[:count]
+                    yield piece
+                    continue
+            if not self._fill():
+                if framer.until_eof:
+                    return
+                raise self._cut_short("within the body")
+
+
+class ClientStream(FramedStream):
+    """
+    The connection of a proxy client. Socket errors are raised as
+    :class:`ClientError`, so a relay tells a failing client from a failing
+    upstream.
+    """
+
+    __slots__ = ()
+
+    peer = "Client"
+    error = ClientError
+
+    def _fill(self):
+        try:
+            return super()._fill()
+        except ClientError:
+            raise
+        except OSError as e:
+            raise ClientError("Client connection failed: {}".format(e)) from e
+
+    def iter_body(self, length, chunked):
+        """
+        Yields the body of the request whose head :meth:`read_head` returned.
+
+        :param length (int): ``Content-Length`` value, None when absent.
+        :param chunked (bool): whether the body is chunked.
+
+        :rtype generator: body pieces.
+        """
+        return self.iter_framed(BodyFramer(length or 0, chunked))
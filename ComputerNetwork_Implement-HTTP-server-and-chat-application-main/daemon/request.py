@@ -17,11 +17,19 @@ daemon.request
 This module provides a Request object to manage and persist 
 request settings (cookies, auth, proxies).
 """
+import contextvars
+
 from .dictionary import CaseInsensitiveDict
+from .httpparser import ParsedRequest
 from .session_store import get_user_from_session  # added import
 
 DEBUG = True  # set True only when debugging
 
+#: The :class:`Request <Request>` being handled by the current route handler.
+#: Unlike ``threading.current_thread().request_obj`` it is also correct for
+#: ``async def`` handlers sharing one event-loop thread.
+current_request = contextvars.ContextVar("current_request", default=None)
+
 class Request():
     """The fully mutable "class" `Request <Request>` object,
     containing the exact bytes that will be sent to the server.
@@ -49,6 +57,7 @@ class Request():
         "body",
         "routes",
         "hook",
+        "stream",
         "auth",    # added
         "user",    # added
     ]
@@ -66,6 +75,8 @@ class Request():
         self.cookies = None
         #: request body to send to the server.
         self.body = None
+        #: spooled request body (binary file), see :mod:`daemon.httpparser`.
+        self.stream = None
         #: Routes
         self.routes = {}
         #: Hook point for routed mapped-path
@@ -116,10 +127,30 @@ class Request():
         return headers
 
     def prepare(self, request, routes=None):
-        """Prepares the entire request with the given parameters."""
+        """Prepares the entire request with the given parameters.
+
+        :param request (ParsedRequest or str): a request produced by
+            :class:`RequestParser <daemon.httpparser.RequestParser>`, whose
+            request line, headers and body are used as they are, or the raw
+            request text.
+        :param routes (dict): Mapping of route keys to handler functions.
+        """
 
         # Prepare the request line from the request header
-        self.method, self.path, self.version = self.extract_request_line(request)
+        if self.stream is not None:
+            self.stream.close()
+        if isinstance(request, ParsedRequest):
+            self.method, self.path, self.version = request.method, request.path, request.version
+            if self.path == '/':
+                self.path = '/index.html'
+            self.headers = request.headers
+            self.body = request.body
+            self.stream = request.stream
+        else:
+            self.method, self.path, self.version = self.extract_request_line(request)
+            self.headers = self.prepare_headers(request)
+            self.body = None
+            self.stream = None
         if DEBUG:
             print(f"[Request] {self.method} path {self.path} version {self.version}")
 
@@ -130,7 +161,8 @@ class Request():
         # TODO manage the webapp hook in this mounting point
         #
         
-        if not routes == {}:
+        self.hook = None
+        if routes:
             self.routes = routes
             self.hook = routes.get((self.method, self.path))
             #
@@ -138,7 +170,6 @@ class Request():
             # ...
             #
 
-        self.headers = self.prepare_headers(request)
         cookies = self.headers.get('cookie', '')
         #
         #  TODO: implement the cookie function here
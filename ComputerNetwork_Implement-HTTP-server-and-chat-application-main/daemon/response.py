@@ -18,14 +18,174 @@ This module provides a :class: `Response <Response>` object to manage and persis
 response settings (cookies, auth, proxies), and to construct HTTP responses
 based on incoming requests. 
 
-The current version supports MIME type detection, content loading and header formatting
+The current version supports MIME type detection, content loading and header formatting.
+:class:`StreamingResponse <StreamingResponse>` sends a body produced by an
+iterable with chunked transfer-encoding, and :class:`FileResponse <FileResponse>`
+sends a large file straight from its descriptor with ``sendfile``.
+Fingerprinted asset URLs are answered from the :mod:`asset manifest
+<daemon.manifest>`.
 """
+import collections
 import datetime
+import email.utils
 import os
+import stat
 import mimetypes
+import zlib
 from .dictionary import CaseInsensitiveDict
+from .staticcache import static_cache, guess_content_type
+from .compression import accepts_gzip, gzip_encoder, is_compressible
+from .httpwriter import build_head, build_message, status_line, date_line, TEXT_HTML, TEXT_PLAIN
+from . import manifest
 
 BASE_DIR = ""
+#: Regular files at least this large are sent with sendfile instead of being
+#: read into memory; smaller ones, and compressible ones to clients accepting
+#: gzip, are served from the static cache.
+SENDFILE_MIN_SIZE = 16 * 1024
+#: Bytes read per step when a file body is sent without sendfile.
+FILE_CHUNK_SIZE = 65536
+#: ``Cache-Control`` value of the files below each directory, relative to
+#: BASE_DIR; the longest matching directory wins. Files outside all of them
+#: get DEFAULT_CACHE_POLICY. Set with ``--cache-policy DIR=VALUE``.
+CACHE_POLICY = {
+    "www/": "no-cache",
+    "static/": "public, max-age=3600",
+}
+DEFAULT_CACHE_POLICY = "no-cache"
+#: Range requests asking for more ranges than this get the whole file.
+MAX_RANGES = 16
+
+
+def cache_policy(filepath):
+    """
+    Returns the ``Cache-Control`` value of a served file, see :data:`CACHE_POLICY`.
+
+    :params filepath (str): path of the file.
+
+    :rtype str: the header value.
+    """
+    relpath = os.path.relpath(filepath, BASE_DIR or os.curdir).replace(os.sep, "/")
+    best = None
+    for directory in CACHE_POLICY:
+        if relpath.startswith(directory) and (best is None or len(directory) > len(best)):
+            best = directory
+    return CACHE_POLICY[best] if best is not None else DEFAULT_CACHE_POLICY
+
+
+def set_cache_policy(specs):
+    """
+    Updates :data:`CACHE_POLICY` from ``DIR=VALUE`` strings, e.g.
+    ``static/images/=public, max-age=86400``.
+
+    :params specs (list): policies given on the command line.
+
+    :raises ValueError: if a policy has no ``=``.
+    """
+    for spec in specs or ():
+        directory, sep, value = spec.partition('=')
+        if not sep or not directory.strip():
+            raise ValueError("Invalid cache policy {!r}, expected DIR=VALUE".format(spec))
+        directory = directory.strip().rstrip('/') + '/'
+        CACHE_POLICY[directory] = value.strip()
+
+
+def parse_range(value, size):
+    """
+    Parses a ``Range`` header against a resource of ``size`` bytes.
+    Overlapping ranges are merged.
+
+    :params value (str): header value, e.g. ``bytes=0-99,-100``.
+    :params size (int): resource length.
+
+    :rtype list: ``(start, end)`` inclusive byte positions; empty when no
+        range is satisfiable, or None when the header is to be ignored
+        (invalid, another unit or more than :data:`MAX_RANGES` ranges).
+    """
+    unit, sep, specs = value.partition('=')
+    if unit.strip().lower() != 'bytes' or not sep:
+        return None
+    specs = specs.split(',')
+    if len(specs) > MAX_RANGES:
+        return None
+    ranges = []
+    for spec in specs:
+        first, dash, last = spec.strip().partition('-')
+        if not dash or (first and not first.isdigit()) or (last and not last.isdigit()):
+            return None
+        if not first:
+            # Suffix range: the last N bytes.
+            if not last:
+                return None
+            suffix = int(last)
+            if suffix and size:
+                ranges.append((max(size - suffix, 0), size - 1))
+            continue
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        if start < size:
+            ranges.append((start, min(int(last), size - 1) if last else size - 1))
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def if_range_matches(value, etag, last_modified):
+    """
+    Evaluates an ``If-Range`` header: the range only applies when the client
+    copy is still the current one.
+
+    :params value (str): header value, an entity tag or an HTTP date.
+    :params etag (str): current entity tag of the resource.
+    :params last_modified (str): current modification date of the resource.
+
+    :rtype bool: True when the ``Range`` header is to be honoured.
+    """
+    value = value.strip()
+    if value.startswith(('"', 'W/')):
+        # Weak tags never match for ranges.
+        return value == etag
+    try:
+        return (email.utils.parsedate_to_datetime(value) ==
+                email.utils.parsedate_to_datetime(last_modified))
+    except (TypeError, ValueError):
+        return False
+
+
+def not_modified(headers, etag, last_modified):
+    """
+    Evaluates the conditional headers of a ``GET`` request. ``If-None-Match``
+    takes precedence; ``If-Modified-Since`` is only used without it.
+
+    :params headers (dict): request headers, lowercase names.
+    :params etag (str): current entity tag of the resource.
+    :params last_modified (str): current modification date of the resource.
+
+    :rtype bool: True when the client copy is current and a 304 is due.
+    """
+    if_none_match = headers.get('if-none-match')
+    if if_none_match is not None:
+        if if_none_match.strip() == '*':
+            return True
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return any((tag[2:] if tag.startswith('W/') else tag) == etag for tag in tags)
+    if_modified_since = headers.get('if-modified-since')
+    if if_modified_since and last_modified:
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+            modified = email.utils.parsedate_to_datetime(last_modified)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.timezone.utc)
+        return modified <= since
+    return False
+
 
 class Response():   
     """The :class:`Response <Response>` object, which contains a
@@ -187,111 +347,136 @@ class Response():
         return base_dir
 
 
-    def build_content(self, path, base_dir):
+    def build_content(self, path, base_dir, accept_gzip=False):
         """
-        Loads the objects file from storage space.
+        Loads the objects file from storage space, through the shared
+        :data:`static_cache <daemon.staticcache.static_cache>`. Compressible
+        files are returned as their cached gzip variant to clients accepting it.
 
         :params path (str): relative path to the file.
         :params base_dir (str): base directory where the file is located.
+        :params accept_gzip (bool): whether the gzip variant may be returned.
 
         :rtype tuple: (int, bytes) representing content length and content data.
+
+        :raises FileNotFoundError: if the file does not exist or lies outside base_dir.
         """
 
         filepath = os.path.join(base_dir, path.lstrip('/'))
+        root = os.path.realpath(base_dir)
+        if os.path.commonpath([root, os.path.realpath(filepath)]) != root:
+            raise FileNotFoundError(filepath)
 
         print("[Response] serving the object at location {}".format(filepath))
-        #
-            #  TODO: implement the step of fetch the object file
-            #        store in the return value of content
-            #
-        try:
-            with open(filepath, 'rb') as fh:
-                content = fh.read()
-        except FileNotFoundError:
-            # Not found -> return simple 404 body
-            body = b"404 Not Found"
-            return len(body), body
-        except Exception as e:
-            # On error, return empty body (caller may handle)
-            print("[Response] error reading file:", e)
-            return 0, b""
-        #end todo Xuan
-        return len(content), content
+        entry = static_cache.get(filepath)
+        self.headers['Content-Type'] = entry.content_type
+        self.headers['Last-Modified'] = entry.last_modified
+        if entry.compressible:
+            self.headers['Vary'] = 'Accept-Encoding'
+            variant = static_cache.gzip_variant(entry) if accept_gzip else None
+            if variant is not None:
+                self.headers['Content-Encoding'] = 'gzip'
+                self.headers['ETag'] = variant.etag
+                return len(variant.content), variant.content
+        if entry.rewritten:
+            # Byte ranges would be taken from the file on disk.
+            self.headers['Accept-Ranges'] = 'none'
+        self.headers['ETag'] = entry.etag
+        return entry.size, entry.content
+
+
+    def open_large_file(self, path, base_dir, accept_gzip=False):
+        """
+        Opens the file to serve when it is a regular file of at least
+        :data:`SENDFILE_MIN_SIZE` bytes, to be sent with sendfile. Smaller
+        files, non-regular files (pipes, devices), HTML pages rewritten by
+        the asset manifest, and compressible files the static cache keeps
+        for a client accepting gzip are left to :meth:`build_content`.
+
+        :params path (str): relative path to the file.
+        :params base_dir (str): base directory where the file is located.
+        :params accept_gzip (bool): whether the gzip variant may be returned.
+
+        :rtype file: the file opened in binary mode, or None.
+
+        :raises FileNotFoundError: if the file does not exist or lies outside base_dir.
+        """
+
+        filepath = os.path.join(base_dir, path.lstrip('/'))
+        root = os.path.realpath(base_dir)
+        if os.path.commonpath([root, os.path.realpath(filepath)]) != root:
+            raise FileNotFoundError(filepath)
+
+        st = os.stat(filepath)
+        if not stat.S_ISREG(st.st_mode) or st.st_size < SENDFILE_MIN_SIZE:
+            return None
+        mime_type, content_type = guess_content_type(filepath)
+        if mime_type == 'text/html' and static_cache.rewrite is not None:
+            return None
+        compressible = is_compressible(mime_type, st.st_size)
+        if compressible and accept_gzip and st.st_size <= static_cache.max_file_size:
+            return None
+        self.headers['ETag'], self.headers['Last-Modified'] = static_cache.validators(filepath, st)
+        fh = open(filepath, 'rb')
+        self.headers['Content-Type'] = content_type
+        if compressible:
+            self.headers['Vary'] = 'Accept-Encoding'
+        print("[Response] sending the object at location {} with sendfile".format(filepath))
+        return fh
+
+
+    def build_asset(self, request, asset, plain=False):
+        """
+        Serves an asset of the :mod:`asset manifest <daemon.manifest>` from
+        memory, gzip-compressed when the client accepts it. Fingerprinted
+        URLs are immutable, plain URLs get the policy of their directory.
+
+        :params request (class:`Request <Request>`): incoming request object.
+        :params asset (class:`Asset <daemon.manifest.Asset>`): the requested asset.
+        :params plain (bool): whether the plain URL was requested.
+
+        :rtype bytes: complete HTTP response.
+        """
+
+        etag, headers, content = asset.etag, asset.headers, asset.content
+        if asset.gzip is not None and accepts_gzip(request.headers):
+            etag, headers, content = asset.gzip
+        cache_control = asset.cache_control if plain else manifest.IMMUTABLE_POLICY
+        if not_modified(request.headers, etag, None):
+            return self.build_not_modified(etag, None, cache_control,
+                                           "Accept-Encoding" if asset.gzip else None)
+        extra = "Cache-Control: {}\r\n{}".format(
+            cache_control, "Accept-Ranges: bytes\r\n" if plain else "").encode("latin-1")
+        return b"".join((status_line(200), date_line(), headers, extra, b"\r\n", content))
 
 
     def build_response_header(self, request):
         """
-        Constructs the HTTP response headers based on the class:`Request <Request>
-        and internal attributes.
+        Constructs the HTTP response headers from the status code,
+        :attr:`headers` and :attr:`cookies` of the response, with the header
+        writer of :mod:`daemon.httpwriter`.
 
         :params request (class:`Request <Request>`): incoming request object.
 
         :rtypes bytes: encoded HTTP response header.
         """
-        reqhdr = request.headers
-        rsphdr = self.headers
-
-        #Build dynamic headers
-        headers = {
-                "Accept": "{}".format(reqhdr.get("Accept", "application/json")),
-                "Accept-Language": "{}".format(reqhdr.get("Accept-Language", "en-US,en;q=0.9")),
-                "Authorization": "{}".format(reqhdr.get("Authorization", "Basic <credentials>")),
-                "Cache-Control": "no-cache",
-                "Content-Type": "{}".format(self.headers.get('Content-Type', 'application/octet-stream')),
-                "Content-Length": "{}".format(len(self._content) if self._content is not False else 0),
-                #                "Cookie": "{}".format(reqhdr.get("Cookie", "sessionid=xyz789")), #dummy cooki
-        #
-        # TODO prepare the request authentication
-        #
-	# self.auth = ...
-                "Date": "{}".format(datetime.datetime.utcnow().strftime("%a, %d %b %Y %H:%M:%S GMT")),
-                "Max-Forward": "10",
-                "Pragma": "no-cache",
-                "Proxy-Authorization": "Basic dXNlcjpwYXNz",
-                "Warning": "199 Miscellaneous warning",
-                "User-Agent": "{}".format(reqhdr.get("User-Agent", "Chrome/123.0.0.0")),
-            }
-            # Header text alignment
-            #
-            #  TODO: implement the header building to create formated
-            #        header from the provied headers
-            #
-        #
-        # TODO prepare the request authentication
-        #
-	# self.auth = ...
+        headers = [(k, v) for k, v in self.headers.items() if k.lower() != 'content-length']
+        if 'Content-Type' not in self.headers:
+            headers.append(('Content-Type', 'application/octet-stream'))
+        cache_control = self.headers.get('Cache-Control')
+        if cache_control is None:
+            cache_control = DEFAULT_CACHE_POLICY
+            headers.append(('Cache-Control', cache_control))
+        # Pragma only matters to HTTP/1.0 caches, which ignore Cache-Control
+        if cache_control == "no-cache":
+            headers.append(('Pragma', 'no-cache'))
 
-        # Allow any additional response headers already present in self.headers
-        for k, v in rsphdr.items():
-            # avoid overwriting the dynamic fields set above except when absent
-            if k not in headers:
-                headers[k] = v
+        # Basic Set-Cookie format; caller can extend (Expires, Secure, SameSite...)
+        for k, v in self.cookies.items():
+            headers.append(('Set-Cookie', "{}={}; Path=/; HttpOnly".format(k, v)))
 
-        # Prepare Set-Cookie headers from self.cookies (dict-like)
-        cookie_lines = []
-        if self.cookies:
-            try:
-                items = self.cookies.items()
-            except Exception:
-                items = []
-            for k, v in items:
-                # Basic Set-Cookie format; caller can extend (Expires, Secure, SameSite...)
-                cookie_lines.append(f"Set-Cookie: {k}={v}; Path=/; HttpOnly")
-
-        # Status line
-        status = self.status_code or 200
-        reason = self.reason or ("OK" if status == 200 else "")
-
-        fmt_header = f"HTTP/1.1 {status} {reason}\r\n"
-        for key, value in headers.items():
-            fmt_header += f"{key}: {value}\r\n"
-        # add cookie headers
-        for line in cookie_lines:
-            fmt_header += line + "\r\n"
-        # end of headers
-        fmt_header += "\r\n"
-#end todo Xuan
-        return fmt_header.encode('utf-8')
+        length = len(self._content) if self._content is not False else None
+        return build_head(self.status_code or 200, headers, length)
 
 
     def build_notfound(self):
@@ -301,16 +486,121 @@ class Response():
         :rtype bytes: Encoded 404 response.
         """
 
-        return (
-                "HTTP/1.1 404 Not Found\r\n"
-                "Accept-Ranges: bytes\r\n"
-                "Content-Type: text/html\r\n"
-                "Content-Length: 13\r\n"
-                "Cache-Control: max-age=86000\r\n"
-                "Connection: close\r\n"
-                "\r\n"
-                "404 Not Found"
-            ).encode('utf-8')
+        return build_message(404, "404 Not Found", TEXT_HTML)
+
+
+    def build_not_modified(self, etag, last_modified, cache_control, vary=None):
+        """
+        Constructs a bodyless ``304 Not Modified`` response for a conditional
+        request whose cached copy is still current.
+
+        :params etag (str): entity tag of the resource.
+        :params last_modified (str): modification date of the resource.
+        :params cache_control (str): ``Cache-Control`` value of the resource.
+        :params vary (str): ``Vary`` value of the resource, if any.
+
+        :rtype bytes: Encoded 304 response.
+        """
+
+        return build_head(304, (("ETag", etag),
+                                ("Last-Modified", last_modified),
+                                ("Cache-Control", cache_control),
+                                ("Vary", vary)))
+
+
+    def build_range_not_satisfiable(self, size):
+        """
+        Constructs a ``416 Range Not Satisfiable`` response for a ``Range``
+        header none of whose ranges lies within the resource.
+
+        :params size (int): resource length.
+
+        :rtype bytes: Encoded 416 response.
+        """
+
+        return build_head(416, (("Content-Range", "bytes */{}".format(size)),
+                                ("Accept-Ranges", "bytes")), 0)
+
+
+    def build_partial(self, request, fh, ranges, size):
+        """
+        Constructs a ``206 Partial Content`` response sending the requested
+        ranges of a file with sendfile: one range as the body, several as a
+        ``multipart/byteranges`` body.
+
+        :params request (class:`Request <Request>`): incoming request object.
+        :params fh (file): the file, opened in binary mode.
+        :params ranges (list): ``(start, end)`` inclusive byte positions.
+        :params size (int): file length.
+
+        :rtype FileResponse: the response.
+        """
+
+        self.status_code = 206
+        self.reason = "Partial Content"
+        self._content = False
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            self.headers['Content-Range'] = "bytes {}-{}/{}".format(start, end, size)
+            return FileResponse(fh, self.build_response_header(request),
+                                [(start, end - start + 1)])
+
+        boundary = os.urandom(12).hex()
+        part_type = self.headers['Content-Type']
+        self.headers['Content-Type'] = "multipart/byteranges; boundary={}".format(boundary)
+        parts = []
+        for start, end in ranges:
+            parts.append(("--{}\r\nContent-Type: {}\r\nContent-Range: bytes {}-{}/{}\r\n\r\n".format(
+                boundary, part_type, start, end, size)).encode('latin-1'))
+            parts.append((start, end - start + 1))
+            parts.append(b"\r\n")
+        parts.append("--{}--\r\n".format(boundary).encode('latin-1'))
+        return FileResponse(fh, self.build_response_header(request), parts)
+
+
+    def build_bad_request(self):
+        """
+        Constructs a standard 400 Bad Request HTTP response.
+
+        :rtype bytes: Encoded 400 response.
+        """
+
+        return build_message(400, "400 Bad Request", TEXT_PLAIN, (("Connection", "close"),))
+
+
+    def build_payload_too_large(self):
+        """
+        Constructs a ``413 Payload Too Large`` HTTP response for a request
+        body above the configured maximum size.
+
+        :rtype bytes: Encoded 413 response.
+        """
+
+        return build_message(413, "413 Payload Too Large", TEXT_PLAIN, (("Connection", "close"),))
+
+
+    def build_internal_error(self):
+        """
+        Constructs a ``500 Internal Server Error`` HTTP response for a request
+        whose handling failed.
+
+        :rtype bytes: Encoded 500 response.
+        """
+
+        return build_message(500, "500 Internal Server Error", TEXT_PLAIN, (("Connection", "close"),))
+
+
+    def build_unavailable(self, retry_after=1):
+        """
+        Constructs a ``503 Service Unavailable`` HTTP response used to shed load.
+
+        :params retry_after (int): seconds the client should wait before retrying.
+
+        :rtype bytes: Encoded 503 response.
+        """
+
+        return build_message(503, "503 Service Unavailable", TEXT_PLAIN,
+                             (("Retry-After", retry_after), ("Connection", "close")))
 
 
     def build_response(self, request):
@@ -324,6 +614,14 @@ class Response():
 
         path = request.path
 
+        asset = manifest.asset_manifest.lookup(path)
+        if asset is not None:
+            return self.build_asset(request, asset)
+        asset = manifest.asset_manifest.get(path)
+        if asset is not None and 'range' not in request.headers:
+            # Byte ranges are sent from the file.
+            return self.build_asset(request, asset, plain=True)
+
         mime_type = self.get_mime_type(path)
         print("[Response] {} path {} mime_type {}".format(request.method, request.path, mime_type))
 
@@ -334,6 +632,8 @@ class Response():
             base_dir = self.prepare_content_type(mime_type = 'text/html')
         elif mime_type == 'text/css':
             base_dir = self.prepare_content_type(mime_type = 'text/css')
+        elif mime_type.startswith(('image/', 'video/')):
+            base_dir = self.prepare_content_type(mime_type = mime_type)
         #
         # TODO: add support objects
         #
@@ -346,9 +646,333 @@ class Response():
             self.cookies["sessionid"] = "abc123"
             print("[Response] Set-Cookie: session_id=abc123")
 
-        c_len, self._content = self.build_content(path, base_dir)
-        self._header = self.build_response_header(request)
+        filepath = os.path.join(base_dir, path.lstrip('/'))
+        # Byte ranges always refer to the identity content.
+        accept_gzip = 'range' not in request.headers and accepts_gzip(request.headers)
+        try:
+            large = self.open_large_file(path, base_dir, accept_gzip)
+            if large is None:
+                c_len, self._content = self.build_content(path, base_dir, accept_gzip)
+            else:
+                c_len = os.fstat(large.fileno()).st_size
+        except FileNotFoundError:
+            return self.build_notfound()
+        except OSError as e:
+            print("[Response] error reading file:", e)
+            return self.build_notfound()
+
+        etag, last_modified = self.headers['ETag'], self.headers['Last-Modified']
+        self.headers['Cache-Control'] = cache_policy(filepath)
+        self.headers.setdefault('Accept-Ranges', 'bytes')
+        if not_modified(request.headers, etag, last_modified):
+            if large is not None:
+                large.close()
+            return self.build_not_modified(etag, last_modified, self.headers['Cache-Control'],
+                                           self.headers.get('Vary'))
+
+        # Byte ranges are sent from the file, even for cached files.
+        range_header = request.headers.get('range')
+        if self.headers['Accept-Ranges'] != 'bytes':
+            range_header = None
+        if range_header and request.headers.get('if-range') is not None:
+            if not if_range_matches(request.headers['if-range'], etag, last_modified):
+                range_header = None
+        ranges = parse_range(range_header, c_len) if range_header else None
+        if ranges is not None:
+            if not ranges:
+                if large is not None:
+                    large.close()
+                return self.build_range_not_satisfiable(c_len)
+            try:
+                fh = large if large is not None else open(filepath, 'rb')
+            except OSError as e:
+                print("[Response] error reading file:", e)
+                return self.build_notfound()
+            return self.build_partial(request, fh, ranges, c_len)
 
+        self._header = self.build_response_header(request)
+        if large is not None:
+            return FileResponse(large, self._header)
         return self._header + self._content
     
-    
\ No newline at end of file
+    
+
+class StreamingResponse():
+    """A response whose body is produced piece by piece by an iterable, so it
+    can start flowing before the whole body exists. The body is sent with
+    ``Transfer-Encoding: chunked``; the connection headers are set by
+    :func:`finalize_response <daemon.httpadapter.finalize_response>`.
+
+    Usage::
+
+      >>> def rows():
+      ...     yield "<ul>"
+      ...     for i in range(3):
+      ...         yield "<li>{}</li>".format(i)
+      ...     yield "</ul>"
+      >>> for piece in StreamingResponse(rows()):
+      ...     conn.sendall(piece)
+
+    :param body (iterable): ``str`` (utf-8 encoded) or ``bytes`` pieces of the body.
+    :param status (str): status code and reason phrase.
+    :param content_type (str): value of the ``Content-Type`` header.
+    :param headers (dict): additional response headers.
+    """
+
+    def __init__(self, body, status="200 OK", content_type="text/html; charset=utf-8", headers=None):
+        self.body = body
+        self.status = status
+        self.content_type = content_type
+        #: Header block, status line included, ending with CRLF CRLF.
+        self.head = self.build_head(content_type, headers or {})
+        #: True when the body iterable raised; the response is then truncated.
+        self.failed = False
+        #: Compressor of a gzip body, see :meth:`compress`.
+        self.encoder = None
+
+    def compress(self, level=None):
+        """
+        Sends the body gzip-compressed. Every piece is flushed as it is
+        produced, so streaming is preserved. A response whose headers already
+        set a ``Content-Encoding`` is left alone.
+
+        :param level (int): compression level, the configured one by default.
+
+        :rtype bool: True when the body is compressed.
+        """
+        if b"\r\ncontent-encoding:" in self.head.lower():
+            return False
+        self.encoder = gzip_encoder(level)
+        self.add_header("Content-Encoding", "gzip")
+        self.add_header("Vary", "Accept-Encoding")
+        return True
+
+    def add_header(self, name, value):
+        """
+        Appends a header to the header block.
+
+        :param name (str): header name.
+        :param value (str): header value.
+        """
+        self.head = self.head[:-2] + "{}: {}\r\n\r\n".format(name, value).encode('utf-8')
+
+    def build_head(self, content_type, headers):
+        """
+        Builds the header block of the response.
+
+        :param content_type (str): value of the ``Content-Type`` header.
+        :param headers (dict): additional response headers.
+
+        :rtype bytes: encoded header block.
+        """
+        return build_head(self.status, [("Content-Type", content_type)] + list(headers.items()) +
+                          [("Transfer-Encoding", "chunked")])
+
+    def iter_body(self):
+        """
+        Yields the non-empty body pieces as bytes. An error raised by the body
+        iterable is logged and ends the body early with :attr:`failed` set.
+        """
+        encoder = self.encoder
+        try:
+            for piece in self.body:
+                if isinstance(piece, str):
+                    piece = piece.encode('utf-8')
+                if piece and encoder is not None:
+                    piece = encoder.compress(piece) + encoder.flush(zlib.Z_SYNC_FLUSH)
+                if piece:
+                    yield piece
+        except Exception as e:
+            print("[Response] Error while streaming response body: {}".format(e))
+            self.failed = True
+            return
+        if encoder is not None:
+            yield encoder.flush()
+
+    def __iter__(self):
+        """
+        Yields the header block, then every body piece as one chunk and the
+        last chunk. No last chunk is sent when the body failed, so the client
+        sees a truncated response rather than a complete one.
+        """
+        yield self.head
+        for piece in self.iter_body():
+            yield b"%x\r\n" % len(piece) + piece + b"\r\n"
+        if not self.failed:
+            yield b"0\r\n\r\n"
+
+    def collect(self):
+        """
+        Buffers the whole body, for clients that do not understand chunked
+        responses (HTTP/1.0).
+
+        :rtype bytes: the complete response with a ``Content-Length`` body.
+        """
+        lines = self.head[:-4].split(b"\r\n")
+        body = b"".join(self.iter_body())
+        lines = [line for line in lines if not line.lower().startswith(b"transfer-encoding:")]
+        lines.append(b"Content-Length: %d" % len(body))
+        return b"\r\n".join(lines) + b"\r\n\r\n" + body
+
+
+class FileResponse():
+    """A response whose body is taken from a file, sent from the file
+    descriptor to the socket with ``sendfile`` so the content is not copied
+    through Python. When the socket or the file does not support sendfile,
+    the body is read and sent in chunks instead. The connection headers are
+    set by :func:`finalize_response <daemon.httpadapter.finalize_response>`.
+
+    The body is a list of parts: ``(offset, count)`` file segments and
+    ``bytes`` written in between, such as the boundaries of a
+    ``multipart/byteranges`` body. By default it is the whole file.
+
+    Usage::
+
+      >>> response = FileResponse(open("static/images/welcome.png", "rb"), head)
+      >>> response.send(conn)
+
+    :param file (file): regular file opened in binary mode; the response closes it.
+    :param head (bytes): header block, status line included, ending with CRLF CRLF.
+    :param parts (list): body parts, ``(offset, count)`` tuples and ``bytes``.
+    """
+
+    def __init__(self, file, head, parts=None):
+        self.file = file
+        if parts is None:
+            parts = [(0, os.fstat(file.fileno()).st_size)]
+        #: Body parts left to send; file segments are ``[offset, count]`` lists.
+        self.parts = collections.deque(
+            part if isinstance(part, bytes) else list(part) for part in parts if part)
+        #: Body length.
+        self.length = sum(len(part) if isinstance(part, bytes) else part[1] for part in self.parts)
+        lines = [line for line in head[:-4].split(b"\r\n")
+                 if not line.lower().startswith(b"content-length:")]
+        lines.append(b"Content-Length: %d" % self.length)
+        #: Header block, status line included, ending with CRLF CRLF.
+        self.head = b"\r\n".join(lines) + b"\r\n\r\n"
+        #: True when the file ended before the announced length was sent.
+        self.failed = False
+
+    @property
+    def done(self):
+        """True once every part was sent."""
+        return not self.parts
+
+    def take_bytes(self):
+        """
+        Removes the ``bytes`` parts due before the next file segment.
+
+        :rtype bytes: their concatenation, possibly empty.
+        """
+        pieces = []
+        while self.parts and isinstance(self.parts[0], bytes):
+            pieces.append(self.parts.popleft())
+        return b"".join(pieces)
+
+    def segment(self):
+        """
+        Returns the file segment to send next; call :meth:`take_bytes` first.
+
+        :rtype tuple: (offset, count), or None when the body is complete.
+        """
+        if not self.parts:
+            return None
+        offset, count = self.parts[0]
+        return offset, count
+
+    def advance(self, sent):
+        """
+        Records ``sent`` bytes of the current file segment as sent.
+
+        :param sent (int): bytes sent, more than 0.
+        """
+        part = self.parts[0]
+        part[0] += sent
+        part[1] -= sent
+        if part[1] <= 0:
+            self.parts.popleft()
+
+    def mark_truncated(self):
+        """
+        Records that the file ended before the announced length was sent,
+        because it shrank since it was opened. :attr:`failed` is set and the
+        remaining parts are dropped: the connection must be closed after the
+        partial body.
+        """
+        self.failed = True
+        self.parts.clear()
+
+    def read_chunk(self):
+        """
+        Reads the next piece of the current file segment, when the body is
+        sent without sendfile.
+
+        :rtype bytes: at most :data:`FILE_CHUNK_SIZE` bytes, empty when the
+            file was truncated, see :meth:`mark_truncated`.
+        """
+        offset, count = self.parts[0]
+        self.file.seek(offset)
+        piece = self.file.read(min(FILE_CHUNK_SIZE, count))
+        if piece:
+            self.advance(len(piece))
+        else:
+            self.mark_truncated()
+        return piece
+
+    def send(self, sock):
+        """
+        Sends the header block and the body on a blocking socket, then closes
+        the file. :meth:`socket.socket.sendfile` falls back to ``send`` itself
+        when sendfile cannot be used.
+
+        :param sock (socket.socket): client socket.
+        """
+        try:
+            sock.sendall(self.head)
+            while True:
+                piece = self.take_bytes()
+                if piece:
+                    sock.sendall(piece)
+                segment = self.segment()
+                if segment is None:
+                    break
+                offset, count = segment
+                sent = sock.sendfile(self.file, offset, count) or 0
+                if sent < count:
+                    # A blocking sendfile only stops early at the end of the file.
+                    print("[Response] {} ended before its announced length".format(self.file.name))
+                    self.mark_truncated()
+                    break
+                self.advance(sent)
+        finally:
+            self.close()
+
+    def __iter__(self):
+        """Yields the header block, then the body read in chunks."""
+        try:
+            yield self.head
+            while True:
+                piece = self.take_bytes()
+                if piece:
+                    yield piece
+                if self.done:
+                    break
+                piece = self.read_chunk()
+                if self.failed:
+                    print("[Response] {} ended before its announced length".format(self.file.name))
+                    break
+                yield piece
+        finally:
+            self.close()
+
+    def collect(self):
+        """
+        Reads the whole body into memory.
+
+        :rtype bytes: the complete response.
+        """
+        return b"".join(self)
+
+    def close(self):
+        """Closes the file."""
+        self.file.close()
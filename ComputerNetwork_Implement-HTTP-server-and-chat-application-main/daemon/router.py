@@ -0,0 +1,88 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.router
+~~~~~~~~~~~~~~~~~
+
+This module provides the :class:`Router <Router>`, the compiled route table
+used by :class:`HttpAdapter <daemon.httpadapter.HttpAdapter>`. WeApRous
+handlers and the built-in endpoints are merged into one dictionary keyed by
+``(method, path)``, so finding the handler of a request is one hash lookup.
+
+Usage::
+
+  >>> router = Router()
+  >>> router.add("GET", "/get-list", get_list, builtin=True)
+  >>> router.match("GET", "/get-list")
+  (<function get_list>, True)
+"""
+
+#: Result of :meth:`Router.match` when no route matches.
+NO_ROUTE = (None, False)
+
+
+class Router:
+    """
+    A compiled ``(method, path)`` route table.
+
+    Every entry is a ``(handler, builtin)`` pair: ``builtin`` is False for a
+    WeApRous handler, called with the request body, and True for a built-in
+    endpoint, called with the :class:`HttpAdapter` serving the request.
+    A few built-in pages also answer every path below a prefix; they are only
+    tried when the exact lookup misses.
+    """
+
+    __slots__ = ("routes", "prefixes")
+
+    def __init__(self):
+        self.routes = {}
+        self.prefixes = []
+
+    def add(self, method, path, handler, builtin=False):
+        """
+        Registers ``handler`` for one method and path, replacing any previous one.
+
+        :param method (str): HTTP verb.
+        :param path (str): exact request path.
+        :param handler (function): route handler.
+        :param builtin (bool): whether handler is a built-in endpoint.
+        """
+        self.routes[(method.upper(), path)] = (handler, builtin)
+
+    def add_prefix(self, method, prefix, handler, builtin=False):
+        """
+        Registers ``handler`` for every path starting with ``prefix``.
+
+        :param method (str): HTTP verb.
+        :param prefix (str): request path prefix.
+        :param handler (function): route handler.
+        :param builtin (bool): whether handler is a built-in endpoint.
+        """
+        self.prefixes.append((method.upper(), prefix, (handler, builtin)))
+
+    def match(self, method, path):
+        """
+        Finds the handler of a request.
+
+        :param method (str): HTTP verb.
+        :param path (str): request path.
+
+        :rtype tuple: ``(handler, builtin)``, or :data:`NO_ROUTE`.
+        """
+        entry = self.routes.get((method, path))
+        if entry is not None:
+            return entry
+        for prefix_method, prefix, entry in self.prefixes:
+            if prefix_method == method and path.startswith(prefix):
+                return entry
+        return NO_ROUTE
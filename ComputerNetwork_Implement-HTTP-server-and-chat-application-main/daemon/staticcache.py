@@ -0,0 +1,314 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.staticcache
+~~~~~~~~~~~~~~~~~
+
+This module provides the in-memory cache of static files shared by every
+static-serving path: :meth:`Response.build_content
+<daemon.response.Response.build_content>` and the pages served by the built-in
+endpoints of :class:`HttpAdapter <daemon.httpadapter.HttpAdapter>`.
+
+Entries hold the file bytes, the MIME type, the validators (a strong ``ETag``
+hashed from the content and ``Last-Modified``) and their precomputed header
+lines. Compressible files also get a gzip variant, computed on first use and
+kept with the entry, see :mod:`daemon.compression`. Entries are evicted in
+least recently used order once the cached bytes exceed the cache size, and
+are revalidated on every lookup with one ``os.stat`` comparing the
+modification time and size, so edited files are picked up without a restart.
+The :attr:`rewrite <StaticCache.rewrite>` hook may transform a file as it is
+loaded, see :mod:`daemon.manifest`.
+
+Usage::
+
+  >>> entry = static_cache.get("www/login.html")
+  >>> b"HTTP/1.1 200 OK\\r\\n" + entry.headers + b"\\r\\n" + entry.content
+"""
+
+import collections
+import email.utils
+import hashlib
+import mimetypes
+import os
+import threading
+
+from .compression import is_compressible, gzip_compress
+
+#: Total bytes of file content kept by the shared cache.
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+#: Files larger than this are read from disk on every request.
+CACHE_MAX_FILE_SIZE = 2 * 1024 * 1024
+
+
+def http_date(timestamp):
+    """
+    Formats a timestamp as an HTTP date, e.g. ``Tue, 15 Nov 1994 08:12:31 GMT``.
+
+    :param timestamp (float): seconds since the epoch.
+
+    :rtype str: the date.
+    """
+    return email.utils.formatdate(timestamp, usegmt=True)
+
+
+def content_etag(digest):
+    """
+    Builds a strong entity tag from a content hash.
+
+    :param digest (hashlib hash): hash of the whole content.
+
+    :rtype str: quoted entity tag.
+    """
+    return '"{}"'.format(digest.hexdigest()[:32])
+
+
+def guess_content_type(path):
+    """
+    Returns the ``Content-Type`` value of a file, with a utf-8 charset for text.
+
+    :param path (str): file path.
+
+    :rtype tuple: (mime type, content type).
+    """
+    mime_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if mime_type.startswith("text/"):
+        return mime_type, "{}; charset=utf-8".format(mime_type)
+    return mime_type, mime_type
+
+
+class GzipVariant:
+    """
+    The gzip-compressed version of a :class:`CachedFile <CachedFile>`.
+
+    :attrs content (bytes): compressed content.
+    :attrs etag (str): strong entity tag, distinct from the identity one.
+    :attrs headers (bytes): header lines of the variant, as in ``CachedFile.headers``.
+    """
+
+    __slots__ = ("content", "etag", "headers")
+
+    def __init__(self, entry, content):
+        self.content = content
+        self.etag = entry.etag[:-1] + '-gz"'
+        self.headers = ("Content-Type: {}\r\nContent-Length: {}\r\nContent-Encoding: gzip\r\n"
+                        "ETag: {}\r\nLast-Modified: {}\r\nVary: Accept-Encoding\r\n").format(
+            entry.content_type, len(content), self.etag, entry.last_modified).encode("latin-1")
+
+
+class CachedFile:
+    """
+    One file as kept by :class:`StaticCache <StaticCache>`.
+
+    :attrs path (str): file path.
+    :attrs content (bytes): file content.
+    :attrs mime_type (str): MIME type, e.g. ``text/css``.
+    :attrs content_type (str): ``Content-Type`` value.
+    :attrs etag (str): strong entity tag hashed from the content.
+    :attrs last_modified (str): modification time as an HTTP date.
+    :attrs headers (bytes): ``Content-Type``, ``Content-Length``, ``ETag`` and
+        ``Last-Modified`` header lines, plus ``Vary`` when compressible.
+    :attrs compressible (bool): whether a gzip variant may be served.
+    :attrs gzip (GzipVariant): the gzip variant; None until computed, False
+        when compressing does not pay off.
+    :attrs mtime (int): modification time in nanoseconds.
+    :attrs size (int): content length.
+    :attrs source_size (int): file size on disk, differing from ``size`` when
+        the content was rewritten.
+    """
+
+    __slots__ = ("path", "content", "mime_type", "content_type", "etag", "last_modified",
+                 "headers", "compressible", "gzip", "mtime", "size", "source_size")
+
+    def __init__(self, path, content, mtime, source_size=None):
+        self.path = path
+        self.content = content
+        self.mime_type, self.content_type = guess_content_type(path)
+        self.etag = content_etag(hashlib.sha1(content))
+        self.last_modified = http_date(mtime / 1e9)
+        self.compressible = is_compressible(self.mime_type, len(content))
+        self.headers = ("Content-Type: {}\r\nContent-Length: {}\r\n"
+                        "ETag: {}\r\nLast-Modified: {}\r\n{}").format(
+            self.content_type, len(content), self.etag, self.last_modified,
+            "Vary: Accept-Encoding\r\n" if self.compressible else "").encode("latin-1")
+        self.gzip = None
+        self.mtime = mtime
+        self.size = len(content)
+        self.source_size = self.size if source_size is None else source_size
+
+    @property
+    def rewritten(self):
+        """True when the content differs from the file on disk."""
+        return self.source_size != self.size
+
+    @property
+    def footprint(self):
+        """Bytes of content kept for the file, gzip variant included."""
+        return self.size + (len(self.gzip.content) if self.gzip else 0)
+
+
+class StaticCache:
+    """
+    A thread-safe, size-bounded LRU cache of static files.
+
+    :param max_bytes (int): total bytes of file content kept.
+    :param max_file_size (int): largest file kept; larger ones are always read.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, max_file_size=CACHE_MAX_FILE_SIZE):
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self._entries = collections.OrderedDict()
+        #: path -> (mtime, size, etag) of files too large to be cached.
+        self._etags = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        #: Callable ``(path, content) -> content`` applied to every file read,
+        #: or None.
+        self.rewrite = None
+
+    def get(self, path):
+        """
+        Returns the current content of a file, from memory when unchanged.
+
+        :param path (str): file path.
+
+        :rtype CachedFile: the file.
+        :raises FileNotFoundError: if the file does not exist.
+        :raises OSError: if the file cannot be read.
+        """
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.discard(path)
+            raise
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                if entry.mtime == st.st_mtime_ns and entry.source_size == st.st_size:
+                    self._entries.move_to_end(path)
+                    self.hits += 1
+                    return entry
+                self._remove(path)
+                self.invalidations += 1
+            self.misses += 1
+
+        with open(path, "rb") as fh:
+            content = fh.read()
+        if self.rewrite is not None:
+            content = self.rewrite(path, content)
+        entry = CachedFile(path, content, st.st_mtime_ns, st.st_size)
+        if entry.size <= self.max_file_size:
+            with self._lock:
+                self._remove(path)
+                self._entries[path] = entry
+                self.bytes += entry.size
+                self._evict()
+        return entry
+
+    def gzip_variant(self, entry):
+        """
+        Returns the gzip variant of a compressible file, compressing it on
+        first use.
+
+        :param entry (CachedFile): file returned by :meth:`get`.
+
+        :rtype GzipVariant: the variant, or None when it would not be smaller.
+        """
+        if entry.gzip is None:
+            content = gzip_compress(entry.content)
+            variant = GzipVariant(entry, content) if len(content) < entry.size else False
+            with self._lock:
+                if entry.gzip is None:
+                    entry.gzip = variant
+                    if variant and self._entries.get(entry.path) is entry:
+                        self.bytes += len(content)
+                        self._evict()
+        return entry.gzip or None
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.footprint
+            self.evictions += 1
+
+    def validators(self, path, st):
+        """
+        Returns the validators of a file too large to be cached. Its content
+        hash is computed once per file version.
+
+        :param path (str): file path.
+        :param st (os.stat_result): current status of the file.
+
+        :rtype tuple: (etag, last_modified).
+        """
+        version = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            known = self._etags.get(path)
+        if known is not None and known[:2] == version:
+            etag = known[2]
+        else:
+            digest = hashlib.sha1()
+            with open(path, "rb") as fh:
+                for block in iter(lambda: fh.read(1024 * 1024), b""):
+                    digest.update(block)
+            etag = content_etag(digest)
+            with self._lock:
+                self._etags[path] = version + (etag,)
+        return etag, http_date(st.st_mtime_ns / 1e9)
+
+    def discard(self, path):
+        """
+        Drops a file from the cache.
+
+        :param path (str): file path.
+        """
+        with self._lock:
+            self._remove(path)
+
+    def clear(self):
+        """Drops every cached file."""
+        with self._lock:
+            self._entries.clear()
+            self._etags.clear()
+            self.bytes = 0
+
+    def _remove(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self.bytes -= entry.footprint
+
+    def stats(self):
+        """
+        Returns a snapshot of the cache counters.
+
+        :rtype dict: entry count, cached bytes, hits, misses, invalidations and evictions.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+
+#: Cache shared by every static-serving path of the process.
+static_cache = StaticCache()
@@ -0,0 +1,519 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.upstream
+~~~~~~~~~~~~~~~~~
+
+This module provides the keep-alive connections of the proxy to its
+upstream backends. Each backend address has an :class:`UpstreamPool
+<UpstreamPool>` of idle connections: a request takes one, and gives it back
+once the response was read completely, so consecutive requests reuse the
+same TCP connection instead of paying a handshake each.
+
+Responses are framed from their headers by :mod:`daemon.relay`, by
+``Content-Length`` or by the chunks of ``Transfer-Encoding: chunked``, so
+the end of a response is known without the backend closing the connection.
+A response read until EOF, or carrying ``Connection: close``, ends the
+connection.
+
+Idle connections are evicted after :data:`UPSTREAM_IDLE_TIMEOUT`, shorter
+than the keep-alive timeout of the backend, and a connection the backend
+closed meanwhile is detected with a non-blocking peek before it is reused.
+
+Each pool also tracks the health of its upstream. Passively, an upstream
+failing :data:`MAX_FAILS` requests in a row is ejected for a backoff that
+doubles with every ejection, from :data:`EJECT_BASE` up to
+:data:`EJECT_MAX`; once readmitted, one more failure ejects it again and a
+success clears the backoff. Actively, the :class:`HealthChecker
+<HealthChecker>` thread probes every upstream with a TCP connect each
+:data:`HEALTH_CHECK_INTERVAL` and marks it down after :data:`HEALTH_FALL`
+failed probes, up again after one successful probe.
+
+Usage::
+
+  >>> conn, reused = upstream_pools.get("127.0.0.1", 9000).acquire()
+  >>> conn.sock.sendall(request)
+  >>> status, head, headers = conn.read_head()
+  >>> body = b"".join(conn.iter_body("GET", status, headers))
+  >>> conn.pool.release(conn)
+"""
+
+import collections
+import socket
+import threading
+import time
+
+from .relay import BodyFramer, FramedStream, RelayError
+
+#: Idle connections kept per upstream; more are closed when released.
+UPSTREAM_POOL_SIZE = 8
+#: Seconds an idle connection is kept, below the backend ``KEEPALIVE_TIMEOUT``.
+UPSTREAM_IDLE_TIMEOUT = 4.0
+#: Seconds allowed to connect to an upstream.
+UPSTREAM_CONNECT_TIMEOUT = 3.0
+#: Seconds allowed between two reads of an upstream response.
+UPSTREAM_READ_TIMEOUT = 30.0
+#: Consecutive failed requests after which an upstream is ejected.
+MAX_FAILS = 3
+#: Seconds of the first ejection of an upstream; each next one doubles it.
+EJECT_BASE = 2.0
+#: Longest ejection, in seconds.
+EJECT_MAX = 60.0
+#: Seconds between two active health probes of an upstream.
+HEALTH_CHECK_INTERVAL = 2.0
+#: Seconds allowed to a health probe to connect.
+HEALTH_CHECK_TIMEOUT = 1.0
+#: Consecutive failed probes after which an upstream is marked down.
+HEALTH_FALL = 2
+
+
+class UpstreamError(RelayError):
+    """Raised when an upstream response is malformed or cut short."""
+
+
+def parse_response_head(head):
+    """
+    Parses a response header block, status line included, without its
+    final CRLF CRLF.
+
+    :param head (bytes): raw header block.
+
+    :rtype tuple: (version, status, headers) with lower-case header names.
+    :raises UpstreamError: on a malformed status line.
+    """
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split(None, 2)
+    if len(parts) < 2 or not parts[1].isdigit():
+        raise UpstreamError("Invalid status line: {!r}".format(lines[0]))
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return parts[0], int(parts[1]), headers
+
+
+class UpstreamConnection(FramedStream):
+    """
+    One connection to an upstream, with the bytes received past the
+    current response.
+
+    :attrs pool (UpstreamPool): pool the connection belongs to.
+    :attrs sock (socket.socket): connected socket.
+    :attrs buffer (bytearray): received bytes not consumed yet.
+    :attrs reusable (bool): whether the connection may serve another request
+        once the current response is read.
+    :attrs requests (int): requests sent on the connection.
+    :attrs idle_since (float): ``time.monotonic()`` of the last release.
+    """
+
+    __slots__ = ("pool", "reusable", "requests", "idle_since")
+
+    peer = "Upstream"
+    error = UpstreamError
+
+    def __init__(self, pool, sock):
+        super().__init__(sock)
+        self.pool = pool
+        self.reusable = True
+        self.requests = 0
+        self.idle_since = time.monotonic()
+
+    def is_stale(self):
+        """
+        Tells whether the backend closed the idle connection, or sent bytes
+        nobody asked for, without blocking.
+
+        :rtype bool: True when the connection must not be reused.
+        """
+        if self.buffer:
+            return True
+        try:
+            self.sock.setblocking(False)
+            try:
+                # Either EOF or unsolicited bytes: both end the connection.
+                self.sock.recv(1, socket.MSG_PEEK)
+                return True
+            finally:
+                self.sock.settimeout(UPSTREAM_READ_TIMEOUT)
+        except BlockingIOError:
+            return False
+        except OSError:
+            return True
+
+    def read_head(self):
+        """
+        Reads the header block of the next response. Interim ``1xx``
+        responses other than ``101`` are skipped.
+
+        :rtype tuple: (status, head, headers), head being the raw header
+            block ending with CRLF CRLF.
+        :raises UpstreamError: when the upstream closes first or sends a
+            malformed response.
+        """
+        while True:
+            head = super().read_head()
+            if not head:
+                raise UpstreamError("Upstream closed the connection before responding")
+            parsed = self.parse_head(head)
+            if parsed is not None:
+                status, headers = parsed
+                return status, head, headers
+
+    def parse_head(self, head):
+        """
+        Parses a response header block and notes whether the connection
+        outlives the response.
+
+        :param head (bytes): raw header block ending with CRLF CRLF.
+
+        :rtype tuple: (status, headers), None for an interim ``1xx`` response
+            other than ``101``, to be skipped.
+        :raises UpstreamError: on a malformed status line.
+        """
+        version, status, headers = parse_response_head(head[:-4])
+        if 100 <= status < 200 and status != 101:
+            return None
+        connection = headers.get("connection", "").lower()
+        if "close" in connection or (version == "HTTP/1.0" and "keep-alive" not in connection):
+            self.reusable = False
+        return status, headers
+
+    def body_framer(self, method, status, headers):
+        """
+        Returns the framing of the body of a response.
+
+        :param method (str): method of the request.
+        :param status (int): response status code.
+        :param headers (dict): response headers, lower-case names.
+
+        :rtype BodyFramer: the framing.
+        :raises UpstreamError: on an invalid ``Content-Length``.
+        """
+        if method == "HEAD" or status in (204, 304) or status < 200:
+            return BodyFramer()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            return BodyFramer(chunked=True)
+        length = headers.get("content-length")
+        if length is None:
+            # Delimited by the end of the connection.
+            self.reusable = False
+            return BodyFramer(until_eof=True)
+        try:
+            return BodyFramer(int(length))
+        except ValueError:
+            raise UpstreamError("Invalid Content-Length: {!r}".format(length))
+
+    def iter_body(self, method, status, headers):
+        """
+        Yields the body of the response whose head :meth:`read_head`
+        returned, as received: chunked bodies keep their chunk framing.
+
+        :param method (str): method of the request.
+        :param status (int): response status code.
+        :param headers (dict): response headers, lower-case names.
+
+        :rtype generator: body pieces.
+        :raises UpstreamError: when the upstream closes within the body.
+        """
+        yield from self.iter_framed(self.body_framer(method, status, headers))
+
+    def close(self):
+        """Closes the socket."""
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class UpstreamPool:
+    """
+    The idle keep-alive connections to one upstream, the number of requests
+    in flight to it and its health.
+
+    :param address (tuple): (host, port) of the upstream.
+    :param max_size (int): idle connections kept.
+    :param idle_timeout (float): seconds an idle connection is kept.
+    """
+
+    def __init__(self, address, max_size=UPSTREAM_POOL_SIZE, idle_timeout=UPSTREAM_IDLE_TIMEOUT):
+        self.address = address
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._idle = collections.deque()
+        self._lock = threading.Lock()
+        #: Requests forwarded and not answered yet.
+        self.in_flight = 0
+        self.connects = 0
+        self.reuses = 0
+        self.stale = 0
+        self.evictions = 0
+        #: False once active health probes failed :data:`HEALTH_FALL` times in a row.
+        self.healthy = True
+        self._probe_failures = 0
+        #: Consecutive failed requests.
+        self.failures = 0
+        #: ``time.monotonic()`` until which the upstream is ejected.
+        self.ejected_until = 0.0
+        #: Ejections since the last successful request, setting the backoff.
+        self.ejections = 0
+
+    def available(self, now=None):
+        """
+        Tells whether requests may be routed to the upstream.
+
+        :param now (float): ``time.monotonic()``, read when omitted.
+
+        :rtype bool: True when healthy and not ejected.
+        """
+        if not self.healthy:
+            return False
+        return self.ejected_until <= (time.monotonic() if now is None else now)
+
+    def record_success(self):
+        """Records a request answered by the upstream, ending any backoff."""
+        if self.failures or self.ejections:
+            with self._lock:
+                self.failures = 0
+                self.ejections = 0
+
+    def record_failure(self):
+        """
+        Records a request the upstream failed to answer: refused or timed out
+        connection, or response cut short. Ejects the upstream after
+        :data:`MAX_FAILS` consecutive failures.
+        """
+        with self._lock:
+            self.failures += 1
+            if self.failures < MAX_FAILS:
+                return
+            backoff = min(EJECT_BASE * 2 ** self.ejections, EJECT_MAX)
+            self.ejected_until = time.monotonic() + backoff
+            self.ejections += 1
+            # Readmitted on probation: the next failure ejects it again.
+            self.failures = MAX_FAILS - 1
+            while self._idle:
+                self._idle.pop().close()
+        print("[Proxy] Upstream {}:{} ejected for {:.0f}s".format(self.address[0], self.address[1], backoff))
+
+    def probe(self):
+        """
+        Runs one active health check: a TCP connect to the upstream.
+
+        :rtype bool: whether the upstream accepted the connection.
+        """
+        try:
+            socket.create_connection(self.address, timeout=HEALTH_CHECK_TIMEOUT).close()
+            ok = True
+        except OSError:
+            ok = False
+        with self._lock:
+            was_healthy = self.healthy
+            if ok:
+                self._probe_failures = 0
+                self.healthy = True
+            else:
+                self._probe_failures += 1
+                if self._probe_failures >= HEALTH_FALL:
+                    self.healthy = False
+                    while self._idle:
+                        self._idle.pop().close()
+        if was_healthy != self.healthy:
+            print("[Proxy] Upstream {}:{} is {}".format(
+                self.address[0], self.address[1], "up" if self.healthy else "down"))
+        return ok
+
+    def acquire(self):
+        """
+        Returns an idle connection, or a new one when none is left.
+
+        :rtype tuple: (UpstreamConnection, reused).
+        :raises OSError: when connecting fails.
+        """
+        conn = self.take_idle()
+        if conn is not None:
+            return conn, True
+        sock = socket.create_connection(self.address, timeout=UPSTREAM_CONNECT_TIMEOUT)
+        sock.settimeout(UPSTREAM_READ_TIMEOUT)
+        return self.adopt(sock), False
+
+    def take_idle(self):
+        """
+        Returns an idle connection the upstream did not close meanwhile,
+        without blocking.
+
+        :rtype UpstreamConnection: the connection, or None when none is left.
+        """
+        while True:
+            with self._lock:
+                self._evict_idle(time.monotonic())
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                break
+            if conn.is_stale():
+                conn.close()
+                with self._lock:
+                    self.stale += 1
+                continue
+            with self._lock:
+                self.reuses += 1
+            conn.requests += 1
+            return conn
+
+    def adopt(self, sock):
+        """
+        Wraps a new socket to the upstream, connected or still connecting,
+        into a connection of the pool.
+
+        :param sock (socket.socket): the socket.
+
+        :rtype UpstreamConnection: the connection.
+        """
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._lock:
+            self.connects += 1
+        conn = UpstreamConnection(self, sock)
+        conn.requests = 1
+        return conn
+
+    def start_request(self):
+        """Counts a request forwarded to the upstream as in flight."""
+        with self._lock:
+            self.in_flight += 1
+
+    def finish_request(self):
+        """Counts a request started with :meth:`start_request` as answered."""
+        with self._lock:
+            self.in_flight -= 1
+
+    def release(self, conn):
+        """
+        Returns a connection whose response was read completely. It is kept
+        for the next request unless it cannot be reused or the pool is full.
+
+        :param conn (UpstreamConnection): the connection.
+        """
+        if not conn.reusable:
+            conn.close()
+            return
+        conn.idle_since = time.monotonic()
+        with self._lock:
+            self._evict_idle(conn.idle_since)
+            if len(self._idle) < self.max_size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def _evict_idle(self, now):
+        # The oldest connections are on the left.
+        while self._idle and now - self._idle[0].idle_since > self.idle_timeout:
+            self._idle.popleft().close()
+            self.evictions += 1
+
+    def clear(self):
+        """Closes every idle connection."""
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
+
+    def stats(self):
+        """
+        Returns a snapshot of the pool counters.
+
+        :rtype dict: health, idle connections, requests in flight, connects,
+            reuses, stale and evicted connections.
+        """
+        with self._lock:
+            return {
+                "healthy": self.healthy,
+                "ejected": self.ejected_until > time.monotonic(),
+                "failures": self.failures,
+                "idle": len(self._idle),
+                "in_flight": self.in_flight,
+                "connects": self.connects,
+                "reuses": self.reuses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+            }
+
+
+class UpstreamPools:
+    """
+    The :class:`UpstreamPool <UpstreamPool>` of every upstream, created on
+    first use.
+    """
+
+    def __init__(self):
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def get(self, host, port):
+        """
+        Returns the pool of an upstream.
+
+        :param host (str): upstream host.
+        :param port (int): upstream port.
+
+        :rtype UpstreamPool: the pool.
+        """
+        address = (host, int(port))
+        pool = self._pools.get(address)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.setdefault(address, UpstreamPool(address))
+        return pool
+
+    def all(self):
+        """
+        :rtype list: every pool created so far.
+        """
+        with self._lock:
+            return list(self._pools.values())
+
+    def stats(self):
+        """
+        Returns the counters of every pool.
+
+        :rtype dict: ``host:port`` -> :meth:`UpstreamPool.stats`.
+        """
+        return {"{}:{}".format(*pool.address): pool.stats() for pool in self.all()}
+
+
+class HealthChecker(threading.Thread):
+    """
+    Daemon thread probing every upstream pool each ``interval`` seconds,
+    see :meth:`UpstreamPool.probe`.
+
+    :param pools (UpstreamPools): pools to check.
+    :param interval (float): seconds between two rounds of probes.
+    """
+
+    def __init__(self, pools, interval=HEALTH_CHECK_INTERVAL):
+        super().__init__(name="upstream-health", daemon=True)
+        self.pools = pools
+        self.interval = interval
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.is_set():
+            for pool in self.pools.all():
+                pool.probe()
+            self._halt.wait(self.interval)
+
+    def stop(self):
+        """Ends the thread after the current round."""
+        self._halt.set()
+
+
+#: Upstream pools shared by every proxy handler of the process.
+upstream_pools = UpstreamPools()
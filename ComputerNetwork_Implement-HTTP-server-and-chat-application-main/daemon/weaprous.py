@@ -17,7 +17,10 @@ deamon.weaproute
 This module provides a WeApRous object to deploy RESTful url web app with routing
 """
 
-from .backend import create_backend
+import inspect
+
+from .backend import create_backend, POOL_SIZE, QUEUE_SIZE
+from .httpparser import MAX_BODY_SIZE
 
 class WeApRous:
     """The fully mutable :class:`WeApRous <WeApRous>` object, which is a lightweight,
@@ -40,6 +43,11 @@ class WeApRous:
       >>> def hello(headers, body):
       >>>     return {'message': 'Hello, world!'}
 
+      >>> @app.route('/peers', methods=['GET'])
+      >>> async def peers(body):
+      >>>     await asyncio.sleep(0)
+      >>>     return {'peers': []}
+
       >>> app.run()
     """
 
@@ -64,12 +72,16 @@ class WeApRous:
         self.ip = ip
         self.port = port
 
-    def route(self, path, methods=['GET']):
+    def route(self, path, methods=['GET'], stream=False):
         """
         Decorator to register a route handler for a specific path and HTTP methods.
+        The handler may be a plain function or an ``async def`` coroutine function.
 
         :param path (str): The URL path to route.
         :param methods (list): A list of HTTP methods (e.g., ['GET', 'POST']) to bind.
+        :param stream (bool): pass the request body as a binary file instead of
+            a decoded string. Large bodies are spooled to disk rather than held
+            in memory, see :mod:`daemon.httpparser`.
 
         :rtype: function - A decorator that registers the handler function.
         """
@@ -80,22 +92,35 @@ class WeApRous:
             # Optional attach route metadata to the function
             func._route_path = path
             func._route_methods = methods
+            func._route_async = inspect.iscoroutinefunction(func)
+            func._route_stream = stream
 
             return func
         return decorator
 
-    def run(self):
+    def run(self, mode="thread", pool_size=POOL_SIZE, queue_size=QUEUE_SIZE, workers=1,
+            max_body_size=MAX_BODY_SIZE):
         """
         Start the backend server and begin handling requests.
 
         This method launches the TCP server using the configured IP and port,
         and dispatches incoming requests to the registered route handlers.
 
+        :param mode (str): ``thread`` (one thread per connection), ``pool``, ``eventloop``
+                           or ``asyncio``.
+        :param pool_size (int): number of worker threads in ``pool``/``eventloop`` mode,
+                                executor threads in ``asyncio`` mode.
+        :param queue_size (int): job queue depth in ``pool``/``eventloop`` mode.
+        :param workers (int): number of pre-forked processes sharing the port.
+        :param max_body_size (int): largest accepted request body in bytes.
+
         :raise: Error if IP or port has not been configured.
         """
         if not self.ip or not self.port:
             print("Rous app need to preapre address"
                   "by calling app.prepare_address(ip,port)")
 
-        create_backend(self.ip, self.port, self.routes)
+        create_backend(self.ip, self.port, self.routes,
+                       mode=mode, pool_size=pool_size, queue_size=queue_size,
+                       workers=workers, max_body_size=max_body_size)
         
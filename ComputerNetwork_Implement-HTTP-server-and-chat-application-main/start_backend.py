@@ -26,6 +26,10 @@ import socket
 import argparse
 
 from daemon import create_backend
+from daemon.backend import POOL_SIZE, QUEUE_SIZE
+from daemon.httpparser import MAX_BODY_SIZE
+from daemon.response import set_cache_policy
+from daemon.compression import GZIP_LEVEL, set_gzip_level
 
 # Default port number used if none is specified via command-line arguments.
 PORT = 9000 
@@ -40,6 +44,15 @@ if __name__ == "__main__":
 
     :arg --server-ip (str): IP address to bind the server (default: 127.0.0.1).
     :arg --server-port (int): Port number to bind the server (default: 9000).
+    :arg --mode (str): ``thread`` per connection, a bounded worker ``pool``,
+                       the selectors based ``eventloop`` or ``asyncio``.
+    :arg --pool-size (int): worker threads in ``pool``/``eventloop`` mode.
+    :arg --queue-size (int): job queue depth in ``pool``/``eventloop`` mode.
+    :arg --workers (int): number of pre-forked backend processes.
+    :arg --max-body-size (int): largest accepted request body in bytes.
+    :arg --cache-policy (str): ``DIR=VALUE`` Cache-Control of the files below
+                               a directory, repeatable.
+    :arg --gzip-level (int): gzip compression level, 0 disables compression.
     """
 
     parser = argparse.ArgumentParser(
@@ -58,9 +71,60 @@ if __name__ == "__main__":
         default=PORT,
         help='Port number to bind the server. Default is {}.'.format(PORT)
     )
+    parser.add_argument(
+        '--mode',
+        choices=['thread', 'pool', 'eventloop', 'asyncio'],
+        default='thread',
+        help='Connection handling mode. Default is thread.'
+    )
+    parser.add_argument(
+        '--pool-size',
+        type=int,
+        default=POOL_SIZE,
+        help='Worker threads in pool/eventloop mode. Default is {}.'.format(POOL_SIZE)
+    )
+    parser.add_argument(
+        '--queue-size',
+        type=int,
+        default=QUEUE_SIZE,
+        help='Job queue depth in pool/eventloop mode. Default is {}.'.format(QUEUE_SIZE)
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Pre-forked processes sharing the port with SO_REUSEPORT; in-memory '
+             'state is per process. Default is 1.'
+    )
+    parser.add_argument(
+        '--max-body-size',
+        type=int,
+        default=MAX_BODY_SIZE,
+        help='Largest accepted request body in bytes. Default is {}.'.format(MAX_BODY_SIZE)
+    )
+    parser.add_argument(
+        '--cache-policy',
+        action='append',
+        metavar='DIR=VALUE',
+        help='Cache-Control of the files below DIR, e.g. "static/=public, max-age=86400". '
+             'Repeatable.'
+    )
+    parser.add_argument(
+        '--gzip-level',
+        type=int,
+        default=GZIP_LEVEL,
+        help='gzip compression level from 1 to 9, 0 disables compression. Default is {}.'.format(GZIP_LEVEL)
+    )
  
     args = parser.parse_args()
+    try:
+        set_cache_policy(args.cache_policy)
+        set_gzip_level(args.gzip_level)
+    except ValueError as e:
+        parser.error(str(e))
     ip = args.server_ip
     port = args.server_port
 
-    create_backend(ip, port)
+    create_backend(ip, port, mode=args.mode,
+                   pool_size=args.pool_size, queue_size=args.queue_size,
+                   workers=args.workers, max_body_size=args.max_body_size)
@@ -24,80 +24,43 @@ definitions from a configuration file, and initializes the proxy server with rou
 
 Requirements:
 --------------
-- socket: provide socket networking interface.
-- threading: enables concurrent client handling via threads.
 - argparse: parses command-line arguments for server configuration.
-- re: used for regular expression matching in configuration parsing
 - response: response utilities.
 - httpadapter: the class for handling HTTP requests.
-- urlparse: parses URLs to extract host and port information.
 - daemon.create_proxy: initializes and starts the proxy server.
+- daemon.proxyconf: parses the config file, nested location blocks included.
 
 """
 
-import socket
-import threading
 import argparse
-import re
-from urllib.parse import urlparse
-from collections import defaultdict
 
 from daemon import create_proxy
+from daemon.proxyconf import parse_config, build_routes
 
 PROXY_PORT = 8080
 
 
 def parse_virtual_hosts(config_file):
     """
-    Parses virtual host blocks from a config file.
+    Parses virtual host blocks from a config file, with their nested
+    ``location`` blocks, see :mod:`daemon.proxyconf`.
 
     :config_file (str): Path to the NGINX config file.
-    :rtype list of dict: Each dict contains 'listen'and 'server_name'.
+    :rtype dict: ``(proxy_map, policy, options, locations)`` by hostname,
+        ``locations`` the compiled prefix trie of the host.
+    :raises ConfigError: on a malformed config file.
     """
 
     with open(config_file, 'r') as f:
         config_text = f.read()
 
-    # Match each host block
-    host_blocks = re.findall(r'host\s+"([^"]+)"\s*\{(.*?)\}', config_text, re.DOTALL)
-
-    dist_policy_map = ""
-
-    routes = {}
-    for host, block in host_blocks:
-        proxy_map = {}
-
-        # Find all proxy_pass entries
-        proxy_passes = re.findall(r'proxy_pass\s+http://([^\s;]+);', block)
-        map = proxy_map.get(host,[])
-        map = map + proxy_passes
-        proxy_map[host] = map
-
-        # Find dist_policy if present
-        policy_match = re.search(r'dist_policy\s+(\w+)', block)
-        if policy_match:
-            dist_policy_map = policy_match.group(1)
-        else: #default policy is round_robin
-            dist_policy_map = 'round-robin'
-            
-        #
-        # @bksysnet: Build the mapping and policy
-        # TODO: this policy varies among scenarios 
-        #       the default policy is provided with one proxy_pass
-        #       In the multi alternatives of proxy_pass then
-        #       the policy is applied to identify the highes matching
-        #       proxy_pass
-        #
-        if len(proxy_map.get(host,[])) == 1:
-            routes[host] = (proxy_map.get(host,[])[0], dist_policy_map)
-        # esle if:
-        #         TODO:  apply further policy matching here
-        #
-        else:
-            routes[host] = (proxy_map.get(host,[]), dist_policy_map)
+    routes = build_routes(parse_config(config_text))
 
     for key, value in routes.items():
-        print (key, value)
+        print (key, value[:3])
+        for prefix, route in value[3].locations.items():
+            if prefix:
+                print ("    location", prefix, route)
     return routes
 
 
@@ -111,11 +74,19 @@ if __name__ == "__main__":
 
     :arg --server-ip (str): IP address to bind the server (default: 127.0.0.1).
     :arg --server-port (int): Port number to bind the server (default: 9000).
+    :arg --mode (str): ``thread`` per client connection, or the selectors
+                       based ``eventloop``.
     """
 
     parser = argparse.ArgumentParser(prog='Proxy', description='', epilog='Proxy daemon')
     parser.add_argument('--server-ip', default='0.0.0.0')
     parser.add_argument('--server-port', type=int, default=PROXY_PORT)
+    parser.add_argument(
+        '--mode',
+        choices=['thread', 'eventloop'],
+        default='thread',
+        help='Connection handling mode. Default is thread.'
+    )
  
     args = parser.parse_args()
     ip = args.server_ip
@@ -123,4 +94,4 @@ if __name__ == "__main__":
 
     routes = parse_virtual_hosts("config/proxy.conf")
 
-    create_proxy(ip, port, routes)
+    create_proxy(ip, port, routes, args.mode)
@@ -24,12 +24,18 @@ HTTP requests. The application includes a login endpoint and a greeting endpoint
 and can be configured via command-line arguments.
 """
 import os
+import re
 import json
 import socket
+import asyncio
 import argparse
 import requests
 import datetime
 from daemon.weaprous import WeApRous
+from daemon.response import StreamingResponse, set_cache_policy
+from daemon.compression import GZIP_LEVEL, set_gzip_level
+from daemon.backend import POOL_SIZE, QUEUE_SIZE
+from daemon.httpparser import MAX_BODY_SIZE
 WWW_DIR = os.path.join(os.path.dirname(__file__), "www")
 
 PORT = 8000  # Default port
@@ -41,6 +47,13 @@ BACKEND_URL = "http://127.0.0.1:8080"  # proxy sẽ trỏ backend.local -> 127.0
 WWW_DIR = os.path.join(os.path.dirname(__file__), "www")
 PEERS_CACHE_FILE = os.path.join("db", "peers_cache.json") 
 LOG_FILE = os.path.join("db", "chat_log.json")
+#: Chat history messages sent per chunk by /get-chat-log.
+CHAT_LOG_BATCH = 200
+#: Characters of a chat history file read at a time by /get-chat-log.
+CHAT_LOG_READ_SIZE = 65536
+#: Whitespace before a JSON array, and whitespace and separators between its items.
+_JSON_SPACE = re.compile(r"\s*")
+_JSON_SEPARATORS = re.compile(r"[\s,]*")
 PEERS_CACHE = {}
 
 # ==========================================================
@@ -300,8 +313,19 @@ def send_peer(body):
         return {"error": str(e)}
 
 
+async def send_to_peer(ip, port, payload):
+    """
+    Mở kết nối TCP tới peer và gửi payload (không chặn event loop).
+    """
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, int(port)), timeout=3)
+    writer.write(payload)
+    await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+
 @app.route("/broadcast-peer", methods=["POST"])
-def broadcast(body):
+async def broadcast(body):
     try:
         data = json.loads(body)
         msg = data.get("message", "")
@@ -324,28 +348,29 @@ def broadcast(body):
         # Loại bỏ chính nó
         sender_conn = [p for p in sender_conn if p.get("peer") != sender]
 
+        targets = []
         for entry in sender_conn:
-            target_peer = entry.get("peer")
-            ip = entry.get("ip")
-            port = entry.get("port")
-
-            if not ip or not port:
-                print(f"[WARN] Missing ip/port for {target_peer}")
+            if not entry.get("ip") or not entry.get("port"):
+                print(f"[WARN] Missing ip/port for {entry.get('peer')}")
                 continue
+            targets.append(entry)
 
-            try:
-                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                s.connect((ip, int(port)))
-                s.sendall(f"[Broadcast from {sender}] {msg}".encode("utf-8"))
-                s.close()
+        # Gửi song song tới tất cả peers
+        payload = f"[Broadcast from {sender}] {msg}".encode("utf-8")
+        results = await asyncio.gather(
+            *(send_to_peer(entry["ip"], entry["port"], payload) for entry in targets),
+            return_exceptions=True)
 
-                success.append(target_peer)
+        for entry, result in zip(targets, results):
+            target_peer = entry.get("peer")
+            if isinstance(result, Exception):
+                print(f"[WARN] Broadcast error {target_peer}: {result}")
+                continue
 
-                # Log RECV
-                save_peer_message(target_peer, f"From {sender} (broadcast): {msg}", "recv")
+            success.append(target_peer)
 
-            except Exception as e:
-                print(f"[WARN] Broadcast error {target_peer}: {e}")
+            # Log RECV
+            save_peer_message(target_peer, f"From {sender} (broadcast): {msg}", "recv")
 
         # Log SEND
         save_peer_message(sender, f"Broadcasted: {msg}", "send")
@@ -356,12 +381,76 @@ def broadcast(body):
         return {"error": str(e)}
 
 
+def iter_chat_log(f):
+    """
+    Yields the messages of a chat history file one by one, decoding the JSON
+    array CHAT_LOG_READ_SIZE characters at a time instead of loading it whole.
+    A file not holding an array yields nothing.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    started = False
+    while True:
+        pos = (_JSON_SEPARATORS if started else _JSON_SPACE).match(buf, pos).end()
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != "[":
+                    return
+                pos += 1
+                started = True
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+                end = None
+            # A value ending the buffer may go on in the next read.
+            if end is not None and (end < len(buf) or eof):
+                yield item
+                pos = end
+                continue
+        if eof:
+            return
+        chunk = f.read(CHAT_LOG_READ_SIZE)
+        eof = not chunk
+        buf = buf[pos:] + chunk
+        pos = 0
+
+
+def stream_chat_log(peer, file_path):
+    """
+    Yields the JSON document {"peer", "messages", "count"} piece by piece,
+    reading the history file as the messages are sent.
+    """
+    yield '{{"peer": {}, "messages": ['.format(json.dumps(peer, ensure_ascii=False))
+    count = 0
+    batch = []
+    with open(file_path, "r", encoding="utf-8") as f:
+        for message in iter_chat_log(f):
+            batch.append(json.dumps(message, ensure_ascii=False))
+            if len(batch) == CHAT_LOG_BATCH:
+                yield (", " if count else "") + ", ".join(batch)
+                count += len(batch)
+                batch = []
+    if batch:
+        yield (", " if count else "") + ", ".join(batch)
+        count += len(batch)
+    yield '], "count": {}}}'.format(count)
+
+
 @app.route("/get-chat-log", methods=["POST"])
 def get_chat_log(body):
     """
     API: POST /get-chat-log
     Body: {"peer": "Client2"}
     Trả về JSON lịch sử tin nhắn của peer (đọc db/<peer>_messages.json)
+    The history is streamed from the file as a chunked response, CHAT_LOG_BATCH
+    messages per chunk, with "count" sent last.
     """
     try:
         data = json.loads(body or "{}")
@@ -375,13 +464,9 @@ def get_chat_log(body):
         if not os.path.exists(file_path):
             return {"peer": peer, "count": 0, "messages": []}
 
-        with open(file_path, "r", encoding="utf-8") as f:
-            messages = json.load(f)
-            if not isinstance(messages, list):
-                messages = []
-
-        print(f"[OK] /get-chat-log → {peer}, {len(messages)} messages")
-        return {"peer": peer, "count": len(messages), "messages": messages}
+        print(f"[OK] /get-chat-log → {peer}, streaming {file_path}")
+        return StreamingResponse(stream_chat_log(peer, file_path),
+                                 content_type="application/json; charset=utf-8")
 
     except Exception as e:
         print(f"[ERROR] /get-chat-log failed: {e}")
@@ -393,11 +478,24 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(prog='Backend', description='', epilog='Beckend daemon')
     parser.add_argument('--server-ip', default='0.0.0.0')
     parser.add_argument('--server-port', type=int, default=PORT)
+    parser.add_argument('--mode', choices=['thread', 'pool', 'eventloop', 'asyncio'], default='thread')
+    parser.add_argument('--pool-size', type=int, default=POOL_SIZE)
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--max-body-size', type=int, default=MAX_BODY_SIZE)
+    parser.add_argument('--cache-policy', action='append', metavar='DIR=VALUE')
+    parser.add_argument('--gzip-level', type=int, default=GZIP_LEVEL)
  
     args = parser.parse_args()
+    try:
+        set_cache_policy(args.cache_policy)
+        set_gzip_level(args.gzip_level)
+    except ValueError as e:
+        parser.error(str(e))
     ip = args.server_ip
     port = args.server_port
    
     # Prepare and launch the RESTful application
     app.prepare_address(ip, port)
-    app.run()
+    app.run(mode=args.mode, pool_size=args.pool_size, queue_size=args.queue_size,
+            workers=args.workers, max_body_size=args.max_body_size)
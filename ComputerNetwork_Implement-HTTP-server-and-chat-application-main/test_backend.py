@@ -0,0 +1,111 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+test_backend
+~~~~~~~~~~~~~~~~~
+
+Tests of the ``pool`` mode of :mod:`daemon.backend` against a live server,
+run with ``python -m pytest test_backend.py`` or ``python -m unittest``.
+"""
+
+import socket
+import threading
+import time
+import unittest
+
+from daemon.backend import run_backend, _server_state
+
+REQUEST = b"GET /favicon.ico HTTP/1.1\r\nHost: localhost\r\n\r\n"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def read_response(sock):
+    """
+    Reads one bodiless response from ``sock``.
+
+    :rtype bytes: the response head.
+    """
+    data = b""
+    while b"\r\n\r\n" not in data:
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+class PoolKeepAliveTest(unittest.TestCase):
+    """Idle keep-alive connections must not hold the pool workers."""
+
+    POOL_SIZE = 2
+
+    @classmethod
+    def setUpClass(cls):
+        cls.port = free_port()
+        threading.Thread(target=run_backend, args=("127.0.0.1", cls.port, {}, "pool", cls.POOL_SIZE, 8),
+                         daemon=True).start()
+        deadline = time.monotonic() + 5
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", cls.port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def connect(self):
+        sock = socket.create_connection(("127.0.0.1", self.port), timeout=3)
+        self.addCleanup(sock.close)
+        return sock
+
+    def test_idle_clients_do_not_block_others(self):
+        idle = []
+        for _ in range(self.POOL_SIZE):
+            sock = self.connect()
+            sock.sendall(REQUEST)
+            self.assertIn(b" 204 ", read_response(sock))
+            idle.append(sock)
+
+        start = time.monotonic()
+        sock = self.connect()
+        sock.sendall(REQUEST)
+        self.assertIn(b" 204 ", read_response(sock))
+        self.assertLess(time.monotonic() - start, 1.0)
+
+        # The parked connections are still served on their next request.
+        for sock in idle:
+            sock.sendall(REQUEST)
+            self.assertIn(b" 204 ", read_response(sock))
+        self.assertGreaterEqual(_server_state["engine"].stats()["resumed"], self.POOL_SIZE)
+
+    def test_pipelined_requests_after_parking(self):
+        sock = self.connect()
+        sock.sendall(REQUEST)
+        self.assertIn(b" 204 ", read_response(sock))
+        time.sleep(0.1)
+        sock.sendall(REQUEST * 3)
+        data = b""
+        while data.count(b"HTTP/1.1 204") < 3:
+            chunk = sock.recv(4096)
+            self.assertTrue(chunk)
+            data += chunk
+
+
+if __name__ == "__main__":
+    unittest.main()
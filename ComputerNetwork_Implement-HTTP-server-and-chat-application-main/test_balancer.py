@@ -0,0 +1,184 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+test_balancer
+~~~~~~~~~~~~~~~~~
+
+Unit tests of :mod:`daemon.balancer`, run with
+``python -m pytest test_balancer.py`` or ``python -m unittest``.
+"""
+
+import collections
+import itertools
+import unittest
+
+from daemon.balancer import (Balancer, RoundRobin, Weighted, LeastConnections, ConsistentHash,
+                             get_balancer, parse_upstream)
+from daemon.upstream import upstream_pools
+
+#: Distinct upstream addresses for every test, so pool state is not shared.
+_ports = itertools.count(20000)
+
+
+class BalancerTestCase(unittest.TestCase):
+
+    def upstreams(self, *weights):
+        """
+        :rtype list: ``(host, port, weight)`` of fresh upstreams.
+        """
+        return [("10.0.0.1", next(_ports), weight) for weight in weights]
+
+    def pool(self, upstream):
+        return upstream_pools.get(upstream[0], upstream[1])
+
+    def down(self, upstream):
+        pool = self.pool(upstream)
+        pool.healthy = False
+        self.addCleanup(setattr, pool, "healthy", True)
+
+    def picks(self, balancer, count, headers=None, client_ip="192.0.2.1"):
+        return [balancer.choose(headers or {}, client_ip) for _ in range(count)]
+
+
+class ParseUpstreamTest(unittest.TestCase):
+
+    def test_weight(self):
+        self.assertEqual(parse_upstream("127.0.0.1:9001 weight=3"), ("127.0.0.1", 9001, 3))
+        self.assertEqual(parse_upstream("127.0.0.1:9001"), ("127.0.0.1", 9001, 1))
+
+    def test_invalid(self):
+        for spec in ("9001", "127.0.0.1:9001 weight=0"):
+            with self.assertRaises(ValueError):
+                parse_upstream(spec)
+
+
+class RoundRobinTest(BalancerTestCase):
+
+    def test_in_turn(self):
+        upstreams = self.upstreams(1, 1, 1)
+        picks = self.picks(RoundRobin(upstreams), 6)
+        self.assertEqual(picks, [(host, port) for host, port, _ in upstreams] * 2)
+
+    def test_skips_unavailable(self):
+        upstreams = self.upstreams(1, 1, 1)
+        self.down(upstreams[1])
+        picks = self.picks(RoundRobin(upstreams), 4)
+        self.assertNotIn(upstreams[1][:2], picks)
+        self.assertEqual(len(set(picks)), 2)
+
+    def test_none_available(self):
+        upstreams = self.upstreams(1, 1)
+        for upstream in upstreams:
+            self.down(upstream)
+        self.assertIsNone(RoundRobin(upstreams).choose({}, "192.0.2.1"))
+
+
+class WeightedTest(BalancerTestCase):
+
+    def test_proportional_and_interleaved(self):
+        upstreams = self.upstreams(3, 1)
+        picks = self.picks(Weighted(upstreams), 8)
+        counts = collections.Counter(picks)
+        self.assertEqual(counts[upstreams[0][:2]], 6)
+        self.assertEqual(counts[upstreams[1][:2]], 2)
+        # Smooth: the light upstream is not left waiting for a run of three.
+        self.assertIn(upstreams[1][:2], picks[:4])
+
+    def test_skips_unavailable(self):
+        upstreams = self.upstreams(5, 1)
+        self.down(upstreams[0])
+        self.assertEqual(set(self.picks(Weighted(upstreams), 4)), {upstreams[1][:2]})
+
+
+class LeastConnectionsTest(BalancerTestCase):
+
+    def test_fewest_in_flight(self):
+        upstreams = self.upstreams(1, 1, 1)
+        for upstream, in_flight in zip(upstreams, (3, 1, 2)):
+            pool = self.pool(upstream)
+            pool.in_flight = in_flight
+            self.addCleanup(setattr, pool, "in_flight", 0)
+        self.assertEqual(set(self.picks(LeastConnections(upstreams), 3)), {upstreams[1][:2]})
+
+    def test_relative_to_weight(self):
+        upstreams = self.upstreams(4, 1)
+        for upstream, in_flight in zip(upstreams, (3, 1)):
+            pool = self.pool(upstream)
+            pool.in_flight = in_flight
+            self.addCleanup(setattr, pool, "in_flight", 0)
+        self.assertEqual(LeastConnections(upstreams).choose({}, "192.0.2.1"), upstreams[0][:2])
+
+    def test_ties_rotate(self):
+        upstreams = self.upstreams(1, 1)
+        self.assertEqual(len(set(self.picks(LeastConnections(upstreams), 2))), 2)
+
+
+class ConsistentHashTest(BalancerTestCase):
+
+    def test_same_client_same_upstream(self):
+        balancer = ConsistentHash(self.upstreams(1, 1, 1))
+        for ip in ("192.0.2.1", "192.0.2.2", "198.51.100.7"):
+            self.assertEqual(len(set(self.picks(balancer, 5, client_ip=ip))), 1)
+
+    def test_cookie_key(self):
+        balancer = ConsistentHash(self.upstreams(1, 1, 1), ["cookie=sessionid"])
+        headers = {"cookie": "theme=dark; sessionid=abc123"}
+        picks = {balancer.choose(headers, "192.0.2.{}".format(i)) for i in range(20)}
+        self.assertEqual(len(picks), 1)
+        self.assertEqual(balancer.key({}, "192.0.2.9"), "192.0.2.9")
+
+    def test_only_clients_of_unavailable_upstream_move(self):
+        upstreams = self.upstreams(1, 1, 1)
+        balancer = ConsistentHash(upstreams)
+        clients = ["10.1.{}.{}".format(i // 256, i % 256) for i in range(300)]
+        before = {ip: balancer.choose({}, ip) for ip in clients}
+        self.down(upstreams[0])
+        after = {ip: balancer.choose({}, ip) for ip in clients}
+        for ip in clients:
+            if before[ip] != upstreams[0][:2]:
+                self.assertEqual(after[ip], before[ip])
+            else:
+                self.assertNotEqual(after[ip], upstreams[0][:2])
+
+    def test_spread(self):
+        upstreams = self.upstreams(1, 1, 1)
+        balancer = ConsistentHash(upstreams)
+        counts = collections.Counter(balancer.choose({}, "10.2.0.{}".format(i)) for i in range(256))
+        self.assertEqual(len(counts), 3)
+
+    def test_invalid_key(self):
+        with self.assertRaises(ValueError):
+            ConsistentHash(self.upstreams(1), ["header=x"])
+
+
+class GetBalancerTest(unittest.TestCase):
+
+    def test_shared_per_list_and_policy(self):
+        targets = ["10.0.0.2:9001", "10.0.0.2:9002"]
+        balancer = get_balancer(targets, "round-robin")
+        self.assertIs(get_balancer(list(targets), "round-robin"), balancer)
+        self.assertIsInstance(get_balancer(targets, "hash cookie=sid"), ConsistentHash)
+        self.assertIsInstance(get_balancer(targets, "least_connections"), LeastConnections)
+        self.assertIsInstance(get_balancer(targets, None), RoundRobin)
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            get_balancer(["10.0.0.2:9001"], "random")
+
+    def test_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            Balancer([("10.0.0.2", 9001, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+test_httpadapter
+~~~~~~~~~~~~~~~~~
+
+Unit tests of :class:`HttpAdapter <daemon.httpadapter.HttpAdapter>` serving
+one end of a socket pair, run with ``python -m pytest test_httpadapter.py``
+or ``python -m unittest``.
+"""
+
+import json
+import socket
+import threading
+import time
+import unittest
+
+from daemon.httpadapter import HttpAdapter
+from daemon.httpparser import MAX_BODY_SIZE
+
+
+def slow(body):
+    time.sleep(0.05)
+    return {"route": "slow"}
+
+
+ROUTES = {
+    ("GET", "/slow"): slow,
+    ("GET", "/fast"): lambda body: {"route": "fast"},
+    ("POST", "/echo"): lambda body: {"route": "echo", "body": body},
+}
+
+
+def request(method, path, body=b"", headers=()):
+    lines = ["{} {} HTTP/1.1".format(method, path), "Host: localhost"]
+    lines += ["{}: {}".format(name, value) for name, value in headers]
+    if body:
+        lines.append("Content-Length: {}".format(len(body)))
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def exchange(*writes, routes=ROUTES, max_body_size=MAX_BODY_SIZE):
+    """
+    Sends ``writes`` to an adapter one after the other, closes the write
+    side and reads until the adapter closes the connection.
+
+    :rtype list: (status, headers, body) of every response, in order.
+    """
+    client, server = socket.socketpair()
+    adapter = HttpAdapter("127.0.0.1", 0, server, ("127.0.0.1", 0), routes, max_body_size)
+    thread = threading.Thread(target=adapter.handle_client, args=(server, ("127.0.0.1", 0), routes))
+    thread.start()
+    client.settimeout(5)
+    for i, data in enumerate(writes):
+        if i:
+            time.sleep(0.05)
+        client.sendall(data)
+    client.shutdown(socket.SHUT_WR)
+    received = b""
+    while True:
+        chunk = client.recv(65536)
+        if not chunk:
+            break
+        received += chunk
+    client.close()
+    thread.join(5)
+    return split_responses(received)
+
+
+def split_responses(data):
+    responses = []
+    while data:
+        head, _, data = data.partition(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        responses.append((int(lines[0].split()[1]), headers, data[:length]))
+        data = data[length:]
+    return responses
+
+
+class PipeliningTest(unittest.TestCase):
+    """Pipelined requests are answered in the order they were sent."""
+
+    def test_responses_follow_request_order(self):
+        data = request("GET", "/slow") + request("GET", "/fast") + request("GET", "/favicon.ico") \
+            + request("POST", "/echo", b"ping")
+        responses = exchange(data)
+        self.assertEqual([status for status, _, _ in responses], [200, 200, 204, 200])
+        self.assertEqual(json.loads(responses[0][2]), {"route": "slow"})
+        self.assertEqual(json.loads(responses[1][2]), {"route": "fast"})
+        self.assertEqual(json.loads(responses[3][2]), {"route": "echo", "body": "ping"})
+
+    def test_request_split_across_writes(self):
+        data = request("GET", "/fast") + request("GET", "/slow")
+        responses = exchange(data[:30], data[30:])
+        self.assertEqual([json.loads(body)["route"] for _, _, body in responses], ["fast", "slow"])
+
+    def test_nothing_answered_after_connection_close(self):
+        data = request("GET", "/fast", headers=[("Connection", "close")]) + request("GET", "/slow")
+        responses = exchange(data)
+        self.assertEqual(len(responses), 1)
+        self.assertEqual(responses[0][1]["connection"], "close")
+
+    def test_keep_alive_headers_count_down(self):
+        responses = exchange(request("GET", "/fast") * 3)
+        self.assertEqual([headers["keep-alive"] for _, headers, _ in responses],
+                         ["timeout=5, max=99", "timeout=5, max=98", "timeout=5, max=97"])
+
+    def test_malformed_request_after_valid_one(self):
+        responses = exchange(request("GET", "/fast") + b"NONSENSE\r\n\r\n" + request("GET", "/slow"))
+        self.assertEqual([status for status, _, _ in responses], [200, 400])
+
+
+class BodyLimitTest(unittest.TestCase):
+    """Bodies above the adapter ``max_body_size`` are answered with 413."""
+
+    def test_payload_too_large(self):
+        responses = exchange(request("POST", "/echo", b"12345") + request("GET", "/fast"), max_body_size=4)
+        self.assertEqual([status for status, _, _ in responses], [413])
+
+    def test_body_at_limit(self):
+        responses = exchange(request("POST", "/echo", b"1234"), max_body_size=4)
+        self.assertEqual(json.loads(responses[0][2])["body"], "1234")
+
+
+if __name__ == "__main__":
+    unittest.main()
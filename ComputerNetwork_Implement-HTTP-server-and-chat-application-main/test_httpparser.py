@@ -0,0 +1,166 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+test_httpparser
+~~~~~~~~~~~~~~~~~
+
+Unit tests of :mod:`daemon.httpparser`, body size limits and spooling
+included, and of the chunked responses of :mod:`daemon.response`, run
+with ``python -m pytest test_httpparser.py`` or ``python -m unittest``.
+"""
+
+import unittest
+
+from daemon.httpparser import RequestParser, HttpParseError, BodyTooLarge
+from daemon.response import StreamingResponse
+
+CHUNKED_HEAD = b"POST /upload HTTP/1.1\r\nHost: localhost\r\nTransfer-Encoding: chunked\r\n\r\n"
+
+
+def body_of(message):
+    return message.stream.read() if message.stream is not None else message.body
+
+
+class ChunkedRequestTest(unittest.TestCase):
+    """Chunked request bodies are decoded as the chunks arrive."""
+
+    def test_chunks_are_joined(self):
+        parser = RequestParser()
+        parser.feed(CHUNKED_HEAD + b"5\r\nhello\r\n6\r\n world\r\n0\r\n\r\n")
+        message = parser.next_message()
+        self.assertEqual(body_of(message), b"hello world")
+        self.assertEqual(message.headers["content-length"], "11")
+        self.assertNotIn("transfer-encoding", message.headers)
+        self.assertFalse(parser.pending())
+
+    def test_byte_by_byte(self):
+        parser = RequestParser()
+        data = CHUNKED_HEAD + b"a;name=value\r\n0123456789\r\n3\r\nabc\r\n0\r\n\r\n"
+        messages = []
+        for i in range(len(data)):
+            parser.feed(data[i:i + 1])
+            message = parser.next_message()
+            if message is not None:
+                messages.append(message)
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(body_of(messages[0]), b"0123456789abc")
+
+    def test_trailers_are_skipped(self):
+        parser = RequestParser()
+        parser.feed(CHUNKED_HEAD + b"2\r\nok\r\n0\r\nX-Checksum: 1\r\n\r\n")
+        self.assertEqual(body_of(parser.next_message()), b"ok")
+        self.assertFalse(parser.pending())
+
+    def test_pipelined_after_chunked(self):
+        parser = RequestParser()
+        parser.feed(CHUNKED_HEAD + b"1\r\nx\r\n0\r\n\r\nGET /next HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        self.assertEqual(body_of(parser.next_message()), b"x")
+        self.assertEqual(parser.next_message().path, "/next")
+
+    def test_invalid_chunk_size(self):
+        parser = RequestParser()
+        parser.feed(CHUNKED_HEAD + b"zz\r\nhello\r\n")
+        with self.assertRaises(HttpParseError):
+            parser.next_message()
+
+    def test_missing_crlf_after_chunk(self):
+        parser = RequestParser()
+        parser.feed(CHUNKED_HEAD + b"2\r\nokXX0\r\n\r\n")
+        with self.assertRaises(HttpParseError):
+            parser.next_message()
+
+    def test_unsupported_transfer_encoding(self):
+        parser = RequestParser()
+        parser.feed(b"POST / HTTP/1.1\r\nTransfer-Encoding: gzip\r\n\r\n")
+        with self.assertRaises(HttpParseError):
+            parser.next_message()
+
+
+class BodySizeTest(unittest.TestCase):
+    """Bodies above ``max_body_size`` are refused, large ones are spooled."""
+
+    def test_content_length_too_large(self):
+        parser = RequestParser(max_body_size=10)
+        parser.feed(b"POST / HTTP/1.1\r\nContent-Length: 11\r\n\r\n")
+        with self.assertRaises(BodyTooLarge):
+            parser.next_message()
+
+    def test_content_length_at_limit(self):
+        parser = RequestParser(max_body_size=10)
+        parser.feed(b"POST / HTTP/1.1\r\nContent-Length: 10\r\n\r\n0123456789")
+        self.assertEqual(body_of(parser.next_message()), b"0123456789")
+
+    def test_chunked_too_large(self):
+        parser = RequestParser(max_body_size=10)
+        parser.feed(CHUNKED_HEAD + b"6\r\nhello \r\n")
+        self.assertIsNone(parser.next_message())
+        parser.feed(b"6\r\nworld!\r\n")
+        with self.assertRaises(BodyTooLarge):
+            parser.next_message()
+
+    def test_too_large_is_a_parse_error(self):
+        self.assertTrue(issubclass(BodyTooLarge, HttpParseError))
+
+    def test_large_body_is_spooled(self):
+        parser = RequestParser(spool_threshold=16)
+        body = b"x" * 100
+        parser.feed(b"POST / HTTP/1.1\r\nContent-Length: 100\r\n\r\n" + body[:40])
+        self.assertIsNone(parser.next_message())
+        self.assertTrue(parser.in_body())
+        parser.feed(body[40:])
+        message = parser.next_message()
+        self.assertIsNone(message.body)
+        self.assertEqual(message.stream.read(), body)
+        self.assertFalse(parser.in_body())
+
+    def test_in_body_only_after_head(self):
+        parser = RequestParser()
+        parser.feed(b"POST / HTTP/1.1\r\nContent-")
+        self.assertIsNone(parser.next_message())
+        self.assertTrue(parser.pending())
+        self.assertFalse(parser.in_body())
+
+    def test_header_block_too_large(self):
+        parser = RequestParser(max_header_size=64)
+        parser.feed(b"GET / HTTP/1.1\r\nX-Long: " + b"a" * 100)
+        with self.assertRaises(HttpParseError):
+            parser.next_message()
+
+
+class StreamingResponseTest(unittest.TestCase):
+    """Streamed responses are sent with chunked framing."""
+
+    def test_chunk_framing(self):
+        pieces = list(StreamingResponse(iter(["ab", b"", "cde"])))
+        self.assertIn(b"Transfer-Encoding: chunked", pieces[0])
+        self.assertEqual(b"".join(pieces[1:]), b"2\r\nab\r\n3\r\ncde\r\n0\r\n\r\n")
+
+    def test_failed_body_has_no_last_chunk(self):
+        def body():
+            yield "ok"
+            raise RuntimeError("boom")
+        response = StreamingResponse(body())
+        data = b"".join(list(response)[1:])
+        self.assertTrue(response.failed)
+        self.assertEqual(data, b"2\r\nok\r\n")
+
+    def test_collect_for_http10(self):
+        data = StreamingResponse(iter(["ab", "cd"])).collect()
+        head, _, body = data.partition(b"\r\n\r\n")
+        self.assertNotIn(b"Transfer-Encoding", head)
+        self.assertIn(b"Content-Length: 4", head)
+        self.assertEqual(body, b"abcd")
+
+
+if __name__ == "__main__":
+    unittest.main()
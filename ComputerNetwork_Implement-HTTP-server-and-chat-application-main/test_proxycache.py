@@ -0,0 +1,207 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+test_proxycache
+~~~~~~~~~~~~~~~~~
+
+Unit tests of :mod:`daemon.proxycache`, run with
+``python -m pytest test_proxycache.py`` or ``python -m unittest``.
+"""
+
+import email.utils
+import time
+import unittest
+
+from daemon.proxycache import ProxyCache, freshness_lifetime, parse_proxy_cache
+
+VHOST = "app1.local"
+
+
+def make_head(status, headers):
+    lines = ["HTTP/1.1 {} X".format(status)] + ["{}: {}".format(name, value) for name, value in headers]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def relay(cache, target, status=200, headers=(), body=b"hello", request_headers=None, ttl=0.0):
+    """
+    Runs one request through the cache as an engine does, the backend
+    answering ``status``, ``headers`` and ``body``.
+
+    :rtype tuple: (transaction, bytes sent to the client).
+    """
+    tx = cache.begin(VHOST, "GET", target, request_headers or {}, ttl)
+    if tx.response is not None:
+        return tx, tx.response
+    headers = tuple(headers) + (("Content-Length", str(len(body))),)
+    sent = tx.on_head(status, make_head(status, headers),
+                      {name.lower(): value for name, value in headers})
+    if status != 304:
+        tx.on_body(body)
+        sent += body
+    tx.finish(True)
+    return tx, sent
+
+
+def entry_sizes(cache):
+    return sum(entry.size for entry in cache._entries.values())
+
+
+class FreshnessTest(unittest.TestCase):
+
+    def test_max_age_wins_over_expires(self):
+        expires = email.utils.formatdate(time.time() + 3600, usegmt=True)
+        headers = {"cache-control": "public, max-age=30", "expires": expires}
+        self.assertEqual(freshness_lifetime(headers, 5, 200), 30)
+
+    def test_s_maxage_wins_over_max_age(self):
+        headers = {"cache-control": "max-age=30, s-maxage=10"}
+        self.assertEqual(freshness_lifetime(headers, 5, 200), 10)
+
+    def test_expires_relative_to_date(self):
+        now = time.time()
+        headers = {"expires": email.utils.formatdate(now + 120, usegmt=True),
+                   "date": email.utils.formatdate(now, usegmt=True)}
+        self.assertAlmostEqual(freshness_lifetime(headers, 5, 200), 120, delta=1)
+
+    def test_invalid_expires_is_stale(self):
+        self.assertEqual(freshness_lifetime({"expires": "0"}, 5, 200), 0)
+
+    def test_default_ttl_only_for_200(self):
+        self.assertEqual(freshness_lifetime({}, 5, 200), 5)
+        self.assertEqual(freshness_lifetime({}, 5, 404), 0)
+
+    def test_no_cache_is_stale(self):
+        headers = {"cache-control": "no-cache, max-age=60"}
+        self.assertEqual(freshness_lifetime(headers, 5, 200), 0)
+
+    def test_parse_proxy_cache(self):
+        self.assertIsNone(parse_proxy_cache("off"))
+        self.assertEqual(parse_proxy_cache("on"), 0)
+        self.assertEqual(parse_proxy_cache("2s"), 2)
+        self.assertEqual(parse_proxy_cache("5m"), 300)
+        self.assertRaises(ValueError, parse_proxy_cache, "soon")
+
+
+class StoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ProxyCache()
+
+    def test_fresh_response_is_served(self):
+        relay(self.cache, "/get-list", ttl=5)
+        tx, sent = relay(self.cache, "/get-list", ttl=5)
+        self.assertIsNotNone(tx.response)
+        self.assertIn(b"X-Cache: HIT", sent)
+        self.assertTrue(sent.endswith(b"hello"))
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_head_is_answered_without_body(self):
+        relay(self.cache, "/get-list", ttl=5)
+        tx = self.cache.begin(VHOST, "HEAD", "/get-list", {}, 5)
+        self.assertTrue(tx.response.endswith(b"\r\n\r\n"))
+
+    def test_uncacheable_responses_are_not_stored(self):
+        for target, headers in (("/a", (("Cache-Control", "no-store, max-age=60"),)),
+                                ("/b", (("Cache-Control", "private, max-age=60"),)),
+                                ("/c", (("Cache-Control", "max-age=60"), ("Set-Cookie", "sid=1")))):
+            relay(self.cache, target, headers=headers, ttl=5)
+            self.assertIsNone(self.cache.lookup((VHOST, "GET", target), {}), target)
+        self.assertEqual(self.cache.stats()["stores"], 0)
+
+    def test_bypassed_requests(self):
+        self.assertIsNone(self.cache.begin(VHOST, "GET", "/", {"authorization": "x"}, 5))
+        self.assertIsNone(self.cache.begin(VHOST, "GET", "/", {"cache-control": "no-store"}, 5))
+        self.assertIsNone(self.cache.begin(VHOST, "GET", "/", {}, None))
+
+    def test_vary_variants(self):
+        vary = (("Vary", "Accept-Encoding"), ("Cache-Control", "max-age=60"))
+        relay(self.cache, "/page", headers=vary, body=b"gzip", request_headers={"accept-encoding": "gzip"})
+        relay(self.cache, "/page", headers=vary, body=b"plain", request_headers={})
+        _, sent = relay(self.cache, "/page", request_headers={"accept-encoding": "gzip"})
+        self.assertTrue(sent.endswith(b"gzip"))
+        _, sent = relay(self.cache, "/page", request_headers={})
+        self.assertTrue(sent.endswith(b"plain"))
+        tx = self.cache.begin(VHOST, "GET", "/page", {"accept-encoding": "br"}, 0)
+        self.assertIsNone(tx.response)
+        self.assertEqual(self.cache.stats()["entries"], 2)
+
+    def test_not_modified_refreshes_entry(self):
+        relay(self.cache, "/login", headers=(("Cache-Control", "no-cache"), ("ETag", '"v1"')),
+              body=b"page")
+        tx = self.cache.begin(VHOST, "GET", "/login", {}, 0)
+        self.assertIsNone(tx.response)
+        self.assertTrue(tx.revalidating)
+        self.assertIn('If-None-Match: "v1"', tx.prepare("GET /login HTTP/1.1\r\nHost: a\r\n\r\n"))
+
+        headers = {"etag": '"v1"', "cache-control": "max-age=60"}
+        sent = tx.on_head(304, make_head(304, headers.items()), headers)
+        tx.finish(True)
+        self.assertIn(b"X-Cache: REVALIDATED", sent)
+        self.assertTrue(sent.endswith(b"page"))
+        self.assertEqual(self.cache.stats()["revalidated"], 1)
+        # The 304 brought a new lifetime: the entry is now served as is.
+        tx = self.cache.begin(VHOST, "GET", "/login", {}, 0)
+        self.assertIsNotNone(tx.response)
+
+    def test_client_validators(self):
+        relay(self.cache, "/s.css", headers=(("Cache-Control", "max-age=60"), ("ETag", '"e"')))
+        tx = self.cache.begin(VHOST, "GET", "/s.css", {"if-none-match": 'W/"x", "e"'}, 0)
+        self.assertTrue(tx.response.startswith(b"HTTP/1.1 304"))
+        tx = self.cache.begin(VHOST, "GET", "/s.css", {"if-none-match": '"other"'}, 0)
+        self.assertTrue(tx.response.startswith(b"HTTP/1.1 200"))
+
+    def test_unsafe_method_invalidates(self):
+        relay(self.cache, "/get-list", ttl=5)
+        self.assertIsNone(self.cache.begin(VHOST, "POST", "/get-list", {}, 5))
+        self.assertIsNone(self.cache.lookup((VHOST, "GET", "/get-list"), {}))
+        self.assertEqual(self.cache.size, 0)
+
+    def test_incomplete_response_is_not_stored(self):
+        tx = self.cache.begin(VHOST, "GET", "/cut", {}, 5)
+        tx.on_head(200, make_head(200, ()), {})
+        tx.on_body(b"par")
+        tx.finish(False)
+        self.assertEqual(self.cache.stats()["stores"], 0)
+
+
+class EvictionTest(unittest.TestCase):
+
+    def test_size_stays_consistent(self):
+        cache = ProxyCache(max_size=1000)
+        for i in range(10):
+            relay(cache, "/item/{}".format(i), body=b"x" * 200, ttl=5)
+            self.assertLessEqual(cache.size, cache.max_size)
+            self.assertEqual(cache.size, entry_sizes(cache))
+        stats = cache.stats()
+        self.assertGreater(stats["evictions"], 0)
+        self.assertEqual(stats["entries"] + stats["evictions"], 10)
+        # The most recent entries survive, and their primary keys are known.
+        self.assertIsNotNone(cache.lookup((VHOST, "GET", "/item/9"), {}))
+        self.assertIsNone(cache.lookup((VHOST, "GET", "/item/0"), {}))
+        self.assertEqual(set(cache._primaries), {key[0] for key in cache._entries})
+
+    def test_replacing_and_dropping_entries(self):
+        cache = ProxyCache()
+        relay(cache, "/a", body=b"one", ttl=5)
+        relay(cache, "/a", body=b"longer body", request_headers={"cache-control": "no-cache"}, ttl=5)
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache.size, entry_sizes(cache))
+        relay(cache, "/b", ttl=5)
+        cache.invalidate(VHOST, "/a")
+        self.assertEqual(cache.size, entry_sizes(cache))
+        cache.clear()
+        self.assertEqual((cache.size, len(cache._primaries)), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
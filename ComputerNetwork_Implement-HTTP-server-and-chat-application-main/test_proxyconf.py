@@ -0,0 +1,168 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+test_proxyconf
+~~~~~~~~~~~~~~~~~
+
+Unit tests of :mod:`daemon.proxyconf`, run with
+``python -m pytest test_proxyconf.py`` or ``python -m unittest``.
+"""
+
+import os
+import unittest
+
+from daemon.proxyconf import ConfigError, LocationTrie, build_routes, parse_config
+
+CONFIG = """
+# Comment line.
+host "app1.local" {   # trailing comment
+    proxy_pass http://127.0.0.1:9001 weight=2;
+    proxy_pass http://127.0.0.1:9002;
+    dist_policy hash cookie=sessionid;
+    proxy_cache 5s;
+
+    location "/api/" {
+        proxy_pass http://127.0.0.1:9000/;
+
+        location /api/chat/ {
+            proxy_coalesce on;
+        }
+        location "/api/v1" {
+            dist_policy least-connections;
+            proxy_cache off;
+        }
+    }
+    location "/static" { }
+}
+host "backend.local" {
+    proxy_pass http://127.0.0.1:9000;
+}
+"""
+
+
+def routes_of(text):
+    return build_routes(parse_config(text))
+
+
+class ParseTest(unittest.TestCase):
+
+    def test_directives_and_blocks(self):
+        host = parse_config(CONFIG)[0]
+        self.assertEqual((host.name, host.args, host.line), ("host", ["app1.local"], 3))
+        names = [directive.name for directive in host.block]
+        self.assertEqual(names, ["proxy_pass", "proxy_pass", "dist_policy", "proxy_cache",
+                                 "location", "location"])
+        self.assertEqual(host.block[0].args, ["http://127.0.0.1:9001", "weight=2"])
+        self.assertIsNone(host.block[0].block)
+        self.assertEqual(len(host.block[4].block), 3)
+
+    def test_unbalanced_braces(self):
+        # A missing brace is reported at the block it does not close.
+        for text, line in (('host "a" {\n  proxy_pass http://x:1;\n', 1),
+                           ('host "a" { }\n}', 2),
+                           ('host "a" {\n  location "/x" {\n}\n', 1),
+                           ('host "a" {\n  location "/x" {\n', 2)):
+            with self.assertRaises(ConfigError) as raised:
+                parse_config(text)
+            self.assertEqual(raised.exception.line, line, text)
+
+    def test_missing_semicolon(self):
+        self.assertRaises(ConfigError, parse_config, 'host "a" { proxy_pass http://x:1 }')
+        self.assertRaises(ConfigError, parse_config, 'proxy_pass http://x:1')
+
+    def test_unterminated_quote(self):
+        self.assertRaises(ConfigError, parse_config, 'host "a {}')
+
+
+class BuildRoutesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.routes = routes_of(CONFIG)
+
+    def test_host_route(self):
+        proxy_map, policy, options, locations = self.routes["app1.local"]
+        self.assertEqual(proxy_map, ["127.0.0.1:9001 weight=2", "127.0.0.1:9002"])
+        self.assertEqual(policy, "hash cookie=sessionid")
+        self.assertEqual(options, {"proxy_cache": 5.0, "proxy_coalesce": False})
+        self.assertIsInstance(locations, LocationTrie)
+        self.assertEqual(self.routes["backend.local"][:2], ("127.0.0.1:9000", "round-robin"))
+
+    def test_nested_location_inherits(self):
+        locations = self.routes["app1.local"][3]
+        # The upstream of /api/, the policy and cache of the host block.
+        self.assertEqual(locations.match("/api/chat/room"),
+                         ("127.0.0.1:9000", "hash cookie=sessionid",
+                          {"proxy_cache": 5.0, "proxy_coalesce": True}))
+        self.assertEqual(locations.match("/api/v1/users"),
+                         ("127.0.0.1:9000", "least-connections",
+                          {"proxy_cache": None, "proxy_coalesce": False}))
+        # An empty block inherits everything.
+        self.assertEqual(locations.match("/static/a.css"), self.routes["app1.local"][:3])
+
+    def test_nested_prefix_must_extend_parent(self):
+        for text in ('host "a" { location "/api/" { location "/chat/" { } } }',
+                     'host "a" { location "/api/" { location "/api/" { } } }'):
+            self.assertRaises(ConfigError, routes_of, text)
+        routes_of('host "a" { location "/api/" { location "/api/x" { } } }')
+
+    def test_unknown_or_malformed_directives(self):
+        for text in ('host "a" { proxy_buffering on; }',
+                     'host "a" { proxy_cache sometimes; }',
+                     'host "a" { proxy_coalesce yes; }',
+                     'host "a" { proxy_pass 127.0.0.1:9000; }',
+                     'host "a" { dist_policy; }',
+                     'host "a" { location "/x"; }',
+                     'host "a" { upstream x { } }',
+                     'location "/x" { }',
+                     'host "a" { }\nhost "a" { }',
+                     'host "a" { location "/x" { } location "/x" { } }'):
+            self.assertRaises(ConfigError, routes_of, text)
+
+    def test_error_line_number(self):
+        with self.assertRaises(ConfigError) as raised:
+            routes_of('host "a" {\n    proxy_pass http://x:1;\n    bogus 1;\n}')
+        self.assertEqual(raised.exception.line, 3)
+
+    def test_repository_config(self):
+        path = os.path.join(os.path.dirname(__file__), "config", "proxy.conf")
+        with open(path) as f:
+            routes = routes_of(f.read())
+        self.assertEqual(routes["127.0.0.1:8080"][3].match("/api/peers")[0], "127.0.0.1:9000")
+        self.assertTrue(routes["backend.local"][3].match("/get-list")[2]["proxy_coalesce"])
+
+
+class LocationTrieTest(unittest.TestCase):
+
+    def setUp(self):
+        self.trie = LocationTrie({"": "host", "/api": "api", "/api/": "api/",
+                                  "/api/chat/": "chat", "/static/": "static"})
+
+    def test_longest_prefix(self):
+        self.assertEqual(self.trie.match("/api/chat/room/1"), "chat")
+        self.assertEqual(self.trie.match("/api/chat"), "api/")
+        self.assertEqual(self.trie.match("/api/"), "api/")
+        self.assertEqual(self.trie.match("/apix"), "api")
+        self.assertEqual(self.trie.match("/ap"), "host")
+        self.assertEqual(self.trie.match("/"), "host")
+        self.assertEqual(self.trie.match(""), "host")
+
+    def test_query_string_is_ignored(self):
+        self.assertEqual(self.trie.match("/static?/api/chat/"), "host")
+        self.assertEqual(self.trie.match("/static/?v=1"), "static")
+
+    def test_routes(self):
+        self.assertEqual(sorted(self.trie.routes()), ["api", "api/", "chat", "host", "static"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+test_relay
+~~~~~~~~~~~~~~~~~
+
+Unit tests of :mod:`daemon.relay`, run with
+``python -m pytest test_relay.py`` or ``python -m unittest``.
+"""
+
+import socket
+import unittest
+
+from daemon.relay import BodyFramer, ClientStream, ClientError, RelayError, MAX_CHUNK_LINE
+
+CHUNKED = b"5\r\nhello\r\n6;ext=1\r\n world\r\n0\r\n\r\n"
+
+
+def frame(framer, pieces):
+    """
+    Feeds ``pieces`` to ``framer`` as a relay does, keeping unmeasured bytes
+    for the next piece.
+
+    :rtype tuple: (bytes measured as body, bytes left over).
+    """
+    buf = bytearray()
+    body = bytearray()
+    for piece in pieces:
+        buf += piece
+        if framer.done:
+            continue
+        count = framer.measure(buf)
+        body += buf[:count]
+        del buf[:count]
+    return bytes(body), bytes(buf)
+
+
+class BodyFramerTest(unittest.TestCase):
+    """Bodies are measured, not decoded, whatever the read boundaries."""
+
+    def test_content_length(self):
+        framer = BodyFramer(5)
+        self.assertEqual(frame(framer, [b"hel", b"lo", b"GET /"]), (b"hello", b"GET /"))
+        self.assertTrue(framer.done)
+
+    def test_empty_body(self):
+        self.assertTrue(BodyFramer(0).done)
+        self.assertEqual(BodyFramer(0).measure(b"GET / HTTP/1.1"), 0)
+
+    def test_chunked_at_once(self):
+        framer = BodyFramer(chunked=True)
+        self.assertEqual(frame(framer, [CHUNKED + b"next"]), (CHUNKED, b"next"))
+        self.assertTrue(framer.done)
+
+    def test_chunked_byte_by_byte(self):
+        framer = BodyFramer(chunked=True)
+        pieces = [CHUNKED[i:i + 1] for i in range(len(CHUNKED))] + [b"next"]
+        self.assertEqual(frame(framer, pieces), (CHUNKED, b"next"))
+
+    def test_chunked_every_split(self):
+        data = CHUNKED + b"GET"
+        for split in range(1, len(data)):
+            framer = BodyFramer(chunked=True)
+            self.assertEqual(frame(framer, [data[:split], data[split:]]), (CHUNKED, b"GET"), split)
+
+    def test_trailers(self):
+        body = b"2\r\nok\r\n0\r\nX-Checksum: 1\r\nX-Other: 2\r\n\r\n"
+        framer = BodyFramer(chunked=True)
+        self.assertEqual(frame(framer, [body[:20], body[20:]]), (body, b""))
+        self.assertTrue(framer.done)
+
+    def test_incomplete_chunked(self):
+        framer = BodyFramer(chunked=True)
+        frame(framer, [CHUNKED[:-2]])
+        self.assertFalse(framer.done)
+
+    def test_chunked_ignores_length(self):
+        framer = BodyFramer(3, chunked=True)
+        self.assertEqual(frame(framer, [CHUNKED]), (CHUNKED, b""))
+
+    def test_until_eof(self):
+        framer = BodyFramer(until_eof=True)
+        self.assertEqual(frame(framer, [b"abc", b"def"]), (b"abcdef", b""))
+        self.assertFalse(framer.done)
+
+    def test_invalid_chunk_size(self):
+        with self.assertRaises(RelayError):
+            BodyFramer(chunked=True).measure(b"zz\r\nhello\r\n")
+
+    def test_chunk_size_line_too_long(self):
+        with self.assertRaises(RelayError):
+            BodyFramer(chunked=True).measure(b"1" * (MAX_CHUNK_LINE + 1))
+
+    def test_start_offset(self):
+        framer = BodyFramer(3)
+        self.assertEqual(framer.measure(b"xxabcd", 2), 3)
+
+
+class ClientStreamTest(unittest.TestCase):
+    """Heads and bodies are read from a socket."""
+
+    def setUp(self):
+        self.client, server = socket.socketpair()
+        self.addCleanup(self.client.close)
+        self.addCleanup(server.close)
+        server.settimeout(5)
+        self.stream = ClientStream(server)
+
+    def test_pipelined_requests(self):
+        first = b"POST /a HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+        second = b"POST /b HTTP/1.1\r\nContent-Length: 3\r\n\r\n"
+        self.client.sendall(first + CHUNKED + second + b"abc")
+        self.assertEqual(self.stream.read_head(), first)
+        self.assertEqual(b"".join(self.stream.iter_body(None, True)), CHUNKED)
+        self.assertEqual(self.stream.read_head(), second)
+        self.assertEqual(b"".join(self.stream.iter_body(3, False)), b"abc")
+
+    def test_closed_before_request(self):
+        self.client.close()
+        self.assertEqual(self.stream.read_head(), b"")
+
+    def test_cut_short_in_head(self):
+        self.client.sendall(b"GET / HTTP/1.1\r\nHost")
+        self.client.shutdown(socket.SHUT_WR)
+        with self.assertRaises(ClientError):
+            self.stream.read_head()
+
+    def test_cut_short_in_body(self):
+        self.client.sendall(b"POST / HTTP/1.1\r\nContent-Length: 10\r\n\r\nabc")
+        self.client.shutdown(socket.SHUT_WR)
+        self.stream.read_head()
+        with self.assertRaises(ClientError):
+            b"".join(self.stream.iter_body(10, False))
+
+
+if __name__ == "__main__":
+    unittest.main()
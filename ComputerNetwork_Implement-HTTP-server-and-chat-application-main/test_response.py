@@ -0,0 +1,235 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+test_response
+~~~~~~~~~~~~~~~~~
+
+Unit tests of the conditional and range requests of :mod:`daemon.response`,
+run with ``python -m pytest test_response.py`` or ``python -m unittest``.
+"""
+
+import os
+import unittest
+
+from daemon import response
+from daemon.request import Request
+from daemon.response import Response, not_modified, parse_range, if_range_matches, MAX_RANGES
+
+ETAG = '"0123456789abcdef"'
+LAST_MODIFIED = "Tue, 15 Nov 1994 08:12:31 GMT"
+CSS_PATH = "/css/chat.css"
+
+
+def parse(data):
+    """
+    :rtype tuple: (status, headers with lower-case names, body) of an encoded response.
+    """
+    if isinstance(data, response.FileResponse):
+        data = data.collect()
+    head, _, body = data.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return int(lines[0].split()[1]), headers, body
+
+
+class StaticFileTestCase(unittest.TestCase):
+    """Serves the files of the repository ``static/`` directory."""
+
+    def setUp(self):
+        base_dir = response.BASE_DIR
+        self.addCleanup(setattr, response, "BASE_DIR", base_dir)
+        response.BASE_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+    def read(self, path):
+        with open(os.path.join(response.BASE_DIR, "static", path.lstrip("/")), "rb") as fh:
+            return fh.read()
+
+    def get(self, path, headers=()):
+        lines = ["GET {} HTTP/1.1".format(path), "Host: localhost"]
+        lines += ["{}: {}".format(name, value) for name, value in headers]
+        req = Request()
+        req.prepare("\r\n".join(lines) + "\r\n\r\n")
+        return parse(Response().build_response(req))
+
+
+class NotModifiedTest(unittest.TestCase):
+    """Evaluation of If-None-Match and If-Modified-Since."""
+
+    def test_matching_etag(self):
+        self.assertTrue(not_modified({"if-none-match": ETAG}, ETAG, LAST_MODIFIED))
+
+    def test_etag_in_list(self):
+        self.assertTrue(not_modified({"if-none-match": '"other", ' + ETAG}, ETAG, LAST_MODIFIED))
+
+    def test_weak_comparison(self):
+        self.assertTrue(not_modified({"if-none-match": "W/" + ETAG}, ETAG, LAST_MODIFIED))
+
+    def test_star(self):
+        self.assertTrue(not_modified({"if-none-match": "*"}, ETAG, LAST_MODIFIED))
+
+    def test_other_etag(self):
+        self.assertFalse(not_modified({"if-none-match": '"other"'}, ETAG, LAST_MODIFIED))
+
+    def test_if_none_match_takes_precedence(self):
+        headers = {"if-none-match": '"other"', "if-modified-since": LAST_MODIFIED}
+        self.assertFalse(not_modified(headers, ETAG, LAST_MODIFIED))
+
+    def test_not_modified_since(self):
+        self.assertTrue(not_modified({"if-modified-since": LAST_MODIFIED}, ETAG, LAST_MODIFIED))
+        later = "Wed, 16 Nov 1994 08:12:31 GMT"
+        self.assertTrue(not_modified({"if-modified-since": later}, ETAG, LAST_MODIFIED))
+
+    def test_modified_since(self):
+        earlier = "Mon, 14 Nov 1994 08:12:31 GMT"
+        self.assertFalse(not_modified({"if-modified-since": earlier}, ETAG, LAST_MODIFIED))
+
+    def test_invalid_date(self):
+        self.assertFalse(not_modified({"if-modified-since": "yesterday"}, ETAG, LAST_MODIFIED))
+
+    def test_no_conditional_headers(self):
+        self.assertFalse(not_modified({}, ETAG, LAST_MODIFIED))
+
+
+class ValidatorTest(StaticFileTestCase):
+    """Static files carry validators and are answered with 304 when current."""
+
+    def test_validators_sent(self):
+        status, headers, body = self.get(CSS_PATH)
+        self.assertEqual(status, 200)
+        self.assertTrue(headers["etag"].startswith('"'))
+        self.assertIn("last-modified", headers)
+        self.assertEqual(int(headers["content-length"]), len(body))
+
+    def test_etag_revalidation(self):
+        _, headers, _ = self.get(CSS_PATH)
+        status, revalidated, body = self.get(CSS_PATH, [("If-None-Match", headers["etag"])])
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b"")
+        self.assertEqual(revalidated["etag"], headers["etag"])
+        self.assertEqual(revalidated["cache-control"], headers["cache-control"])
+
+    def test_date_revalidation(self):
+        _, headers, _ = self.get(CSS_PATH)
+        status, _, _ = self.get(CSS_PATH, [("If-Modified-Since", headers["last-modified"])])
+        self.assertEqual(status, 304)
+
+    def test_stale_etag(self):
+        status, _, body = self.get(CSS_PATH, [("If-None-Match", '"stale"')])
+        self.assertEqual(status, 200)
+        self.assertTrue(body)
+
+
+class ParseRangeTest(unittest.TestCase):
+    """Parsing of Range headers against a 1000 byte resource."""
+
+    def test_single_range(self):
+        self.assertEqual(parse_range("bytes=0-99", 1000), [(0, 99)])
+
+    def test_open_ended(self):
+        self.assertEqual(parse_range("bytes=900-", 1000), [(900, 999)])
+
+    def test_suffix(self):
+        self.assertEqual(parse_range("bytes=-100", 1000), [(900, 999)])
+        self.assertEqual(parse_range("bytes=-5000", 1000), [(0, 999)])
+
+    def test_end_clamped(self):
+        self.assertEqual(parse_range("bytes=990-2000", 1000), [(990, 999)])
+
+    def test_overlapping_ranges_merged(self):
+        self.assertEqual(parse_range("bytes=500-599,0-99,50-149,150-199", 1000),
+                         [(0, 199), (500, 599)])
+
+    def test_unsatisfiable(self):
+        self.assertEqual(parse_range("bytes=1000-", 1000), [])
+        self.assertEqual(parse_range("bytes=-0", 1000), [])
+
+    def test_ignored(self):
+        for value in ("items=0-1", "bytes", "bytes=a-b", "bytes=5-1", "bytes=-"):
+            self.assertIsNone(parse_range(value, 1000), value)
+
+    def test_too_many_ranges(self):
+        value = "bytes=" + ",".join("{0}-{0}".format(i * 2) for i in range(MAX_RANGES + 1))
+        self.assertIsNone(parse_range(value, 1000))
+
+
+class IfRangeTest(unittest.TestCase):
+    """Evaluation of If-Range."""
+
+    def test_matching_etag(self):
+        self.assertTrue(if_range_matches(ETAG, ETAG, LAST_MODIFIED))
+
+    def test_other_etag(self):
+        self.assertFalse(if_range_matches('"other"', ETAG, LAST_MODIFIED))
+
+    def test_weak_etag(self):
+        self.assertFalse(if_range_matches("W/" + ETAG, ETAG, LAST_MODIFIED))
+
+    def test_date(self):
+        self.assertTrue(if_range_matches(LAST_MODIFIED, ETAG, LAST_MODIFIED))
+        self.assertFalse(if_range_matches("Wed, 16 Nov 1994 08:12:31 GMT", ETAG, LAST_MODIFIED))
+
+    def test_invalid_date(self):
+        self.assertFalse(if_range_matches("yesterday", ETAG, LAST_MODIFIED))
+
+
+class RangeResponseTest(StaticFileTestCase):
+    """Static files answer Range requests with 206 and 416."""
+
+    def test_single_range(self):
+        content = self.read(CSS_PATH)
+        status, headers, body = self.get(CSS_PATH, [("Range", "bytes=10-19")])
+        self.assertEqual(status, 206)
+        self.assertEqual(body, content[10:20])
+        self.assertEqual(headers["content-range"], "bytes 10-19/{}".format(len(content)))
+
+    def test_multiple_ranges(self):
+        content = self.read(CSS_PATH)
+        status, headers, body = self.get(CSS_PATH, [("Range", "bytes=0-4,-5")])
+        self.assertEqual(status, 206)
+        self.assertTrue(headers["content-type"].startswith("multipart/byteranges; boundary="))
+        boundary = headers["content-type"].rpartition("=")[2].encode("latin-1")
+        parts = body.split(b"--" + boundary)
+        self.assertEqual(parts[-1], b"--\r\n")
+        self.assertTrue(parts[1].endswith(b"\r\n\r\n" + content[:5] + b"\r\n"))
+        self.assertTrue(parts[2].endswith(b"\r\n\r\n" + content[-5:] + b"\r\n"))
+        self.assertIn("Content-Range: bytes 0-4/{}".format(len(content)).encode("latin-1"), parts[1])
+
+    def test_unsatisfiable(self):
+        size = len(self.read(CSS_PATH))
+        status, headers, body = self.get(CSS_PATH, [("Range", "bytes={}-".format(size))])
+        self.assertEqual(status, 416)
+        self.assertEqual(headers["content-range"], "bytes */{}".format(size))
+        self.assertEqual(body, b"")
+
+    def test_invalid_range_ignored(self):
+        status, _, body = self.get(CSS_PATH, [("Range", "bytes=x-y")])
+        self.assertEqual(status, 200)
+        self.assertEqual(body, self.read(CSS_PATH))
+
+    def test_if_range_current(self):
+        _, headers, _ = self.get(CSS_PATH)
+        status, _, body = self.get(CSS_PATH, [("Range", "bytes=0-9"), ("If-Range", headers["etag"])])
+        self.assertEqual(status, 206)
+        self.assertEqual(len(body), 10)
+
+    def test_if_range_stale(self):
+        status, _, body = self.get(CSS_PATH, [("Range", "bytes=0-9"), ("If-Range", '"stale"')])
+        self.assertEqual(status, 200)
+        self.assertEqual(body, self.read(CSS_PATH))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+test_staticcache
+~~~~~~~~~~~~~~~~~
+
+Unit tests of :mod:`daemon.staticcache`, run with
+``python -m pytest test_staticcache.py`` or ``python -m unittest``.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from daemon.staticcache import StaticCache
+
+
+class StaticCacheTest(unittest.TestCase):
+    """The cache stays within its byte limits and follows file changes."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def write(self, name, content, mtime=None):
+        path = os.path.join(self.dir, name)
+        with open(path, "wb") as fh:
+            fh.write(content)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_hit_after_miss(self):
+        cache = StaticCache()
+        path = self.write("a.css", b"body {}")
+        first = cache.get(path)
+        self.assertIs(cache.get(path), first)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+        self.assertEqual(first.mime_type, "text/css")
+
+    def test_least_recently_used_is_evicted(self):
+        cache = StaticCache(max_bytes=250)
+        a = self.write("a.bin", b"a" * 100)
+        b = self.write("b.bin", b"b" * 100)
+        c = self.write("c.bin", b"c" * 100)
+        cache.get(a)
+        cache.get(b)
+        cache.get(a)
+        cache.get(c)
+        stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["bytes"], 200)
+        cache.get(a)
+        self.assertEqual(cache.stats()["hits"], 2)
+        cache.get(b)
+        self.assertEqual(cache.stats()["misses"], 4)
+
+    def test_bytes_never_exceed_limit(self):
+        cache = StaticCache(max_bytes=1000)
+        for i in range(20):
+            cache.get(self.write("f{}.bin".format(i), os.urandom(90 + i)))
+            self.assertLessEqual(cache.stats()["bytes"], 1000)
+
+    def test_large_file_not_kept(self):
+        cache = StaticCache(max_file_size=10)
+        path = self.write("big.bin", b"x" * 11)
+        self.assertEqual(cache.get(path).content, b"x" * 11)
+        self.assertEqual(cache.stats()["entries"], 0)
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+    def test_gzip_variant_counts_towards_limit(self):
+        cache = StaticCache()
+        entry = cache.get(self.write("a.css", b"body { color: red; }\n" * 200))
+        variant = cache.gzip_variant(entry)
+        self.assertIsNotNone(variant)
+        self.assertEqual(cache.stats()["bytes"], entry.size + len(variant.content))
+        self.assertNotEqual(variant.etag, entry.etag)
+
+    def test_changed_file_is_reloaded(self):
+        cache = StaticCache()
+        path = self.write("a.css", b"one", mtime=1000000000)
+        first = cache.get(path)
+        self.write("a.css", b"two!", mtime=1000000100)
+        second = cache.get(path)
+        self.assertEqual(second.content, b"two!")
+        self.assertNotEqual(second.etag, first.etag)
+        self.assertEqual(cache.stats()["invalidations"], 1)
+        self.assertEqual(cache.stats()["bytes"], 4)
+
+    def test_deleted_file_is_dropped(self):
+        cache = StaticCache()
+        path = self.write("a.css", b"body {}")
+        cache.get(path)
+        os.remove(path)
+        with self.assertRaises(FileNotFoundError):
+            cache.get(path)
+        self.assertEqual(cache.stats()["entries"], 0)
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()